@@ -0,0 +1,151 @@
+""" CPU topology discovery and core pinning for the Runner.
+Python port of the lscpu/taskset logic of runner.sh, reading
+/sys/devices/system directly.
+
+Pinning policies:
+  'none'     no pinning
+  'compact'  fill CPUs in NUMA node order, physical cores first
+  'socket'   keep each job inside one socket if it fits
+  'l3'       keep each job inside one L3 cache domain if it fits,
+             then inside one socket
+"""
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Set
+
+PIN_POLICIES = ['none', 'compact', 'socket', 'l3']
+
+
+def parse_cpulist(text: str) -> List[int]:
+    """Parse a kernel cpulist such as '0-3,8,10-11'."""
+    cpus: List[int] = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def format_cpulist(cpus: Iterable[int]) -> str:
+    """Format CPUs as a compact cpulist, inverse of parse_cpulist."""
+    ranges = []
+    for cpu in sorted(set(cpus)):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ','.join(f"{a}-{b}" if a != b else f"{a}" for a, b in ranges)
+
+
+class CpuTopology:
+    """NUMA node, socket, L3 and SMT layout of the usable CPUs."""
+
+    def __init__(self, sysfs_root: str = '/sys/devices/system'):
+        self.sysfs_root = sysfs_root
+        self.cpus: Dict[int, Dict[str, int]] = {}
+        self._discover()
+
+    def _read(self, *path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.sysfs_root, *path), 'r',
+                      encoding="utf-8") as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def _discover(self) -> None:
+        """Collect node/socket/L3/sibling rank of every allowed CPU."""
+        if hasattr(os, 'sched_getaffinity'):
+            allowed = set(os.sched_getaffinity(0))
+        else:
+            allowed = set(range(os.cpu_count() or 1))
+
+        node_of: Dict[int, int] = {}
+        node_dir = os.path.join(self.sysfs_root, 'node')
+        if os.path.isdir(node_dir):
+            for entry in os.listdir(node_dir):
+                if entry.startswith('node') and entry[4:].isdigit():
+                    cpulist = self._read('node', entry, 'cpulist')
+                    for cpu in parse_cpulist(cpulist or ''):
+                        node_of[cpu] = int(entry[4:])
+
+        for cpu in sorted(allowed):
+            base = ('cpu', f'cpu{cpu}')
+            socket = self._read(*base, 'topology', 'physical_package_id')
+            siblings = parse_cpulist(
+                self._read(*base, 'topology', 'thread_siblings_list') or str(cpu))
+            l3 = parse_cpulist(
+                self._read(*base, 'cache', 'index3', 'shared_cpu_list') or '')
+            self.cpus[cpu] = {
+                'node': node_of.get(cpu, 0),
+                'socket': int(socket) if socket and socket.lstrip('-').isdigit() else 0,
+                'l3': min(l3) if l3 else -1,
+                'sibling rank': sorted(siblings).index(cpu) if cpu in siblings else 0,
+            }
+
+    def compact_order(self) -> List[int]:
+        """CPUs ordered node by node, one thread per physical core first."""
+        return sorted(self.cpus, key=lambda c: (self.cpus[c]['node'],
+                                                self.cpus[c]['sibling rank'], c))
+
+    def domains(self, key: str) -> Dict[int, List[int]]:
+        """Group CPUs by 'node', 'socket' or 'l3' in compact order."""
+        groups: Dict[int, List[int]] = {}
+        for cpu in self.compact_order():
+            groups.setdefault(self.cpus[cpu][key], []).append(cpu)
+        return groups
+
+    def nodes_of(self, cpus: Iterable[int]) -> List[int]:
+        """NUMA nodes the given CPUs belong to."""
+        return sorted({self.cpus[c]['node'] for c in cpus if c in self.cpus})
+
+
+class CpuAllocator:
+    """Hands out disjoint CPU sets to concurrently running jobs."""
+
+    def __init__(self, topology: CpuTopology, policy: str, total_cpus: int):
+        if policy not in PIN_POLICIES:
+            raise ValueError(f"Unknown pinning policy: {policy}")
+        self.topology = topology
+        self.policy = policy
+        self.order = topology.compact_order()[:total_cpus]
+        self.free: Set[int] = set(self.order)
+
+    def _take(self, candidates: List[int], count: int) -> List[int]:
+        cpus = [c for c in candidates if c in self.free][:count]
+        self.free.difference_update(cpus)
+        return cpus
+
+    def acquire(self, count: int) -> List[int]:
+        """Reserve count CPUs according to the policy (fewer if not free)."""
+        levels = {'l3': ['l3', 'socket'], 'socket': ['socket']}
+        for key in levels.get(self.policy, []):
+            best = None
+            for cpus in self.topology.domains(key).values():
+                n_free = sum(1 for c in cpus if c in self.free)
+                # Best fit: the fullest domain that still takes the whole job.
+                if n_free >= count and (best is None or n_free < best[0]):
+                    best = (n_free, cpus)
+            if best is not None:
+                return self._take(best[1], count)
+        return self._take(self.order, count)
+
+    def release(self, cpus: Iterable[int]) -> None:
+        """Return CPUs of a finished job."""
+        self.free.update(c for c in cpus if c in self.order)
+
+
+def pin_command(command: str, cpus: List[int], nodes: List[int]) -> str:
+    """Prefix command with numactl (CPU and memory binding) or taskset."""
+    if not cpus:
+        return command
+    if shutil.which('numactl') and nodes:
+        return (f"numactl --physcpubind={format_cpulist(cpus)} "
+                f"--membind={format_cpulist(nodes)} {command}")
+    if shutil.which('taskset'):
+        return f"taskset -c {format_cpulist(cpus)} {command}"
+    return command
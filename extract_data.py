@@ -5,140 +5,33 @@ import sys
 import numpy as np
 import argparse
 
+from gms_log_parser import map_logs, timing_parser, timing_state
+
+TIMING_PARSER = timing_parser()
+# Logs of at least this size (bytes) are parsed memory-mapped
+MAPPED_SIZE = 1 << 28
+
 def extract_data(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-
-    times = []
-    dirscf = False
-    disk = False
-    t_of_ERI = 0.0
-    t_cpu_ERI = 0.0
-    t_write = 0.0
-    t_flush = 0.0
-    int_of_ERI = 0
-    skip_of_ERI = 0
-    t_of_scf = 0.0
-    t_cpu_scf = 0.0
-    t_util_scf = str(0)
-    int_of_scf = 0
-    skip_of_scf = 0
-    scf_iter = 0
-    buf_ncur =0
-    buf_j = 0
-    buf_size = 0
-    t_of_davidson = 0.0
-    t_cpu_davidson = 0.0
-    t_util_davidson = str(0)
-    davidson_int = 0
-    davidson_skip = 0
+    d = TIMING_PARSER.parse_file(file, timing_state(),
+                                 mapped=os.path.getsize(file) >= MAPPED_SIZE)
     data_row = []
-    i=0
-    for il, l in enumerate(out):
-        if "dirscf=.t." in l:
-            i+=1
-            dirscf=True
-        elif "dirscf=.f." in l:
-            i+=1
-            disk=True
-        if disk and "Flushing page cache" in l:
-            # Timing of getting ERI
-            t_of_ERI = float(out[il-8].split()[4])
-            # Step CPU time of getting ERI
-            if (str(out[il-10].split()[5])==str("TOTAL")):
-                t_cpu_ERI = float(out[il-10].split()[4])
-            else:
-                t_cpu_ERI = float(out[il-10].split()[5])
-            # Time of writing int
-            t_write = float(out[il-1].split()[4])
-            # time of flushing
-            t_flush = float(out[il+4].split()[4])
-            # Mount of 2e integrals
-            int_of_ERI = int(out[il-6].split()[7])
-            # Skiped integrals
-            skip_of_ERI = int(out[il-7].split()[4])
-        if disk and "DENSITY CHANGE" in l:
-            # Timing of the first SCF stap
-            t_of_scf = float(out[il+3].split()[4])
-#           # Step CPU time of the first  SCF
-            if (str(out[il+1].split()[5])==str("PROCEDURE")):
-                continue
-            else:
-                if (str(out[il+1].split()[5])==str("TOTAL")):
-                    t_cpu_scf = float(out[il+1].split()[4])
-                else:
-                    t_cpu_scf = float(out[il+1].split()[5])
-#           # Total CPU utilization of the first  SCF
-            t_util_scf = str(out[il+2].split()[9])
-#           # Mount of 2e integrals calc in first SCF stap
-        if dirscf and "DENSITY CHANGE" in l:
-            # Timing of the first SCF stap
-            t_of_scf = float(out[il+3].split()[4])
-            # Total CPU time of the first  SCF
-            if (str(out[il+1].split()[5])==str("TOTAL")):
-                t_cpu_scf = float(out[il+1].split()[4])
-            else:
-                t_cpu_scf = float(out[il+1].split()[5])
-            # Total CPU utilization of the first  SCF
-            t_util_scf = str(out[il+2].split()[9])
-            # Mount of 2e integrals calc in first SCF stap
-            int_of_scf = int(out[il+5].split()[6])
-            # Skiped integrals
-            skip_of_scf = int(out[il+5].split()[7])
-
-        if disk and "ddd step wall" in l:
-            # calc number of SCF iterations
-            scf_iter += 1
-        if dirscf and "ddd step wall" in l:
-            # calc number of SCF iterations
-            scf_iter += 1
-
-        if disk and "kkk step wall time:" in l:
-            # Timing of the first Devidson iteration
-            t_of_davidson = float(out[il].split()[4])
-            # CPU time on step
-            if (str(out[il-2].split()[5])==str("TOTAL")):
-                t_cpu_davidson = float(out[il-2].split()[4])
-            else:
-                t_cpu_davidson = float(out[il-2].split()[5])
-            # CPU utilization of Davidson
-            t_util_davidson = str(out[il-1].split()[9])
-        if dirscf and "lll total number of" in l:
-            # ncur+j*mxbuf
-            buf_ncur = int(out[il].split()[6])
-            buf_size = int(out[il].split()[7])
-            davidson_int = buf_ncur
-            davidson_skip = buf_size
-        if dirscf and "kkk step wall time:" in l:
-            # Timing of the first Devidson iteration
-            t_of_davidson = float(out[il].split()[4])
-            # CPU time on step
-            if (str(out[il-2].split()[5])==str("TOTAL")):
-                t_cpu_davidson = float(out[il-2].split()[4])
-            else:
-                t_cpu_davidson = float(out[il-2].split()[5])
-            # CPU utilization of Davidson
-            t_util_davidson = str(out[il-1].split()[9])
-    row = (t_of_ERI,
-           t_cpu_ERI,
-           int_of_ERI,
-           skip_of_ERI,
-           t_write,
-           t_flush,
-           t_of_scf,
-           t_cpu_scf,
-           t_util_scf,
-           int_of_scf,
-           skip_of_scf,
-           scf_iter,
-           davidson_int,
-           davidson_skip,
-           t_of_davidson,
-           t_cpu_davidson,
-           t_util_davidson,
+    row = (d['t_of_ERI'],
+           d['t_cpu_ERI'],
+           d['int_of_ERI'],
+           d['skip_of_ERI'],
+           d['t_write'],
+           d['t_flush'],
+           d['t_of_scf'],
+           d['t_cpu_scf'],
+           d['t_util_scf'],
+           d['int_of_scf'],
+           d['skip_of_scf'],
+           d['scf_iter'],
+           d['davidson_int'],
+           d['davidson_skip'],
+           d['t_of_davidson'],
+           d['t_cpu_davidson'],
+           d['t_util_davidson'],
            file,
           )
     data_row.append(row)
@@ -167,6 +60,16 @@ def extract_data(file):
 #           times.append(step_time)
 #   return times
 
+def command_line_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-i', '--input',
+                        type=str,
+                        help='File listing the log files, default: the built-in list')
+    parser.add_argument('-j', '--jobs',
+                        type=int, default=1,
+                        help='Number of processes parsing log files')
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
 
@@ -373,6 +276,10 @@ if __name__ == '__main__':
 'mrsf_5b_qqq_c9_t0.log',
 )
 
+    arg = command_line_args()
+    if arg.input:
+        files = open(arg.input, 'r').read().split()
+
     fout = open('output_file.log', 'w')
     fout.write('\n')
     fout.write(' '*3+'Time_ERI'+' '*7+
@@ -399,8 +306,11 @@ if __name__ == '__main__':
                'log_file\n')
     data = []
     data2 = []
-    for i in files:
-        data =  extract_data(i)
+    for i, data, error in map_logs(extract_data, files, arg.jobs):
+        if error:
+            print(i, error)
+            fout.write(' ERROR '+str(error)+' '+str(i)+'\n')
+            continue
         strii = i.split('_')
         if int(i.count('n'))==0:
             n_state = 10
@@ -9,221 +9,215 @@ import numpy as np
 import argparse
 import csv
 
-def Extract_data(file_name):
-    f = open(file_name, 'r')
-    file_data = f.read().splitlines()
-    f.close()
-
-    tddft, scftype, molecule, basis, dfttype_inp, ref_S1_energy, ref_S2_energy, option = extract_basis(file)
-
-    l_mrsf = False
-    l_sf = False
-    l_td = False
-    if tddft.lower() == 'mrsf':
-        l_mrsf = True
-    elif tddft.lower() == 'sf':
-        l_sf = True
-    elif tddft.lower() == 'td':
-        l_td = True
-
-    scftype = ""
-    dfttype = ""
-#   tddft = ''
-#   basis = ''
-#   molecule = ''
-    state_spin_type = ""
-    number_of_states = 0
-    total_energy_Hartree = 0.0
-    state_energy_Hartree = 0.0
-    state_energy_eV_GS = 0.0
-#   ref_S1_energy = 0.0
-#   ref_S2_energy = 0.0
-    spcp_HFscal = 0.0
-    spcp_MRSFscal = 0.0
-    spcp_CC = 0.0
-    spcp_VV = 0.0
-    spcp_CV = 0.0
-    state_symmetry = ""
-    mol_symmetry = ""
-    nstate = 0
-    number_of_atom = 0
-    number_of_bf = 0
-    coord_system = ""
-    state_energy_eV_ref = 0.0
-    state_squared_S = 0.0
-    state_transition_dipole_x = 0.0
-    state_transition_dipole_y = 0.0
-    state_transition_dipole_z = 0.0
-    state_oscillator_strength = 0.0
-    state_transt_dominant = []
-    state_transt = []
-
-    state_location_in_log = []
-    range_of_transitions = []
-    summary_table = []
-
-    for il, l in enumerate(file_data):
-
-        if "$CONTRL OPTIONS" in l:
-            scftype = str(file_data[il+2].split()[0].split('=')[1])
-            dfttype = str(file_data[il+4].split()[0].split('=')[1])
-            if dfttype=='USELIBXC':
-                dfttype = dfttype_inp
-            spher_coord = int(file_data[il+7].split()[1])
-            if spher_coord==1:
-                coord_system = "Spherical"
+from gms_log_parser import LogParser, ParsedLog, error_row
+from log_cache import LogCache, map_cached
+
+# Bump when the extracted summary rows change, to invalidate cached ones.
+CACHE_VERSION = '1'
+
+def _contrl_options(file_data, il, d):
+    d['scftype'] = str(file_data[il+2].split()[0].split('=')[1])
+    d['dfttype'] = str(file_data[il+4].split()[0].split('=')[1])
+    if d['dfttype']=='USELIBXC':
+        d['dfttype'] = d['dfttype_inp']
+    spher_coord = int(file_data[il+7].split()[1])
+    if spher_coord==1:
+        d['coord_system'] = "Spherical"
+    else:
+        d['coord_system'] = "Cartesian"
+
+def _tddft_parameters(file_data, il, d):
+    d['nstate'] = int(file_data[il+2].split()[1])
+
+def _spin_pairing(file_data, il, d):
+    if d['l_mrsf']:
+        d['spcp_HFscal'] = float(file_data[il+2].split()[0])
+        d['spcp_MRSFscal'] = float(file_data[il+2].split()[1])
+        d['spcp_CC'] = float(file_data[il+2].split()[2])
+        d['spcp_VV'] = float(file_data[il+2].split()[3])
+        d['spcp_CV'] = float(file_data[il+2].split()[4])
+
+def _data_card(file_data, il, d):
+    d['mol_symmetry'] = str(file_data[il+2].split()[2])
+
+def _number_of_bf(file_data, il, d):
+    d['number_of_bf'] = int(file_data[il].split()[7])
+
+def _number_of_atom(file_data, il, d):
+    d['number_of_atom'] = int(file_data[il].split()[5])
+
+def _summary(file_data, il, d):
+    nstate = d['nstate']
+    l_mrsf = d['l_mrsf']
+    state_location_in_log = d['sections'].state_lines(nstate, il)
+    range_of_transitions = d['range_of_transitions']
+    state_transt = d['state_transt']
+    state_transt_dominant = d['state_transt_dominant']
+
+    for i in [*range(nstate-1)]:
+        step = state_location_in_log[i+1]-state_location_in_log[i]-6
+        range_of_transitions.append(int(step))
+    range_of_transitions.append(int(il-state_location_in_log[nstate-1]-7))
+    for i in [*range(nstate)]:
+        tmp = []
+        for j in [*range(range_of_transitions[i])]:
+            state_excite_Occ = int(file_data[state_location_in_log[i]+j+5].split()[2])
+            state_excited_Vir = int(file_data[state_location_in_log[i]+j+5].split()[4])
+            state_excite_Coeff = float(file_data[state_location_in_log[i]+j+5].split()[1])
+            row = (state_excite_Occ,state_excited_Vir,state_excite_Coeff)
+            tmp.append(row)
+        tmp = sorted(tmp, key=lambda term: (abs(term[2]), term[2]), reverse=True)
+        state_transt.append(tmp)
+        state_transt_dominant.append(tmp[0])
+
+    if l_mrsf:
+        step = il+7
+
+        check_line = int(file_data[step].split()[0])
+        add_to_step = 0
+        if check_line==0:
+            add_to_step = 1
+        S2_line = float(file_data[step+add_to_step].split()[4])
+
+        if S2_line==0.0:
+            d['state_spin_type'] = 'Singlet'
+        if S2_line==2.0:
+            d['state_spin_type'] = 'Triplet'
+        if S2_line==6.0:
+            d['state_spin_type'] = 'Quintet'
+    else:
+        step = il+6
+        d['state_spin_type'] = 'Spin-Contamination'
+
+    k = 0
+    iS = 1
+    iStmp = iS
+    while k <= nstate:
+        if int(file_data[step+k].split()[0]) == 0:
+            d['total_energy_Hartree'] = float(file_data[step+k].split()[2])
+            if k==nstate:
+                break
             else:
-                coord_system = "Cartesian"
-
+                k+=1
+        number_of_states = iStmp
+        if number_of_states==1:
+            GS = float(file_data[step+k].split()[2])
+        k+=1
+        iStmp += 1
+
+    total_energy_Hartree = d['total_energy_Hartree']
+    k = 0
+    j = 0
+    while k <= nstate:
+        if int(file_data[step+k].split()[0]) == 0:
+            if k==nstate:
+                break
+            else:
+                k+=1
 
-        if "TDDFT INPUT PARAMETERS" in l:
-            nstate = int(file_data[il+2].split()[1])
+        number_of_states = iS
+        state_symmetry = str(file_data[step+k].split()[1])
+        state_energy_Hartree = float(file_data[step+k].split()[2])
 
+        state_energy_eV_ref = (state_energy_Hartree-total_energy_Hartree)*27.2107
+        state_energy_eV_GS = (state_energy_Hartree-GS)*27.2107
+        state_squared_S = float(file_data[step+k].split()[4])
         if l_mrsf:
-            if "SPIN-PAIRING COUPLINGS" in l:
-                spcp_HFscal = float(file_data[il+2].split()[0])
-                spcp_MRSFscal = float(file_data[il+2].split()[1])
-                spcp_CC = float(file_data[il+2].split()[2])
-                spcp_VV = float(file_data[il+2].split()[3])
-                spcp_CV = float(file_data[il+2].split()[4])
-        if "input card> $data" in l.lower():
-            mol_symmetry = str(file_data[il+2].split()[2])
-
-        if "NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS" in l:
-            number_of_bf = int(file_data[il].split()[7])
-        elif "TOTAL NUMBER OF MOS IN VARIATION" in l:
-            number_of_bf = int(file_data[il].split()[7])
-
-        if "TOTAL NUMBER OF ATOMS" in l:
-            number_of_atom = int(file_data[il].split()[5])
-
-        states = range(1,nstate+1)
-        for i in states:
-            length = 4
-            step = int(length-len(str(i)))
-            if "STATE #"+' '*step+str(i)+"  ENERGY" in l:
-                state_location_in_log.append(int(il))
-
-        if "SUMMARY OF" in l:
-            for i in [*range(nstate-1)]:
-                step = state_location_in_log[i+1]-state_location_in_log[i]-6
-                range_of_transitions.append(int(step))
-            range_of_transitions.append(int(il-state_location_in_log[nstate-1]-7))
-            for i in [*range(nstate)]:
-                tmp = []
-                for j in [*range(range_of_transitions[i])]:
-                    state_excite_Occ = int(file_data[state_location_in_log[i]+j+5].split()[2])
-                    state_excited_Vir = int(file_data[state_location_in_log[i]+j+5].split()[4])
-                    state_excite_Coeff = float(file_data[state_location_in_log[i]+j+5].split()[1])
-                    row = (state_excite_Occ,state_excited_Vir,state_excite_Coeff)
-                    tmp.append(row)
-                tmp = sorted(tmp, key=lambda term: (abs(term[2]), term[2]), reverse=True)
-                state_transt.append(tmp)
-                state_transt_dominant.append(tmp[0])
-
-            if l_mrsf:
-                step = il+7
-
-                check_line = int(file_data[step].split()[0])
-                add_to_step = 0
-                if check_line==0:
-                    add_to_step = 1
-                S2_line = float(file_data[step+add_to_step].split()[4])
-
-                if S2_line==0.0:
-                    state_spin_type = 'Singlet'
-                if S2_line==2.0:
-                    state_spin_type = 'Triplet'
-                if S2_line==6.0:
-                    state_spin_type = 'Quintet'
-            else:
-                step = il+6
-                state_spin_type = 'Spin-Contamination'
-
-            k = 0
-            iS = 1
-            iStmp = iS
-            while k <= nstate:
-                if int(file_data[step+k].split()[0]) == 0:
-                    total_energy_Hartree = float(file_data[step+k].split()[2])
-                    if k==nstate:
-                        break
-                    else:
-                        k+=1
-                number_of_states = iStmp
-                if number_of_states==1:
-                    GS = float(file_data[step+k].split()[2])
-                k+=1
-                iStmp += 1
-
-            k = 0
-            j = 0
-            while k <= nstate:
-                if int(file_data[step+k].split()[0]) == 0:
-                    if k==nstate:
-                        break
-                    else:
-                        k+=1
-
-                number_of_states = iS
-                state_symmetry = str(file_data[step+k].split()[1])
-                state_energy_Hartree = float(file_data[step+k].split()[2])
-
-                state_energy_eV_ref = (state_energy_Hartree-total_energy_Hartree)*27.2107
-                state_energy_eV_GS = (state_energy_Hartree-GS)*27.2107
-                state_squared_S = float(file_data[step+k].split()[4])
-                if l_mrsf:
-                    state_transition_dipole_x = float(file_data[step+k].split()[5])
-                    state_transition_dipole_y = float(file_data[step+k].split()[6])
-                    state_transition_dipole_z = float(file_data[step+k].split()[7])
-                    state_oscillator_strength = float(file_data[step+k].split()[8])
-                else:
-                    state_transition_dipole_x = ''
-                    state_transition_dipole_y = ''
-                    state_transition_dipole_z = ''
-                    state_oscillator_strength = ''
-
-                row = (scftype,
-                       dfttype,
-                       option,
-                       tddft.upper(),
-                       basis,
-                       molecule,
-                       state_spin_type,
-                       number_of_states,
-                       state_energy_Hartree,
-                       state_energy_eV_GS,
-                       ref_S1_energy,
-                       ref_S2_energy,
-                       spcp_HFscal,
-                       spcp_MRSFscal,
-                       spcp_CC,
-                       spcp_VV,
-                       spcp_CV,
-                       state_symmetry,
-                       mol_symmetry,
-                       nstate,
-                       number_of_atom,
-                       number_of_bf,
-                       coord_system,
-                       total_energy_Hartree,
-                       state_energy_eV_ref,
-                       state_squared_S,
-                       state_transition_dipole_x,
-                       state_transition_dipole_y,
-                       state_transition_dipole_z,
-                       state_oscillator_strength,
-                       str("\""+str(state_transt_dominant[j])+"\""),
-                       str("\""+str(state_transt[j])+"\""),
-                       file_name,
-                       )
-
-                summary_table.append( row )
-                iS += 1
-                k += 1
-                j += 1
-
-    return summary_table
+            state_transition_dipole_x = float(file_data[step+k].split()[5])
+            state_transition_dipole_y = float(file_data[step+k].split()[6])
+            state_transition_dipole_z = float(file_data[step+k].split()[7])
+            state_oscillator_strength = float(file_data[step+k].split()[8])
+        else:
+            state_transition_dipole_x = ''
+            state_transition_dipole_y = ''
+            state_transition_dipole_z = ''
+            state_oscillator_strength = ''
+
+        row = (d['scftype'],
+               d['dfttype'],
+               d['option'],
+               d['tddft'].upper(),
+               d['basis'],
+               d['molecule'],
+               d['state_spin_type'],
+               number_of_states,
+               state_energy_Hartree,
+               state_energy_eV_GS,
+               d['ref_S1_energy'],
+               d['ref_S2_energy'],
+               d['spcp_HFscal'],
+               d['spcp_MRSFscal'],
+               d['spcp_CC'],
+               d['spcp_VV'],
+               d['spcp_CV'],
+               state_symmetry,
+               d['mol_symmetry'],
+               nstate,
+               d['number_of_atom'],
+               d['number_of_bf'],
+               d['coord_system'],
+               total_energy_Hartree,
+               state_energy_eV_ref,
+               state_squared_S,
+               state_transition_dipole_x,
+               state_transition_dipole_y,
+               state_transition_dipole_z,
+               state_oscillator_strength,
+               str("\""+str(state_transt_dominant[j])+"\""),
+               str("\""+str(state_transt[j])+"\""),
+               d['file_name'],
+               )
+
+        d['summary_table'].append( row )
+        iS += 1
+        k += 1
+        j += 1
+
+LOG_PARSER = LogParser()
+LOG_PARSER.on("$CONTRL OPTIONS", _contrl_options)
+LOG_PARSER.on("TDDFT INPUT PARAMETERS", _tddft_parameters)
+LOG_PARSER.on("SPIN-PAIRING COUPLINGS", _spin_pairing)
+LOG_PARSER.on("input card> $data", _data_card, ignore_case=True)
+LOG_PARSER.on("NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS", _number_of_bf)
+LOG_PARSER.on("TOTAL NUMBER OF MOS IN VARIATION", _number_of_bf)
+LOG_PARSER.on("TOTAL NUMBER OF ATOMS", _number_of_atom)
+LOG_PARSER.on("SUMMARY OF", _summary)
+
+def Extract_data(file_name):
+    tddft, scftype, molecule, basis, dfttype_inp, ref_S1_energy, ref_S2_energy, option = extract_basis(file_name)
+
+    d = {'file_name': file_name,
+         'tddft': tddft,
+         'molecule': molecule,
+         'basis': basis,
+         'dfttype_inp': dfttype_inp,
+         'ref_S1_energy': ref_S1_energy,
+         'ref_S2_energy': ref_S2_energy,
+         'option': option,
+         'l_mrsf': tddft.lower() == 'mrsf',
+         'scftype': "",
+         'dfttype': "",
+         'state_spin_type': "",
+         'total_energy_Hartree': 0.0,
+         'spcp_HFscal': 0.0,
+         'spcp_MRSFscal': 0.0,
+         'spcp_CC': 0.0,
+         'spcp_VV': 0.0,
+         'spcp_CV': 0.0,
+         'mol_symmetry': "",
+         'nstate': 0,
+         'number_of_atom': 0,
+         'number_of_bf': 0,
+         'coord_system': "",
+         'state_transt_dominant': [],
+         'state_transt': [],
+         'range_of_transitions': [],
+         'summary_table': [],
+         }
+    log = ParsedLog(file_name)
+    d['sections'] = log.index
+    log.parse(LOG_PARSER, d)
+    return d['summary_table']
 
 def extract_basis(file):
 #    uhf_mrsf_thymine_acct_bhhlyp.log
@@ -295,6 +289,12 @@ def Check_file(file):
            status = True
     return status
 
+def Process_file(file):
+    """Summary rows of a log, None if Check_file flags it."""
+    if Check_file(file):
+        return None
+    return Extract_data(file)
+
 def command_line_args():
     import argparse
 
@@ -302,6 +302,12 @@ def command_line_args():
     parser.add_argument('-i', '--input',
                         type=str,
                         help='Provide the input.log file')
+    parser.add_argument('-j', '--jobs',
+                        type=int, default=1,
+                        help='Number of processes parsing log files')
+    parser.add_argument('--no-cache',
+                        action='store_true',
+                        help='Parse every log again, do not use the log cache')
 
     return parser.parse_args()
 
@@ -349,17 +355,21 @@ if __name__ == '__main__':
               "Log_file_name"]
 
     data = []
+    cache = None if arg.no_cache else LogCache()
 
     with open(output_file, 'w', newline='', encoding='UTF8') as f:
         writer = csv.writer(f, delimiter=';')
         writer.writerow(header)
-        for file in files:
+        for file, summary_rows, error in map_cached(Process_file, files, arg.jobs, cache,
+                                                    'get_csv_file', CACHE_VERSION):
             print(file)
-            status = Check_file(file)
-            if status:
+            if error:
+                print(' FAILED ',file, error)
+                writer.writerow(error_row(len(header), file, error))
+            elif summary_rows is None:
                 print(' ERROR in ',file)
             else:
-                summary_rows =  Extract_data(file)
                 for j in summary_rows:
                     writer.writerow(j)
-
+    if cache is not None:
+        cache.close()
@@ -9,38 +9,225 @@ import numpy as np
 import argparse
 import csv
 
-def Extract_data(file_name,index):
-    f = open(file_name, 'r', encoding='ISO-8859-1')
-    file_data = f.read().splitlines()
-    f.close()
+from gms_log_parser import LogParser, ParsedLog
+
+def _mrsoc(file_data, il, d):
+    d['flagsoc'] = True
+
+def _tddft_parameters(file_data, il, d):
+    d['nstate'] = int(file_data[il+2].split()[1])
+    if d['flagsoc']:
+        d['nstate'] = d['nstate']*2
+
+def _data_card(file_data, il, d):
+    d['mol_symmetry'] = str(file_data[il+2].split()[2])
+
+def _number_of_bf(file_data, il, d):
+    d['number_of_bf'] = int(file_data[il].split()[7])
+
+def _non_abel(file_data, il, d):
+    d['non_abel'] = True
+
+def _cam(file_data, il, d):
+    d['camflag'] = True
+
+def _fitting_parameters(file_data, il, d):
+    if d['l_mrsfs'] or d['l_mrsft']:
+        if d['camflag']:
+            d['mrsf_aee'] = float(file_data[il+2].split()[1])
+            d['mrsf_beta'] = float(file_data[il+2].split()[2])
+            d['mrsf_hf'] = float(file_data[il+8].split()[1])
+            d['mrsf_betac'] = float(file_data[il+8].split()[2])
+            d['mrsf_spc'] = float(file_data[il+5].split()[2])
+            d['dtcam'] = str('%4.2f' % d['mrsf_hf'])+','+str('%4.2f' % d['mrsf_betac'])+'/'+str('%4.2f' % d['mrsf_aee'])+','+str('%4.2f' % d['mrsf_beta'])
+        else:
+            d['mrsf_aee'] = float(file_data[il+2].split()[0])
+            d['mrsf_spc'] = float(file_data[il+5].split()[2])
+            d['mrsf_hf'] = float(file_data[il+8].split()[0])
+
+def _summary(file_data, il, d):
+    (nstate, non_abel, l_mrsfs, l_mrsft, l_sf, l_tds, l_tdt,
+     state_location_in_log, range_of_transitions,
+     state_transt_dominant, state_transt, summary_table) = (
+        d['nstate'], d['non_abel'], d['l_mrsfs'], d['l_mrsft'], d['l_sf'],
+        d['l_tds'], d['l_tdt'], d['sections'].state_lines(d['nstate'], il),
+        d['range_of_transitions'], d['state_transt_dominant'],
+        d['state_transt'], d['summary_table'])
+    (scftype, dfttype, dtcam, tddft_out, basis_out, molecule, number_of_bf,
+     mol_symmetry, total_energy_Hartree, index, file_name,
+     mrsf_hf, mrsf_betac, mrsf_aee, mrsf_beta, mrsf_spc) = (
+        d['scftype'], d['dfttype'], d['dtcam'], d['tddft_out'],
+        d['basis_out'], d['molecule'], d['number_of_bf'], d['mol_symmetry'],
+        d['total_energy_Hartree'], d['index'], d['file_name'],
+        d['mrsf_hf'], d['mrsf_betac'], d['mrsf_aee'], d['mrsf_beta'],
+        d['mrsf_spc'])
+
+    step = 0; mrs = False
+    if l_mrsfs or l_mrsft:
+        for i in [*range(nstate-1)]:
+            step = state_location_in_log[i+1]-state_location_in_log[i]-6
+            range_of_transitions.append(int(step))
+        if non_abel:
+            range_of_transitions.append(int(il-state_location_in_log[nstate-1]-11))
+        else:
+            range_of_transitions.append(int(il-state_location_in_log[nstate-1]-7))
+        for i in [*range(nstate)]:
+            tmp = []
+            for j in [*range(range_of_transitions[i])]:
+                state_excite_Occ = int(file_data[state_location_in_log[i]+j+5].split()[2])
+                state_excited_Vir = int(file_data[state_location_in_log[i]+j+5].split()[4])
+                state_excite_Coeff = float(file_data[state_location_in_log[i]+j+5].split()[1])
+                row = (state_excite_Occ,state_excited_Vir,state_excite_Coeff)
+                tmp.append(row)
+            tmp = sorted(tmp, key=lambda term: (abs(term[2]), term[2]), reverse=True)
+            state_transt.append(tmp)
+            state_transt_dominant.append(tmp[0])
+        step = il+7; mrs = True
+    elif l_sf:
+        for i in [*range(nstate-1)]:
+            step = state_location_in_log[i+1]-state_location_in_log[i]-6
+            range_of_transitions.append(int(step))
+        if non_abel:
+            range_of_transitions.append(int(il-state_location_in_log[nstate-1]-11))
+        else:
+            range_of_transitions.append(int(il-state_location_in_log[nstate-1]-7))
+        for i in [*range(nstate)]:
+            tmp = []
+            for j in [*range(range_of_transitions[i])]:
+                state_excite_Occ = int(file_data[state_location_in_log[i]+j+5].split()[2])
+                state_excited_Vir = int(file_data[state_location_in_log[i]+j+5].split()[4])
+                state_excite_Coeff = float(file_data[state_location_in_log[i]+j+5].split()[1])
+                row = (state_excite_Occ,state_excited_Vir,state_excite_Coeff)
+                tmp.append(row)
+            tmp = sorted(tmp, key=lambda term: (abs(term[2]), term[2]), reverse=True)
+            state_transt.append(tmp)
+            state_transt_dominant.append(tmp[0])
+        step = il+6
+    elif l_tds or l_tdt:
+        for i in [*range(nstate)]:
+            tmp = 0
+            state_transt.append(tmp)
+            state_transt_dominant.append(tmp)
+        step = il+4; mrs = True
+
+    k = 0
+    iS = 1
+    iStmp = iS
+    while k <= nstate:
+        if int(file_data[step+k].split()[0]) == 0:
+            total_energy_Hartree = float(file_data[step+k].split()[2])
+            if k==nstate:
+                break
+            else:
+                k+=1
+        number_of_state = iStmp
+        if number_of_state==1:
+            GS = float(file_data[step+k].split()[2])
+        k+=1
+        iStmp += 1
+
+    k = 0
+    j = 0
+    while k <= nstate:
+        if int(file_data[step+k].split()[0]) == 0:
+            if k==nstate:
+                break
+            else:
+                k+=1
+
+        number_of_state = iS
 
-    scftype = ''
-    dfttype = ''
-    dtcam = ''
+        if l_mrsfs or l_mrsft:
+            state_symmetry = str(file_data[step+k].split()[1])
+            state_energy_Hartree = float(file_data[step+k].split()[2])
+            state_energy_eV_GS = (state_energy_Hartree-GS)*27.2107
+            state_squared_S = float(file_data[step+k].split()[4])
+            state_transition_dipole_x = float(file_data[step+k].split()[5])
+            state_transition_dipole_y = float(file_data[step+k].split()[6])
+            state_transition_dipole_z = float(file_data[step+k].split()[7])
+            state_oscillator_strength = float(file_data[step+k].split()[8])
+        elif l_tds or l_tdt:
+            if l_tds: state_squared_S = 0.0
+            if l_tdt: state_squared_S = 2.0
+            kk = k-1
+            state_symmetry = str(file_data[step+kk].split()[1])
+            state_energy_Hartree = float(file_data[step+kk].split()[2])
+            state_energy_eV_GS = (state_energy_Hartree-total_energy_Hartree)*27.2107
+            if int(file_data[step+kk].split()[0]) == 0:
+                state_transition_dipole_x = 0.0
+                state_transition_dipole_y = 0.0
+                state_transition_dipole_z = 0.0
+                state_oscillator_strength = 0.0
+            else:
+                state_transition_dipole_x = float(file_data[step+kk].split()[4])
+                state_transition_dipole_y = float(file_data[step+kk].split()[5])
+                state_transition_dipole_z = float(file_data[step+kk].split()[6])
+                state_oscillator_strength = float(file_data[step+kk].split()[7])
+        elif l_sf:
+            state_symmetry = str(file_data[step+k].split()[1])
+            state_energy_Hartree = float(file_data[step+k].split()[2])
+            state_energy_eV_GS = (state_energy_Hartree-GS)*27.2107
+            state_squared_S = float(file_data[step+k].split()[4])
+            state_transition_dipole_x = ''
+            state_transition_dipole_y = ''
+            state_transition_dipole_z = ''
+            state_oscillator_strength = ''
+
+        if dtcam !='':
+            dfttype = dtcam
+        else:
+            dfttype = dfttype.upper()
+
+        row = (scftype.upper(),
+               dfttype,
+               tddft_out,
+               basis_out,
+               molecule,
+               number_of_state,
+               state_energy_eV_GS,
+               state_energy_Hartree,
+               state_symmetry,
+               str(state_transt_dominant[j]),
+               state_squared_S,
+               str(state_transt[j]),
+               state_transition_dipole_x,
+               state_transition_dipole_y,
+               state_transition_dipole_z,
+               state_oscillator_strength,
+               number_of_bf,
+               mol_symmetry,
+               total_energy_Hartree,
+               index,
+               mrsf_hf,
+               mrsf_betac,
+               mrsf_aee,
+               mrsf_beta,
+               mrsf_spc,
+               file_name,
+               )
+
+        summary_table.append( row )
+        iS += 1
+        k += 1
+        j += 1
+    d['dfttype'] = dfttype
+    d['total_energy_Hartree'] = total_energy_Hartree
+
+LOG_PARSER = LogParser()
+LOG_PARSER.on("mrsoc=.t.", _mrsoc)
+LOG_PARSER.on("TDDFT INPUT PARAMETERS", _tddft_parameters)
+LOG_PARSER.on("input card> $data", _data_card, ignore_case=True)
+LOG_PARSER.on("NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS", _number_of_bf)
+LOG_PARSER.on("TOTAL NUMBER OF MOS IN VARIATION", _number_of_bf)
+LOG_PARSER.on("SOME STATE SYMMETRY LABELS MAY NOT BE CORRECTLY PRINTED BELOW", _non_abel)
+LOG_PARSER.on("CAM-MRSF", _cam)
+LOG_PARSER.on("FITTING PARAMETERS OF MRSF RESPONSE CALCULATION", _fitting_parameters)
+LOG_PARSER.on("SUMMARY OF", _summary)
+
+def Extract_data(file_name,index):
     tddft_out = ''
-    basis_out = ''
-    molecule = ''
-    number_of_state = 0
-    state_energy_eV_GS = 0.0
-    state_symmetry = ''
-    state_squared_S = 0.0
-    state_transition_dipole_x = 0.0
-    state_transition_dipole_y = 0.0
-    state_transition_dipole_z = 0.0
-    state_oscillator_strength = 0.0
-    mol_symmetry = ''
-    number_of_bf = 0
-    mrsf_betac = 0.0
-    mrsf_hf = 0.0
-    mrsf_aee = 0.0
-    mrsf_beta = 0.0
-    mrsf_spc = 0.0
-    number_of_bf = 0
-#   file_name = ''
-
-    summary_table = []
-
-    scftype, tddft, molecule, basis_out, dfttype = extract_basis(file)
+
+    scftype, tddft, molecule, basis_out, dfttype = extract_basis(file_name)
 
     l_mrsfs = False
     l_mrsft = False
@@ -95,217 +282,41 @@ def Extract_data(file_name,index):
         tddft_out = "TDDFT_triplet"
         l_tdt = True
 
-    total_energy_Hartree = 0.0
-    state_energy_Hartree = 0.0
-    state_location_in_log = []
-    range_of_transitions = []
-    state_transt_dominant = []
-    state_transt = []
-    nstate = 0
-    non_abel = False
-    camflag = False
-    flagsoc = False
-    for il, l in enumerate(file_data):
-
-        if "mrsoc=.t." in l:
-            flagsoc = True
-
-        if "TDDFT INPUT PARAMETERS" in l:
-            nstate = int(file_data[il+2].split()[1])
-            if flagsoc:
-                nstate = nstate*2
-
-        if "INPUT CARD> $DATA" in l.lower():
-            mol_symmetry = str(file_data[il+2].split()[2])
-
-        if "NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS" in l:
-            number_of_bf = int(file_data[il].split()[7])
-
-        elif "TOTAL NUMBER OF MOS IN VARIATION" in l:
-            number_of_bf = int(file_data[il].split()[7])
-
-        elif "SOME STATE SYMMETRY LABELS MAY NOT BE CORRECTLY PRINTED BELOW" in l:
-            non_abel = True
-        if "CAM-MRSF" in l:
-            camflag = True
-
-        states = range(1,nstate+1)
-        for i in states:
-            length = 4
-            step = int(length-len(str(i)))
-            if "STATE #"+' '*step+str(i)+"  ENERGY" in l:
-                state_location_in_log.append(int(il))
-
-#        if l_mrsfs or l_mrsft:
-#            if "SPIN-PAIRING COUPLINGS" in l:
-#                mrsf_hf = float(file_data[il+2].split()[0])
-#                mrsf_aee = float(file_data[il+2].split()[1])
-#                mrsf_spc = float(file_data[il+2].split()[2])
+    d = {'file_name': file_name,
+         'index': index,
+         'scftype': scftype,
+         'dfttype': dfttype,
+         'dtcam': '',
+         'tddft_out': tddft_out,
+         'basis_out': basis_out,
+         'molecule': molecule,
+         'l_mrsfs': l_mrsfs,
+         'l_mrsft': l_mrsft,
+         'l_sf': l_sf,
+         'l_tds': l_tds,
+         'l_tdt': l_tdt,
+         'mol_symmetry': '',
+         'number_of_bf': 0,
+         'mrsf_betac': 0.0,
+         'mrsf_hf': 0.0,
+         'mrsf_aee': 0.0,
+         'mrsf_beta': 0.0,
+         'mrsf_spc': 0.0,
+         'total_energy_Hartree': 0.0,
+         'range_of_transitions': [],
+         'state_transt_dominant': [],
+         'state_transt': [],
+         'summary_table': [],
+         'nstate': 0,
+         'non_abel': False,
+         'camflag': False,
+         'flagsoc': False,
+         }
+    log = ParsedLog(file_name, 'ISO-8859-1')
+    d['sections'] = log.index
+    log.parse(LOG_PARSER, d)
+    return d['summary_table']
 
-        if l_mrsfs or l_mrsft:
-            if "FITTING PARAMETERS OF MRSF RESPONSE CALCULATION" in l:
-                if camflag:
-                    mrsf_aee = float(file_data[il+2].split()[1])
-                    mrsf_beta = float(file_data[il+2].split()[2])
-                    mrsf_hf = float(file_data[il+8].split()[1])
-                    mrsf_betac = float(file_data[il+8].split()[2])
-                    mrsf_spc = float(file_data[il+5].split()[2])
-                    dtcam = str('%4.2f' % mrsf_hf)+','+str('%4.2f' % mrsf_betac)+'/'+str('%4.2f' % mrsf_aee)+','+str('%4.2f' % mrsf_beta)
-                else:
-                    mrsf_aee = float(file_data[il+2].split()[0])
-                    mrsf_spc = float(file_data[il+5].split()[2])
-                    mrsf_hf = float(file_data[il+8].split()[0])
-
-        if "SUMMARY OF" in l:
-            step = 0; mrs = False
-            if l_mrsfs or l_mrsft:
-                for i in [*range(nstate-1)]:
-                    step = state_location_in_log[i+1]-state_location_in_log[i]-6
-                    range_of_transitions.append(int(step))
-                if non_abel:
-                    range_of_transitions.append(int(il-state_location_in_log[nstate-1]-11))
-                else:
-                    range_of_transitions.append(int(il-state_location_in_log[nstate-1]-7))
-                for i in [*range(nstate)]:
-                    tmp = []
-                    for j in [*range(range_of_transitions[i])]:
-                        state_excite_Occ = int(file_data[state_location_in_log[i]+j+5].split()[2])
-                        state_excited_Vir = int(file_data[state_location_in_log[i]+j+5].split()[4])
-                        state_excite_Coeff = float(file_data[state_location_in_log[i]+j+5].split()[1])
-                        row = (state_excite_Occ,state_excited_Vir,state_excite_Coeff)
-                        tmp.append(row)
-                    tmp = sorted(tmp, key=lambda term: (abs(term[2]), term[2]), reverse=True)
-                    state_transt.append(tmp)
-                    state_transt_dominant.append(tmp[0])
-                step = il+7; mrs = True
-            elif l_sf:
-                for i in [*range(nstate-1)]:
-                    step = state_location_in_log[i+1]-state_location_in_log[i]-6
-                    range_of_transitions.append(int(step))
-                if non_abel:
-                    range_of_transitions.append(int(il-state_location_in_log[nstate-1]-11))
-                else:
-                    range_of_transitions.append(int(il-state_location_in_log[nstate-1]-7))
-                for i in [*range(nstate)]:
-                    tmp = []
-                    for j in [*range(range_of_transitions[i])]:
-                        state_excite_Occ = int(file_data[state_location_in_log[i]+j+5].split()[2])
-                        state_excited_Vir = int(file_data[state_location_in_log[i]+j+5].split()[4])
-                        state_excite_Coeff = float(file_data[state_location_in_log[i]+j+5].split()[1])
-                        row = (state_excite_Occ,state_excited_Vir,state_excite_Coeff)
-                        tmp.append(row)
-                    tmp = sorted(tmp, key=lambda term: (abs(term[2]), term[2]), reverse=True)
-                    state_transt.append(tmp)
-                    state_transt_dominant.append(tmp[0])
-                step = il+6
-            elif l_tds or l_tdt:
-                for i in [*range(nstate)]:
-                    tmp = 0
-                    state_transt.append(tmp)
-                    state_transt_dominant.append(tmp)
-                step = il+4; mrs = True
-
-            k = 0
-            iS = 1
-            iStmp = iS
-            while k <= nstate:
-                if int(file_data[step+k].split()[0]) == 0:
-                    total_energy_Hartree = float(file_data[step+k].split()[2])
-                    if k==nstate:
-                        break
-                    else:
-                        k+=1
-                number_of_state = iStmp
-                if number_of_state==1:
-                    GS = float(file_data[step+k].split()[2])
-                k+=1
-                iStmp += 1
-
-            k = 0
-            j = 0
-            while k <= nstate:
-                if int(file_data[step+k].split()[0]) == 0:
-                    if k==nstate:
-                        break
-                    else:
-                        k+=1
-
-                number_of_state = iS
-
-                if l_mrsfs or l_mrsft:
-                    state_symmetry = str(file_data[step+k].split()[1])
-                    state_energy_Hartree = float(file_data[step+k].split()[2])
-                    state_energy_eV_GS = (state_energy_Hartree-GS)*27.2107
-                    state_squared_S = float(file_data[step+k].split()[4])
-                    state_transition_dipole_x = float(file_data[step+k].split()[5])
-                    state_transition_dipole_y = float(file_data[step+k].split()[6])
-                    state_transition_dipole_z = float(file_data[step+k].split()[7])
-                    state_oscillator_strength = float(file_data[step+k].split()[8])
-                elif l_tds or l_tdt:
-                    if l_tds: state_squared_S = 0.0
-                    if l_tdt: state_squared_S = 2.0
-                    kk = k-1
-                    state_symmetry = str(file_data[step+kk].split()[1])
-                    state_energy_Hartree = float(file_data[step+kk].split()[2])
-                    state_energy_eV_GS = (state_energy_Hartree-total_energy_Hartree)*27.2107
-                    if int(file_data[step+kk].split()[0]) == 0:
-                        state_transition_dipole_x = 0.0
-                        state_transition_dipole_y = 0.0
-                        state_transition_dipole_z = 0.0
-                        state_oscillator_strength = 0.0
-                    else:
-                        state_transition_dipole_x = float(file_data[step+kk].split()[4])
-                        state_transition_dipole_y = float(file_data[step+kk].split()[5])
-                        state_transition_dipole_z = float(file_data[step+kk].split()[6])
-                        state_oscillator_strength = float(file_data[step+kk].split()[7])
-                elif l_sf:
-                    state_symmetry = str(file_data[step+k].split()[1])
-                    state_energy_Hartree = float(file_data[step+k].split()[2])
-                    state_energy_eV_GS = (state_energy_Hartree-GS)*27.2107
-                    state_squared_S = float(file_data[step+k].split()[4])
-                    state_transition_dipole_x = ''
-                    state_transition_dipole_y = ''
-                    state_transition_dipole_z = ''
-                    state_oscillator_strength = ''
-
-                if dtcam !='':
-                    dfttype = dtcam
-                else:
-                    dfttype = dfttype.upper()
-
-                row = (scftype.upper(),
-                       dfttype,
-                       tddft_out,
-                       basis_out,
-                       molecule,
-                       number_of_state,
-                       state_energy_eV_GS,
-                       state_energy_Hartree,
-                       state_symmetry,
-                       str(state_transt_dominant[j]),
-                       state_squared_S,
-                       str(state_transt[j]),
-                       state_transition_dipole_x,
-                       state_transition_dipole_y,
-                       state_transition_dipole_z,
-                       state_oscillator_strength,
-                       number_of_bf,
-                       mol_symmetry,
-                       total_energy_Hartree,
-                       index,
-                       mrsf_hf,
-                       mrsf_betac,
-                       mrsf_aee,
-                       mrsf_beta,
-                       mrsf_spc,
-                       file_name,
-                       )
-
-                summary_table.append( row )
-                iS += 1
-                k += 1
-                j += 1
-    return summary_table
 
 def extract_basis(file):
 #    uhf_mrsf_thymine_acct_bhhlyp.log
@@ -7,6 +7,12 @@ import os
 import re
 from typing import Any, Dict, List, Optional, Union
 
+from log_cache import MISS, LogCache, stamp
+from mapped_log import MappedLog, finditer, search
+
+# Bump when the extracted results change, to invalidate cached ones.
+CACHE_VERSION = '1'
+
 
 class ResultExtractor:
     """Extracts and structures Molcas calculation results from log files."""
@@ -14,6 +20,7 @@ class ResultExtractor:
     def __init__(self, config: Dict):
         """Initialize the ResultExtractor with configuration settings."""
         self.config = config
+        self.cache: Optional[LogCache] = config.get('log cache')
         self.results: Dict[str, Dict[str, List[Dict[str, float]]]] = {
             "calculations": {}
         }
@@ -36,7 +43,8 @@ class ResultExtractor:
         match = re.search(r'= ([\d.]+) Bboohhrr', xyz_content)
         return float(match.group(1)) if match else None
 
-    def extract_energy_molcas(self, log_content: str, calc_type: str) -> Optional[float]:
+    def extract_energy_molcas(self, log_content: Union[str, MappedLog],
+                              calc_type: str) -> Optional[float]:
         """Extract energy value for a specific calculation type."""
         patterns = {
             'hf': r'::    Total SCF energy\s+([-\d.]+)',
@@ -44,10 +52,10 @@ class ResultExtractor:
             'casscf': r'::    RASSCF root number  1 Total energy:\s+([-\d.]+)',
             'caspt2': r'::    CASPT2 Root  1     Total energy:\s+([-\d.]+)'
         }
-        match = re.search(patterns[calc_type], log_content)
+        match = search(patterns[calc_type], log_content)
         return float(match.group(1)) if match else None
 
-    def extract_cp2k_energies(self, log_content: str) -> Dict[str, float]:
+    def extract_cp2k_energies(self, log_content: Union[str, MappedLog]) -> Dict[str, float]:
         """Extract energy components from CP2K log content."""
         energy_patterns = {
             "Overlap energy": r"Overlap energy of the core charge distribution:\s+([-\d.]+)",
@@ -59,12 +67,13 @@ class ResultExtractor:
         }
         energies = {}
         for key, pattern in energy_patterns.items():
-            match = re.search(pattern, log_content)
+            match = search(pattern, log_content)
             if match:
                 energies[key] = float(match.group(1))
         return energies
 
-    def extract_fragment_scf_data(self, log_content: str) -> Dict[str, List[Dict[str, float]]]:
+    def extract_fragment_scf_data(self, log_content: Union[str, MappedLog]
+                                  ) -> Dict[str, List[Dict[str, float]]]:
         fragment_scf_data: Dict[str, List[Dict[str, float]]] = {}
         patterns = {
             'Steps': r'\*\*\* SCF run converged in\s+(\d+) steps \*\*\*',
@@ -77,13 +86,12 @@ class ResultExtractor:
             'Cube file': r'The electron density is written in cube file format to the file:\s*([\w.-]+)'
         }
 
-        scf_block_pattern = re.compile(
+        scf_block_pattern = (
             r'\*\*\* SCF run converged.*?'
-            r'(Mulliken Population Analysis)',
-            re.DOTALL
+            r'(Mulliken Population Analysis)'
         )
 
-        for scf_block in scf_block_pattern.finditer(log_content):
+        for scf_block in finditer(scf_block_pattern, log_content, re.DOTALL):
             scf_data = {}
             block_content = scf_block.group(0)
 
@@ -113,11 +121,11 @@ class ResultExtractor:
                 return os.path.join(directory, file)
         return None
 
-    def extract_scf_data(self, log_content: str) -> List[Dict[str, float]]:
+    def extract_scf_data(self, log_content: Union[str, MappedLog]) -> List[Dict[str, float]]:
         """Extract SCF data for FAT calculations."""
         scf_data = []
         pattern = r'FAT\|\s+(\d+),\s+(\d+),\s+(\d+),\s+(\d+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+),\s+([-\d.]+)'
-        matches = re.finditer(pattern, log_content)
+        matches = finditer(pattern, log_content)
         for match in matches:
             scf_data.append({
                 'i_iter': int(match.group(1)),
@@ -152,7 +160,8 @@ class ResultExtractor:
 
         return frag_energies
 
-    def extract_fat_energy_contributions(self, log_content: str) -> Dict[str, Union[float, List[float]]]:
+    def extract_fat_energy_contributions(self, log_content: Union[str, MappedLog]
+                                         ) -> Dict[str, Union[float, List[float]]]:
         """Extract energy contributions for FAT calculations."""
         contributions: Dict[str, Union[float, List[float]]] = {}
         patterns = {
@@ -166,7 +175,7 @@ class ResultExtractor:
         }
 
         for energy_type, pattern in patterns.items():
-            matches = re.finditer(pattern, log_content)
+            matches = finditer(pattern, log_content)
             for match in matches:
                 if energy_type in ['self energy', 'emb energy']:
                     key = f"{energy_type} frag {match.group(1)}"
@@ -196,20 +205,22 @@ class ResultExtractor:
 
         return contributions
 
-    def extract_energy_cp2k(self, log_content: str) -> Optional[float]:
+    def extract_energy_cp2k(self, log_content: Union[str, MappedLog]) -> Optional[float]:
         """Extract energy value for a specific calculation type."""
         pattern = r'ENERGY\| Total FORCE_EVAL \( FAT \) energy \[a\.u\.\]:\s+([-\d.]+)'
-        match = re.search(pattern, log_content)
+        match = search(pattern, log_content)
         return float(match.group(1)) if match else None
 
-    def extract_forces(self, log_content: str) -> List[List[float]]:
-        """Extract forces from log content."""
+    def extract_forces(self, log_content: Union[str, MappedLog]) -> List[List[float]]:
+        """Extract forces of the last force block from log content."""
         forces = []
-        blocks = log_content.split('ATOMIC FORCES in [a.u.]')[1:]
-        if not blocks:
+        marker = 'ATOMIC FORCES in [a.u.]'
+        start = log_content.rfind(marker)
+        if start < 0:
             return None
 
-        last_block = blocks[-1]
+        end = log_content.find('SUM OF ATOMIC FORCES', start)
+        last_block = log_content[start + len(marker):end if end >= 0 else None]
         in_forces = False
         for line in last_block.split('\n'):
             if 'SUM OF ATOMIC FORCES' in line:
@@ -231,12 +242,11 @@ class ResultExtractor:
         result: Dict[str, Union[float, str, None]] = {
             "logfile": os.path.abspath(log_file_path)
         }
-        with open(log_file_path, 'r', encoding="utf-8") as f:
-            log_content = f.read()
-        for calc_type in ['hf', 'dft', 'casscf', 'caspt2']:
-            energy = self.extract_energy_molcas(log_content, calc_type)
-            if energy is not None:
-                result[f"total energy {calc_type}"] = energy
+        with MappedLog(log_file_path) as log_content:
+            for calc_type in ['hf', 'dft', 'casscf', 'caspt2']:
+                energy = self.extract_energy_molcas(log_content, calc_type)
+                if energy is not None:
+                    result[f"total energy {calc_type}"] = energy
         return result
 
     def process_cp2k_fat_log(self, log_file_path: str) -> Dict[str, Any]:
@@ -246,25 +256,23 @@ class ResultExtractor:
         }
 
         try:
-            with open(log_file_path, 'r', encoding="utf-8") as f:
-                log_content = f.read()
-
-            # Extract base energy
-            energy = self.extract_energy_cp2k(log_content)
-            if energy is not None:
-                result["fat total energy"] = energy
-
-            # Extract SCF data with validation
-            scf_data = self.extract_scf_data(log_content)
-            if scf_data:
-                result["fat scf data"] = scf_data
-                result.update(self.extract_fat_energy_contributions(log_content))
-                result.update(self.extract_fragment_energies_after_scf(scf_data))
-                result.update(self.extract_fragment_scf_data(log_content))
+            with MappedLog(log_file_path) as log_content:
+                # Extract base energy
+                energy = self.extract_energy_cp2k(log_content)
+                if energy is not None:
+                    result["fat total energy"] = energy
 
-            forces = self.extract_forces(log_content)
-            if forces:
-                result["forces"] = forces
+                # Extract SCF data with validation
+                scf_data = self.extract_scf_data(log_content)
+                if scf_data:
+                    result["fat scf data"] = scf_data
+                    result.update(self.extract_fat_energy_contributions(log_content))
+                    result.update(self.extract_fragment_energies_after_scf(scf_data))
+                    result.update(self.extract_fragment_scf_data(log_content))
+
+                forces = self.extract_forces(log_content)
+                if forces:
+                    result["forces"] = forces
 
             # Process Molcas log if exists
             molcas_log = self.find_molcas_log(os.path.dirname(log_file_path))
@@ -280,13 +288,11 @@ class ResultExtractor:
     def process_molcas_data(self, log_path: str, result: Dict[str, Any]) -> None:
         """Process Molcas log data and update results."""
         try:
-            with open(log_path, 'r', encoding="utf-8") as f:
-                content = f.read()
-
-            for calc_type in ['hf', 'dft', 'casscf', 'caspt2']:
-                energy = self.extract_energy_molcas(content, calc_type)
-                if energy is not None:
-                    result[f"wf total energy {calc_type}"] = energy
+            with MappedLog(log_path) as content:
+                for calc_type in ['hf', 'dft', 'casscf', 'caspt2']:
+                    energy = self.extract_energy_molcas(content, calc_type)
+                    if energy is not None:
+                        result[f"wf total energy {calc_type}"] = energy
         except Exception as e:
             self.logger.error(f"Error processing Molcas log {log_path}: {str(e)}")
 
@@ -295,13 +301,6 @@ class ResultExtractor:
         result: Dict[str, Any] = {
             "logfile": os.path.abspath(log_file_path)
         }
-        with open(log_file_path, 'r', encoding="utf-8") as f:
-            log_content = f.read()
-
-        forces = self.extract_forces(log_content)
-        if forces:
-            result["forces"] = forces
-
         energy_patterns = {
             "overlap energy": r"Overlap energy of the core charge distribution:\s+([-\d.]+)",
             "self energy": r"Self energy of the core charge distribution:\s+([-\d.]+)",
@@ -311,11 +310,33 @@ class ResultExtractor:
             "total energy": r"Total energy:\s+([-\d.]+)",
         }
 
-        for key, pattern in energy_patterns.items():
-            match = re.search(pattern, log_content)
-            if match:
-                result[key] = float(match.group(1))
+        with MappedLog(log_file_path) as log_content:
+            forces = self.extract_forces(log_content)
+            if forces:
+                result["forces"] = forces
 
+            for key, pattern in energy_patterns.items():
+                match = search(pattern, log_content)
+                if match:
+                    result[key] = float(match.group(1))
+
+        return result
+
+    def cached(self, extractor: str, process, log_file_path: str,
+               depends: Optional[List[str]] = None) -> Dict[str, Any]:
+        """process(log_file_path), from the log cache if the log is unchanged.
+
+        Results with an error are not cached.
+        """
+        if self.cache is None:
+            return process(log_file_path)
+        depends = depends or []
+        result = self.cache.get(log_file_path, extractor, CACHE_VERSION, depends)
+        if result is MISS:
+            key = stamp(log_file_path, CACHE_VERSION, depends)
+            result = process(log_file_path)
+            if "error" not in result:
+                self.cache.put(log_file_path, extractor, CACHE_VERSION, result, key=key)
         return result
 
     def process_directory(self, directory: str):
@@ -347,7 +368,7 @@ class ResultExtractor:
         for file in os.listdir(directory):
             if file.endswith('.log'):
                 log_file_path = os.path.join(directory, file)
-                result = self.process_cp2k_log(log_file_path)
+                result = self.cached('get_energy cp2k', self.process_cp2k_log, log_file_path)
                 result["distance"] = distance
                 result["parent dir"] = parent_dir
                 if calc_type not in self.results["calculations"]:
@@ -359,7 +380,10 @@ class ResultExtractor:
         for file in os.listdir(directory):
             if file.endswith('.log'):
                 log_file_path = os.path.join(directory, file)
-                result = self.process_cp2k_fat_log(log_file_path)
+                # The Molcas log of the directory is read too.
+                molcas_log = self.find_molcas_log(directory)
+                result = self.cached('get_energy fat', self.process_cp2k_fat_log, log_file_path,
+                                     [molcas_log] if molcas_log else None)
                 result["distance"] = distance
                 result["parent dir"] = parent_dir
                 if calc_type not in self.results["calculations"]:
@@ -371,7 +395,7 @@ class ResultExtractor:
         for file in os.listdir(directory):
             if file.endswith('.log'):
                 log_file_path = os.path.join(directory, file)
-                result = self.process_molcas_log(log_file_path)
+                result = self.cached('get_energy molcas', self.process_molcas_log, log_file_path)
                 result["distance"] = distance
                 result["parent dir"] = parent_dir
                 if calc_type not in self.results["calculations"]:
@@ -399,6 +423,11 @@ def parse_args():
         default=None,
         help="specific folder of calculation"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="parse every log again, do not use the log cache"
+    )
     return parser.parse_args()
 
 
@@ -413,11 +442,14 @@ def main():
     config = {
         "root dir": args.input,
         "output file": "results.json",
-        "spec": args.spec
+        "spec": args.spec,
+        "log cache": None if args.no_cache else LogCache()
     }
     extractor = ResultExtractor(config)
     extractor.process_directory(config["root dir"])
     extractor.save_results(config["output file"])
+    if config["log cache"] is not None:
+        config["log cache"].close()
 
 
 if __name__ == "__main__":
@@ -12,52 +12,19 @@ import numpy as np
 import argparse
 import csv
 
+from gms_log_parser import ParsedLog
+from gms_orbitals import (iorder_block, mo_set, normalize, permutation_row,
+                          track_orbitals)
+
 def Extract_data(file_name):
-    f = open(file_name, 'r')
-    file_data = f.readlines()
-    f.close()
-
-    Ca, energy = [], []
-    n_bf = 0
-    for il, l in enumerate(file_data):
-        if "NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS" in l:
-            n_bf=int(file_data[il].split()[7])
-            Ca = np.zeros((n_bf,n_bf))
-            energy = np.zeros(n_bf)
-        if "NUMBER OF ELECTRONS" in l:
-            n_homo=int(file_data[il].split()[4])/2-1
-
-        if "EIGENVECTORS" in l:
-            shift_Ca = 6 # see log file
-            shift_energy = 4 # see log file
-            matrix_range = []
-            for i in range(n_bf//5):
-                matrix_range.append(5)
-            matrix_range.append(n_bf%5)
-            imain = 0
-            for isection in range(np.size(matrix_range)):
-                section_line_Ca = il+shift_Ca+isection*(n_bf+shift_Ca-2) # Ca start line of section in log file
-                section_line_E = il+shift_energy+isection*(n_bf+shift_Ca-2) # Energy start line of section in log file
-                for icolumn in range(matrix_range[isection]):
-                    energy[imain] = file_data[section_line_E].split()[icolumn]
-                    iline = 0
-                    while iline < n_bf:
-                        Ca[iline][imain] = file_data[iline+section_line_Ca].split()[icolumn+4] # 4 is a shift, see log file
-                        iline+=1
-                    imain += 1
+    log = ParsedLog(file_name)
+    n_homo = log.token("NUMBER OF ELECTRONS", 0, 4, int, last=True)/2-1
+    Ca, energy = mo_set(log, "EIGENVECTORS")
 
     return Ca, energy, n_homo
 
 def get_overlap(C_a, C_b):
-        Ca = C_a.T
-        for i, c in enumerate(Ca):
-            Ca[i] /= np.sqrt(np.dot(Ca[i], Ca[i]))
-        Cb = C_b.T
-        for i, c in enumerate(Cb):
-            Cb[i] /= np.sqrt(np.dot(Cb[i], Cb[i]))
-
-        overlap = Cb @ Ca.T
-        return overlap
+        return normalize(C_b).T @ normalize(C_a)
 
 def command_line_args():
 
@@ -65,12 +32,30 @@ def command_line_args():
     parser.add_argument('-i', '--input',
                         type=str,
                         help='Provide the list of input.log files')
+    parser.add_argument('--track', action='store_true',
+                        help='Follow the orbitals along the whole list '
+                             'and print one permutation per step')
     return parser.parse_args()
 
+def print_tracking(files):
+    print(' Step  Moved  Min Overlap  <0.9  Log')
+    orders = []
+    for step, (file_name, sets) in enumerate(track_orbitals(files), 1):
+        order, overlap, energy = sets["EIGENVECTORS"]
+        print(permutation_row(step, file_name, order, overlap))
+        orders.append((step, file_name, order))
+    for step, file_name, order in orders:
+        if (order != np.arange(len(order))).any():
+            print('\n', "Orbitals rearrange recommendation, step", step, file_name)
+            print(iorder_block(order), end='')
+
 if __name__ == '__main__':
 
     arg = command_line_args()
     files = open(arg.input,"r").read().splitlines()
+    if arg.track:
+        print_tracking(files)
+        sys.exit()
 
     n_orb = 1000
 
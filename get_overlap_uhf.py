@@ -12,74 +12,20 @@ import numpy as np
 import argparse
 import csv
 
+from gms_log_parser import ParsedLog
+from gms_orbitals import (iorder_block, mo_set, normalize, permutation_row,
+                          track_orbitals)
+
 def Extract_data(file_name):
-    f = open(file_name, 'r')
-    file_data = f.readlines()
-    f.close()
-
-    Ca, energy = [], []
-    n_bf = 0
-    for il, l in enumerate(file_data):
-        if "NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS" in l:
-            n_bf=int(file_data[il].split()[7])
-            Ca = np.zeros((n_bf,n_bf))
-            Cb = np.zeros((n_bf,n_bf))
-            energy_a = np.zeros(n_bf)
-            energy_b = np.zeros(n_bf)
-        if "NUMBER OF ELECTRONS" in l:
-            n_homo=int(file_data[il].split()[4])/2-1
-
-        if "- ALPHA SET" in l:
-            shift_Ca = 9 # see log file
-            shift_energy_a = 7 # see log file
-            matrix_range = []
-            for i in range(n_bf//5):
-                matrix_range.append(5)
-            matrix_range.append(n_bf%5)
-            imain = 0
-            for isection in range(np.size(matrix_range)):
-                section_line_Ca = il+shift_Ca+isection*(n_bf+shift_Ca-5) # Ca start line of section in log file
-                section_line_Ea = il+shift_energy_a+isection*(n_bf+shift_Ca-5) # Energy start line of section in log file
-                for icolumn in range(matrix_range[isection]):
-                    energy_a[imain] = file_data[section_line_Ea].split()[icolumn]
-                    iline = 0
-                    while iline < n_bf:
-                        Ca[iline][imain] = file_data[iline+section_line_Ca].split()[icolumn+4] # 4 is a shift, see log file
-                        iline+=1
-                    imain += 1
-        if "- BETA SET" in l:
-            shift_Cb = 9 # see log file
-            shift_energy_b = 7 # see log file
-            matrix_range = []
-            for i in range(n_bf//5):
-                matrix_range.append(5)
-            matrix_range.append(n_bf%5)
-            imain = 0
-            for isection in range(np.size(matrix_range)):
-                section_line_Cb = il+shift_Cb+isection*(n_bf+shift_Cb-5) # Ca start line of section in log file
-                section_line_Eb = il+shift_energy_b+isection*(n_bf+shift_Cb-5) # Energy start line of section in log file
-                print(file_data[section_line_Cb])
-                print(file_data[section_line_Eb])
-                for icolumn in range(matrix_range[isection]):
-                    energy_b[imain] = file_data[section_line_Eb].split()[icolumn]
-                    iline = 0
-                    while iline < n_bf:
-                        Cb[iline][imain] = file_data[iline+section_line_Cb].split()[icolumn+4] # 4 is a shift, see log file
-                        iline+=1
-                    imain += 1
+    log = ParsedLog(file_name)
+    n_homo = log.token("NUMBER OF ELECTRONS", 0, 4, int, last=True)/2-1
+    Ca, energy_a = mo_set(log, "- ALPHA SET")
+    Cb, energy_b = mo_set(log, "- BETA SET")
 
     return Ca, Cb, energy_a, energy_b, n_homo
 
 def get_overlap(C_a, C_b):
-        Ca = C_a.T
-        for i, c in enumerate(Ca):
-            Ca[i] /= np.sqrt(np.dot(Ca[i], Ca[i]))
-        Cb = C_b.T
-        for i, c in enumerate(Cb):
-            Cb[i] /= np.sqrt(np.dot(Cb[i], Cb[i]))
-
-        overlap = Cb @ Ca.T
-        return overlap
+        return normalize(C_b).T @ normalize(C_a)
 
 def command_line_args():
 
@@ -87,12 +33,32 @@ def command_line_args():
     parser.add_argument('-i', '--input',
                         type=str,
                         help='Provide the list of input.log files')
+    parser.add_argument('--track', action='store_true',
+                        help='Follow the orbitals along the whole list '
+                             'and print one permutation per step')
     return parser.parse_args()
 
+def print_tracking(files):
+    print(' Step  Moved  Min Overlap  <0.9  Log')
+    orders = []
+    anchors = ("- ALPHA SET", "- BETA SET")
+    for step, (file_name, sets) in enumerate(track_orbitals(files, anchors), 1):
+        for anchor in anchors:
+            order, overlap, energy = sets[anchor]
+            print(permutation_row(step, f"{file_name} {anchor.split()[1].lower()}", order, overlap))
+        orders.append((step, file_name, sets[anchors[0]][0], sets[anchors[1]][0]))
+    for step, file_name, alpha, beta in orders:
+        if (alpha != np.arange(len(alpha))).any() or (beta != np.arange(len(beta))).any():
+            print('\n', "Orbitals rearrange recommendation, step", step, file_name)
+            print(iorder_block(alpha, beta), end='')
+
 if __name__ == '__main__':
 
     arg = command_line_args()
     files = open(arg.input,"r").read().splitlines()
+    if arg.track:
+        print_tracking(files)
+        sys.exit()
 
     n_orb = 1000
 
@@ -0,0 +1,448 @@
+""" Single-pass GAMESS log parsing engine shared by the extractors.
+A LogParser holds (anchor, handler) pairs. parse() compiles all anchors
+into one alternation regex and searches the text with it, so a line is
+only looked at when it contains an anchor; every handler whose anchor
+is in that line is then called as handler(out, il, state), in the order
+the handlers were registered. out is the list of log lines and il the
+line number, so the `out[il+k]` offsets of the old per-line loops carry
+over unchanged. Lines are those of str.splitlines(), as in those loops:
+besides '\n', form feeds, '\x85' and the other Unicode line breaks
+(common in ISO-8859-1 logs) end a line. A handler returning True skips
+the remaining handlers of the line, like `continue` did in those loops.
+parse_mapped() runs the same handlers over a MappedLog for logs too
+large to read whole; its lines are split the same way.
+"""
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from mapped_log import LINE_BREAKS, MappedLog
+
+Handler = Callable[[List[str], int, Dict[str, Any]], Optional[bool]]
+
+STATE_PATTERN = re.compile(r'STATE #( *)(\d+)  ENERGY')
+
+# Line breaks of str.splitlines(); OTHER_BREAKS are all but '\n'.
+LINE_BREAK = re.compile('|'.join(map(re.escape, LINE_BREAKS)))
+OTHER_BREAKS = re.compile('|'.join(re.escape(line_break) for line_break in LINE_BREAKS
+                                   if line_break != '\n'))
+
+# Section headers recorded by LogIndex, name -> regex.
+SECTIONS = {
+    'STATE #': STATE_PATTERN.pattern,
+    'SUMMARY OF': r'SUMMARY OF',
+    '$CONTRL OPTIONS': r'\$CONTRL OPTIONS',
+    'TDDFT INPUT PARAMETERS': r'TDDFT INPUT PARAMETERS',
+    'SPIN-PAIRING COUPLINGS': r'SPIN-PAIRING COUPLINGS',
+    'FITTING PARAMETERS': r'FITTING PARAMETERS OF MRSF RESPONSE CALCULATION',
+    'SOC COUPLINGS': r'SOC COUPLINGS \(OFF DIAGONAL ELEMENT\)',
+    'INPUT CARD> $DATA': r'(?i:input card> \$data)',
+}
+
+
+def line_counter(text: str) -> Callable[[int, int], int]:
+    """count(start, end): line breaks in text[start:end] as
+    str.splitlines() sees them; str.count('\n') if text has only '\n'."""
+    if OTHER_BREAKS.search(text) is None:
+        return lambda start, end: text.count('\n', start, end)
+    return lambda start, end: len(LINE_BREAK.findall(text, start, end))
+
+
+def next_line(text: str, pos: int) -> int:
+    """Start of the line after the one containing pos, -1 at the end."""
+    match = LINE_BREAK.search(text, pos)
+    return -1 if match is None else match.end()
+
+
+class LogParser:
+    """Dispatches the anchor lines of a log to registered handlers."""
+
+    def __init__(self):
+        self.handlers: List[Tuple[str, bool, Handler]] = []
+        self._pattern = None
+        self._bytes_pattern = None
+
+    def on(self, anchor: str, handler: Handler,
+           ignore_case: bool = False) -> 'LogParser':
+        """Call handler on every line containing anchor."""
+        self.handlers.append((anchor, ignore_case, handler))
+        self._pattern = None
+        self._bytes_pattern = None
+        return self
+
+    def pattern(self):
+        if self._pattern is None:
+            anchors = sorted({(anchor, ignore_case)
+                              for anchor, ignore_case, _ in self.handlers},
+                             key=lambda a: -len(a[0]))
+            self._pattern = re.compile('|'.join(
+                f"(?i:{re.escape(anchor)})" if ignore_case else re.escape(anchor)
+                for anchor, ignore_case in anchors))
+        return self._pattern
+
+    def _dispatch(self, out: List[str], il: int, state: Dict[str, Any]) -> None:
+        line = out[il]
+        lower = None
+        for anchor, ignore_case, handler in self.handlers:
+            if ignore_case:
+                if lower is None:
+                    lower = line.lower()
+                if anchor.lower() not in lower:
+                    continue
+            elif anchor not in line:
+                continue
+            if handler(out, il, state):
+                break
+
+    def parse(self, text: str, state: Dict[str, Any],
+              out: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Run the handlers over text, return the updated state.
+
+        out are the lines of text, if the caller already split it.
+        """
+        if out is None:
+            out = text.splitlines()
+        pattern = self.pattern()
+        count = line_counter(text)
+        pos = 0  # start of line il
+        il = 0
+        while True:
+            match = pattern.search(text, pos)
+            if match is None:
+                break
+            il += count(pos, match.start())
+            self._dispatch(out, il, state)
+            pos = next_line(text, match.end())
+            if pos < 0:
+                break
+            il += 1
+        return state
+
+    def parse_mapped(self, log: MappedLog, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the handlers over a MappedLog, return the updated state.
+
+        Handlers get the log's LineView as out, so only the lines they
+        read are decoded.
+        """
+        if self._bytes_pattern is None:
+            self._bytes_pattern = re.compile(self.pattern().pattern.encode())
+        buffer = log.buffer
+        out = log.lines
+        pos = 0  # start of line il
+        il = 0
+        while True:
+            match = self._bytes_pattern.search(buffer, pos)
+            if match is None:
+                break
+            il += log.count_lines(pos, match.start())
+            pos = log.line_start(match.start())
+            out.seek(il, pos)
+            self._dispatch(out, il, state)
+            pos = log.next_line(match.end())
+            if pos < 0:
+                break
+            il += 1
+        return state
+
+    def parse_file(self, file_name: str, state: Dict[str, Any],
+                   encoding: Optional[str] = None,
+                   mapped: bool = False) -> Dict[str, Any]:
+        """Run the handlers over a log file; mapped for very large logs."""
+        if mapped:
+            with MappedLog(file_name, encoding or 'utf-8', sequential=True) as log:
+                return self.parse_mapped(log, state)
+        return ParsedLog(file_name, encoding).parse(self, state)
+
+
+class LogIndex:
+    """Offsets and line numbers of the section headers of a log.
+
+    One regex pass over the text records every match of the SECTIONS
+    headers, so a table can be read by jumping to its header line
+    instead of testing every line. Offsets are character offsets of
+    a str and byte offsets of a MappedLog; line numbers are those of
+    splitlines() for a str and of its LineView for a MappedLog.
+    """
+
+    def __init__(self, text, sections: Optional[Dict[str, str]] = None):
+        sections = SECTIONS if sections is None else sections
+        names = list(sections)
+        self.sections: Dict[str, List[Tuple[int, int]]] = {name: [] for name in names}
+        # (line, number) of the 'STATE #   N  ENERGY' headers
+        self.states: List[Tuple[int, int]] = []
+
+        pattern = '|'.join(f"(?P<s{i}>{sections[name]})" for i, name in enumerate(names))
+        if isinstance(text, MappedLog):
+            matches = re.finditer(pattern.encode(), text.buffer)
+            count = text.count_lines
+        else:
+            matches = re.finditer(pattern, text)
+            count = line_counter(text)
+
+        pos = 0
+        line = 0
+        for match in matches:
+            line += count(pos, match.start())
+            pos = match.start()
+            name = names[int(match.lastgroup[1:])]
+            self.sections[name].append((pos, line))
+            if name == 'STATE #':
+                header = match.group(0)
+                state = STATE_PATTERN.match(header if isinstance(header, str)
+                                            else header.decode())
+                number = state.group(2)
+                if len(state.group(1)) == max(0, 4 - len(number)):
+                    self.states.append((line, int(number)))
+
+    def offsets(self, name: str) -> List[int]:
+        """Offsets of the headers called name."""
+        return [offset for offset, _ in self.sections[name]]
+
+    def lines(self, name: str) -> List[int]:
+        """Line numbers of the headers called name."""
+        return [line for _, line in self.sections[name]]
+
+    def first(self, name: str) -> Optional[int]:
+        """Line number of the first header called name."""
+        return self.sections[name][0][1] if self.sections[name] else None
+
+    def state_lines(self, nstate: int, before: Optional[int] = None) -> List[int]:
+        """Lines of the 'STATE #' headers of states 1..nstate, in log
+        order, above line before."""
+        return [line for line, number in self.states
+                if 1 <= number <= nstate and (before is None or line < before)]
+
+
+class ParsedLog:
+    """A log file read once; its lines and fields are built on first use.
+
+    Extractors that need several values of the same log take a ParsedLog
+    instead of a file name, so the file is not re-read for every value.
+    """
+
+    def __init__(self, file_name: str, encoding: Optional[str] = None):
+        self.file_name = file_name
+        self.encoding = encoding
+        self._text: Optional[str] = None
+        self._out: Optional[List[str]] = None
+        self._count: Optional[Callable[[int, int], int]] = None
+        self._index: Optional[LogIndex] = None
+        self.fields: Dict[Any, Any] = {}
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            with open(self.file_name, 'r', encoding=self.encoding) as f:
+                self._text = f.read()
+        return self._text
+
+    @property
+    def out(self) -> List[str]:
+        if self._out is None:
+            self._out = self.text.splitlines()
+        return self._out
+
+    @property
+    def index(self) -> LogIndex:
+        if self._index is None:
+            self._index = LogIndex(self.text)
+        return self._index
+
+    def line_of(self, anchor: str, last: bool = False) -> Optional[int]:
+        """Number of the first (or last) line containing anchor."""
+        pos = self.text.rfind(anchor) if last else self.text.find(anchor)
+        if pos < 0:
+            return None
+        if self._count is None:
+            self._count = line_counter(self.text)
+        return self._count(0, pos)
+
+    def token(self, anchor: str, offset: int = 0, index: int = 0,
+              cast: Callable[[str], Any] = str, last: bool = False) -> Any:
+        """cast(out[il+offset].split()[index]) of the line il containing
+        anchor, None if no line does. Values are computed once."""
+        key = (anchor, offset, index, cast, last)
+        if key not in self.fields:
+            il = self.line_of(anchor, last)
+            self.fields[key] = (None if il is None
+                                else cast(self.out[il+offset].split()[index]))
+        return self.fields[key]
+
+    def parse(self, parser: LogParser, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run parser over the log."""
+        return parser.parse(self.text, state, self.out)
+
+
+def _outcome(file_name: str, future) -> Tuple[str, Any, Optional[str]]:
+    try:
+        return file_name, future.result(), None
+    except Exception as e:
+        return file_name, None, f"{type(e).__name__}: {e}"
+
+
+def map_logs(fn: Callable[[str], Any], files: Iterable[str],
+             jobs: int = 1) -> Iterator[Tuple[str, Any, Optional[str]]]:
+    """Yield (file, fn(file), error) for files, in the order of files.
+
+    With jobs > 1 the files are parsed in a process pool with at most
+    2*jobs files in flight; fn must be a module-level function. A file
+    whose fn raised is yielded with result None and the error message.
+    """
+    if jobs <= 1:
+        for file_name in files:
+            try:
+                yield file_name, fn(file_name), None
+            except Exception as e:
+                yield file_name, None, f"{type(e).__name__}: {e}"
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for file_name in files:
+            pending.append((file_name, executor.submit(fn, file_name)))
+            if len(pending) >= 2 * jobs:
+                yield _outcome(*pending.popleft())
+        while pending:
+            yield _outcome(*pending.popleft())
+
+
+def error_row(n_columns: int, file_name: str, error: str) -> List[str]:
+    """CSV row of a log that failed to parse."""
+    return [f"ERROR {error}"] + [''] * (n_columns - 2) + [file_name]
+
+
+def step_cpu_time(line: str) -> float:
+    """CPU time of a GAMESS 'STEP CPU TIME' line."""
+    if line.split()[5] == "TOTAL":
+        return float(line.split()[4])
+    return float(line.split()[5])
+
+
+# ERI, SCF and Davidson timings of the MRSF benchmark logs.
+
+def timing_state() -> Dict[str, Any]:
+    return {
+        'dirscf': False,
+        'disk': False,
+        'n_flush': 0,
+        't_of_ERI': 0.0,
+        't_cpu_ERI': 0.0,
+        't_write': 0.0,
+        't_flush': 0.0,
+        'int_of_ERI': 0,
+        'skip_of_ERI': 0,
+        't_of_scf': 0.0,
+        't_cpu_scf': 0.0,
+        't_util_scf': str(0),
+        'int_of_scf': 0,
+        'skip_of_scf': 0,
+        'scf_iter': 0,
+        't_of_davidson': 0.0,
+        't_of_dav_trans1': 0.0,
+        't_of_dav_trans2': 0.0,
+        't_cpu_davidson': 0.0,
+        't_util_davidson': str(0),
+        'davidson_int': 0,
+        'davidson_skip': 0,
+    }
+
+
+def _scf_mode(out, il, d):
+    if "dirscf=.t." in out[il]:
+        d['dirscf'] = True
+    elif "dirscf=.f." in out[il]:
+        d['disk'] = True
+
+
+def _eri_flush(first_only):
+    def handler(out, il, d):
+        if not d['disk']:
+            return
+        if not first_only or d['n_flush'] == 0:
+            # Timing of getting ERI
+            d['t_of_ERI'] = float(out[il-8].split()[4])
+            # Step CPU time of getting ERI
+            d['t_cpu_ERI'] = step_cpu_time(out[il-10])
+            # Time of writing int
+            d['t_write'] = float(out[il-1].split()[4])
+            # time of flushing
+            d['t_flush'] = float(out[il+4].split()[4])
+            # Mount of 2e integrals
+            d['int_of_ERI'] = int(out[il-6].split()[7])
+            # Skiped integrals
+            d['skip_of_ERI'] = int(out[il-7].split()[4])
+        d['n_flush'] += 1
+    return handler
+
+
+def _density_change(out, il, d):
+    if d['disk']:
+        # Timing of the first SCF stap
+        d['t_of_scf'] = float(out[il+3].split()[4])
+        if out[il+1].split()[5] == "PROCEDURE":
+            return True
+        d['t_cpu_scf'] = step_cpu_time(out[il+1])
+        # Total CPU utilization of the first  SCF
+        d['t_util_scf'] = str(out[il+2].split()[9])
+    if d['dirscf']:
+        d['t_of_scf'] = float(out[il+3].split()[4])
+        d['t_cpu_scf'] = step_cpu_time(out[il+1])
+        d['t_util_scf'] = str(out[il+2].split()[9])
+        # Mount of 2e integrals calc in first SCF stap
+        d['int_of_scf'] = int(out[il+5].split()[6])
+        # Skiped integrals
+        d['skip_of_scf'] = int(out[il+5].split()[7])
+    return None
+
+
+def _scf_step(out, il, d):
+    # calc number of SCF iterations
+    if d['disk']:
+        d['scf_iter'] += 1
+    if d['dirscf']:
+        d['scf_iter'] += 1
+
+
+def _transpose(key):
+    def handler(out, il, d):
+        # Timing of the transpose in first Devidson iteration
+        d[key] = float(out[il+3].split()[4])
+    return handler
+
+
+def _davidson_step(out, il, d):
+    if d['disk'] or d['dirscf']:
+        # Timing of the first Devidson iteration
+        d['t_of_davidson'] = float(out[il].split()[4])
+        # CPU time on step
+        d['t_cpu_davidson'] = step_cpu_time(out[il-2])
+        # CPU utilization of Davidson
+        d['t_util_davidson'] = str(out[il-1].split()[9])
+
+
+def _davidson_buffer(out, il, d):
+    if d['dirscf']:
+        # ncur+j*mxbuf
+        d['davidson_int'] = int(out[il].split()[6])
+        d['davidson_skip'] = int(out[il].split()[7])
+
+
+def timing_parser(first_flush_only: bool = False,
+                  transposes: bool = False) -> LogParser:
+    """Parser filling timing_state() from an MRSF benchmark log.
+
+    first_flush_only keeps the ERI timings of the first page cache
+    flush, transposes adds the Davidson transpose timings.
+    """
+    parser = LogParser()
+    parser.on("dirscf=.", _scf_mode)
+    parser.on("Flushing page cache", _eri_flush(first_flush_only))
+    parser.on("DENSITY CHANGE", _density_change)
+    parser.on("ddd step wall", _scf_step)
+    if transposes:
+        parser.on("timing for transpose 1", _transpose('t_of_dav_trans1'))
+        parser.on("timing for transpose 2", _transpose('t_of_dav_trans2'))
+    parser.on("kkk step wall time:", _davidson_step)
+    parser.on("lll total number of", _davidson_buffer)
+    return parser
@@ -0,0 +1,155 @@
+""" Molecular orbitals of GAMESS logs as NumPy arrays.
+An EIGENVECTORS block is printed in sections of a few MOs: a line of MO
+numbers, a line of orbital energies, a line of symmetry labels, one line
+per AO (label, then the coefficients) and a blank line. Each section is
+turned into a 2-D array in one go instead of element by element. The
+number of columns is read from the MO numbers of each section. There
+are as many AO lines as Cartesian basis functions, while spherical
+basis sets have fewer MOs (TOTAL NUMBER OF MOS IN VARIATION).
+
+track_orbitals() follows the MOs along a list of logs (a trajectory):
+every log is parsed once and is the reference of the next one, all
+overlaps of a step come from one matrix product, and the permutation
+maximizing the total overlap is found with linear_sum_assignment.
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from gms_log_parser import ParsedLog
+
+# Anchor of an MO set -> lines from the anchor to its first MO numbers.
+MO_SETS = {
+    'EIGENVECTORS': 3,
+    '- ALPHA SET': 6,
+    '- BETA SET': 6,
+}
+
+
+def _section_values(lines: List[str], ncol: int) -> np.ndarray:
+    """(len(lines), ncol) array of the last ncol numbers of the lines."""
+    # The AO labels are fixed width; cut them off and parse all at once.
+    width = len(lines[0].rsplit(None, ncol)[0])
+    values = np.fromstring(' '.join(line[width:] for line in lines), sep=' ')
+    if values.size != len(lines) * ncol:
+        values = np.array([value for line in lines for value in line.split()[-ncol:]],
+                          dtype=float)
+    return values.reshape(len(lines), ncol)
+
+
+def read_mo_block(out: List[str], il: int, n_ao: int,
+                  n_mo: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """MO coefficients (n_ao x n_mo) and orbital energies of a block.
+
+    il is the line of the MO numbers of the first section. Reading stops
+    after n_mo MOs, or at the first section without MO numbers when
+    n_mo is None (logs that print only some of the orbitals).
+    """
+    blocks = []
+    energies: List[str] = []
+    n = 0
+    while (n_mo is None or n < n_mo) and il < len(out):
+        numbers = out[il].split()
+        if not numbers or not all(number.isdigit() for number in numbers):
+            break
+        ncol = len(numbers)
+        energies += out[il+1].split()[:ncol]
+        blocks.append(_section_values(out[il+3:il+3+n_ao], ncol))
+        n += ncol
+        il += n_ao + 4
+    coefficients = np.hstack(blocks) if blocks else np.zeros((n_ao, 0))
+    return coefficients[:, :n_mo], np.array(energies[:n_mo], dtype=float)
+
+
+def basis_size(log: ParsedLog) -> Tuple[int, int]:
+    """(number of Cartesian AOs, number of MOs) of a log."""
+    n_ao = log.token("NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS", 0, 7, int, last=True)
+    n_mo = log.token("TOTAL NUMBER OF MOS IN VARIATION", 0, 7, int, last=True)
+    return n_ao, n_mo or n_ao
+
+
+def mo_set(log: ParsedLog, anchor: str = 'EIGENVECTORS'
+           ) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Coefficients and energies of the last MO set printed after
+    anchor (a key of MO_SETS), None if the log has none."""
+    il = log.line_of(anchor, last=True)
+    if il is None:
+        return None
+    n_ao, n_mo = basis_size(log)
+    return read_mo_block(log.out, il + MO_SETS[anchor], n_ao, n_mo)
+
+
+def normalize(coefficients: np.ndarray) -> np.ndarray:
+    """MO coefficients with every column scaled to unit length."""
+    return coefficients / np.linalg.norm(coefficients, axis=0)
+
+
+def assign_orbitals(reference: np.ndarray,
+                    current: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Best matching of the MOs of current to those of reference.
+
+    Both are normalized coefficient matrices. Returns (order, overlap):
+    order[k] is the MO of current assigned to MO k of reference and
+    overlap[k] their absolute overlap; the assignment maximizes the sum
+    of the absolute overlaps, so no MO is matched twice.
+    """
+    overlap = np.abs(reference.T @ current)
+    rows, columns = linear_sum_assignment(overlap, maximize=True)
+    return columns, overlap[rows, columns]
+
+
+def track_orbitals(files: Iterable[str], anchors: Sequence[str] = ('EIGENVECTORS',)
+                   ) -> Iterator[Tuple[str, Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]]]:
+    """Yield (file, {anchor: (order, overlap, energies)}) for every log
+    after the first, each of its MO sets matched to the same set of the
+    previous log (see assign_orbitals)."""
+    reference: Dict[str, np.ndarray] = {}
+    for file_name in files:
+        log = ParsedLog(file_name)
+        step = {}
+        for anchor in anchors:
+            mos = mo_set(log, anchor)
+            if mos is None:
+                raise ValueError(f"{file_name}: no MOs after '{anchor}'")
+            current = normalize(mos[0])
+            if anchor in reference:
+                step[anchor] = assign_orbitals(reference[anchor], current) + (mos[1],)
+            reference[anchor] = current
+        if step:
+            yield file_name, step
+
+
+def permutation_row(step: int, file_name: str, order: np.ndarray,
+                    overlap: np.ndarray, threshold: float = 0.9) -> str:
+    """Line of the permutation table of a step, 1-based MO numbers.
+
+    Lists the moved MOs as reference<-current and the number of matches
+    with an overlap below threshold.
+    """
+    moved = np.flatnonzero(order != np.arange(len(order)))
+    moves = ' '.join(f"{k+1}<-{order[k]+1}" for k in moved)
+    return (f"{step:5d} {len(moved):6d} {overlap.min():12.6f} "
+            f"{int((overlap < threshold).sum()):6d}  {file_name}"
+            + (f"\n        {moves}" if moves else ''))
+
+
+def _order_card(name: str, order: np.ndarray) -> str:
+    text = f" {name}(1)="
+    for i, mo in enumerate(order):
+        text += f" {mo+1}," if i < len(order) - 1 else f" {mo+1}"
+        if (i + 1) % 10 == 0:
+            text += "\n"
+    return text if text.endswith("\n") else text + "\n"
+
+
+def iorder_block(order: np.ndarray, beta: Optional[np.ndarray] = None) -> str:
+    """$GUESS group reading the MOs of a log in the order of the
+    reference: IORDER(k) is the MO assigned to reference MO k, JORDER
+    the same for the beta MOs of UHF."""
+    text = " $scf rstrct=.t. $end\n"
+    text += f" $guess guess=moread norb= {len(order)} norder=1\n"
+    text += _order_card("iorder", order)
+    if beta is not None:
+        text += _order_card("jorder", beta)
+    return text + " $end\n"
@@ -0,0 +1,317 @@
+""" $VEC, $DATA, $XVEC, $GRAD and $NACT groups of GAMESS .wrf/.dat files.
+Each group is decoded into NumPy arrays in bulk instead of line by line.
+$VEC lines are fixed width (I2 MO number mod 100, I3 line number, then
+up to 5E15.8 with no space between negative numbers): the lines are
+located with one scan for newlines, the coefficient fields of all lines
+are cut out of the byte buffer with a mask and their digits converted
+as an (n, 15) array. The free-format groups are split once.
+
+WrfReader opens long NAMD runs by a step-offset index instead of
+parsing every step: reader[step]['Gradient'] decodes one group of one
+step, reader.field('Gradient') walks a field across the steps.
+"""
+import json
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from log_cache import stamp
+from mapped_log import MappedLog
+
+Text = Union[str, bytes]
+
+FIELD = 15  # width of an E15.8 $VEC field
+NEWLINE = ord('\n')
+
+# Bump when the sidecar index format changes.
+INDEX_VERSION = '1'
+
+UMSTEP = re.compile(rb'\$UMSTEP\s*=\s*(\d+)')
+STATE = re.compile(rb'STATE #\s+(\d+)\s+ENERGY =\s+(\S+)')
+TOTAL_ENERGY = re.compile(rb'TOTAL ENERGY\s*=\s*(-?\d+\.\d+)')
+
+
+def _bytes(text: Text) -> bytes:
+    return text.encode() if isinstance(text, str) else text
+
+
+def group(text: Text, name: str, start: int = 0) -> Optional[bytes]:
+    """Body of the first $name group at or after start, None if none.
+    A group cut short (no $END) runs to the end of text."""
+    text = _bytes(text)
+    header = re.compile(rb'\$' + name.encode() + rb'[ \t]*\r?\n').search(text, start)
+    if header is None:
+        return None
+    end = text.find(b'$END', header.end())
+    # $END must start its line (after blanks).
+    while end >= 0 and text[text.rfind(b'\n', 0, end) + 1:end].strip():
+        end = text.find(b'$END', end + 4)
+    return text[header.end():] if end < 0 else text[header.end():text.rfind(b'\n', 0, end) + 1]
+
+
+def _lines(buffer: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (newline) offsets of the lines of a byte array."""
+    ends = np.flatnonzero(buffer == NEWLINE)
+    if buffer.size and buffer[-1] != NEWLINE:
+        ends = np.append(ends, buffer.size)
+    return np.concatenate(([0], ends[:-1] + 1)).astype(np.int64), ends
+
+
+def _e15(fields: np.ndarray) -> np.ndarray:
+    """Values of (n, 15) bytes of E15.8 fields, rounded as float() does."""
+    if not ((fields[:, 2] == ord('.')) & (fields[:, 11] == ord('E'))).all():
+        return fields.view(f'S{FIELD}').ravel().astype(float)
+    digit = lambda k: fields[:, k].astype(np.int64) - ord('0')
+    mantissa = digit(1) * 10**8
+    for k in range(3, 11):
+        mantissa += digit(k) * 10**(10 - k)
+    exponent = digit(13) * 10 + digit(14)
+    exponent = np.where(fields[:, 12] == ord('-'), -exponent, exponent) - 8
+    # One multiplication or division by an exact power of ten (up to
+    # 1e22); the rare larger exponents are converted by float().
+    values = np.where(exponent < 0, mantissa / 10.0**np.abs(exponent),
+                      mantissa * 10.0**np.abs(exponent))
+    values = np.where(fields[:, 0] == ord('-'), -values, values)
+    inexact = np.abs(exponent) > 22
+    if inexact.any():
+        values[inexact] = fields[inexact].view(f'S{FIELD}').ravel().astype(float)
+    return values
+
+
+def decode_vec(block: Text) -> Tuple[np.ndarray, np.ndarray]:
+    """MO coefficients (n_mo x n_ao) and orbital energies of a $VEC body.
+
+    Coefficient lines are told from the free-format energy lines (if
+    any, written after the coefficients) by the digits of the I2 and
+    I3 fields. The energy array is empty when there are none.
+    """
+    block = _bytes(block)
+    buffer = np.frombuffer(block, dtype=np.uint8)
+    starts, ends = _lines(buffer)
+    n_fields = (ends - starts - 5) // FIELD
+    vec = np.flatnonzero(n_fields > 0)
+    vec = vec[(buffer[starts[vec] + 1] - ord('0') < 10)
+              & (buffer[starts[vec] + 4] - ord('0') < 10)]
+    if not vec.size:
+        return np.zeros((0, 0)), np.zeros(0)
+    # Mask the field bytes of the coefficient lines and cut them out at once.
+    first_field = starts[vec] + 5
+    edges = np.zeros(buffer.size + 1, dtype=np.int8)
+    edges[first_field] = 1
+    edges[first_field + FIELD * n_fields[vec]] = -1
+    fields = buffer[np.cumsum(edges[:-1], dtype=np.int8).view(bool)]
+    del edges
+    coefficients = _e15(fields.reshape(-1, FIELD))
+    # The MO number (I2, mod 100) changes after the first MO's lines.
+    tens = buffer[starts[vec]]
+    mo = np.where(tens == ord(' '), 0, tens.astype(int) - ord('0')) * 10 \
+        + buffer[starts[vec] + 1] - ord('0')
+    change = np.flatnonzero(mo != mo[0])
+    n_ao = int(n_fields[vec[:change[0]]].sum()) if change.size else coefficients.size
+    if coefficients.size % n_ao:
+        raise ValueError(f"$VEC: {coefficients.size} coefficients for {n_ao} AOs")
+    other = np.ones(starts.size, dtype=bool)
+    other[vec] = False
+    rest = b' '.join(block[start:end] for start, end in zip(starts[other], ends[other]))
+    energies = np.fromstring(rest.decode(), sep=' ') if rest.strip() else np.zeros(0)
+    return coefficients.reshape(-1, n_ao), energies
+
+
+def decode_atoms(block: Text, ncol: int) -> Tuple[List[str], np.ndarray]:
+    """Atom symbols and the last ncol numbers of the lines of a $DATA
+    (Z, x, y, z) or $GRAD (gx, gy, gz) body with one atom per line."""
+    rows = [line.split() for line in _bytes(block).decode().splitlines() if line.strip()]
+    symbols = [row[0] for row in rows]
+    values = np.array([row[-ncol:] for row in rows], dtype=float).reshape(-1, ncol)
+    return symbols, values
+
+
+def nact_rows(block: Text) -> np.ndarray:
+    """(n_state x n_state+1) rows of a $NACT body: state number, then
+    the couplings."""
+    values = np.array(_bytes(block).split(), dtype=float)
+    n = int((np.sqrt(1 + 4 * values.size) - 1) / 2)
+    return values.reshape(n, n + 1)
+
+
+def decode_nact(block: Text) -> np.ndarray:
+    """(n_state x n_state) matrix of a $NACT body, one row per line after
+    the state number."""
+    return nact_rows(block)[:, 1:]
+
+
+def decode_xvec(block: Text) -> List[Dict[str, object]]:
+    """States of an $XVEC body: number, energy and vector."""
+    block = _bytes(block)
+    headers = list(STATE.finditer(block))
+    states = []
+    for k, header in enumerate(headers):
+        end = headers[k+1].start() if k + 1 < len(headers) else len(block)
+        states.append({'excited_state_num': int(header.group(1)),
+                       'excited_state_energy': float(header.group(2)),
+                       'excited_state_vector':
+                           np.fromstring(block[header.end():end].decode(), sep=' ')})
+    return states
+
+
+# Group -> decoder of its body.
+GROUPS = {
+    'VEC': decode_vec,
+    'DATA': lambda block: decode_atoms(block, 4),
+    'XVEC': decode_xvec,
+    'GRAD': lambda block: decode_atoms(block, 3),
+    'NACT': decode_nact,
+}
+
+# Field -> group and item of the decoded group (None: all of it).
+FIELDS = {
+    'MO_orbitals': ('VEC', 0),
+    'MO_energies': ('VEC', 1),
+    'Atoms': ('DATA', 0),
+    'Geometry': ('DATA', 1),
+    'Xvector': ('XVEC', None),
+    'Gradient': ('GRAD', 1),
+    'NACT': ('NACT', None),
+}
+
+
+# Default of WrfStep.get() telling missing fields from None.
+MISSING = object()
+
+
+class WrfStep:
+    """Fields of one step of a .wrf file, each group decoded on first
+    access. Missing fields raise KeyError."""
+
+    def __init__(self, text: Text):
+        self.text = _bytes(text)
+        self._groups: Dict[str, object] = {}
+
+    def _group(self, name: str) -> object:
+        if name not in self._groups:
+            block = group(self.text, name)
+            self._groups[name] = None if block is None else GROUPS[name](block)
+        return self._groups[name]
+
+    def __getitem__(self, field: str) -> object:
+        if field == 'Total_energy':
+            match = TOTAL_ENERGY.search(self.text)
+            if match is None:
+                raise KeyError(field)
+            return float(match.group(1))
+        name, item = FIELDS[field]
+        decoded = self._group(name)
+        if decoded is None:
+            raise KeyError(field)
+        return decoded if item is None else decoded[item]
+
+    def get(self, field: str, default: object = None) -> object:
+        try:
+            return self[field]
+        except KeyError:
+            return default
+
+    def __contains__(self, field: str) -> bool:
+        return self.get(field, MISSING) is not MISSING
+
+    def keys(self) -> List[str]:
+        return [field for field in list(FIELDS) + ['Total_energy'] if field in self]
+
+
+def decode_groups(text: Text) -> Dict[str, object]:
+    """All known groups of one step of a .wrf file as arrays."""
+    step = WrfStep(text)
+    return {field: step[field] for field in step.keys()}
+
+
+class WrfReader:
+    """Random access to the steps of a multi-step .wrf file.
+
+    Opening maps the file and reads the offsets of its $UMSTEP headers
+    from a sidecar (file.idx, JSON), valid while the file's size and
+    mtime_ns are the same; otherwise the offsets are found with one
+    regex pass over the mapped bytes and the sidecar is rewritten.
+    reader[step] decodes fields on access; a step number written more
+    than once (restarts) refers to its last copy.
+    """
+
+    def __init__(self, file_name: str, sidecar: Optional[str] = None):
+        self.file_name = file_name
+        self.sidecar = file_name + '.idx' if sidecar is None else sidecar
+        self.log = MappedLog(file_name)
+        self.index = self._load_index()
+        if self.index is None:
+            self.index = [[int(match.group(1)), match.start()]
+                          for match in UMSTEP.finditer(self.log.buffer)]
+            self._save_index()
+        self._position = {step: k for k, (step, _) in enumerate(self.index)}
+
+    def close(self) -> None:
+        self.log.close()
+
+    def __enter__(self) -> 'WrfReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _load_index(self) -> Optional[List[List[int]]]:
+        try:
+            with open(self.sidecar) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get('stamp') != list(stamp(self.file_name, INDEX_VERSION) or ()):
+            return None
+        return saved['steps']
+
+    def _save_index(self) -> None:
+        key = stamp(self.file_name, INDEX_VERSION)
+        tmp = f"{self.sidecar}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'stamp': list(key), 'steps': self.index}, f)
+            os.replace(tmp, self.sidecar)
+        except OSError:
+            # Read-only directory: index again next time.
+            pass
+
+    @property
+    def steps(self) -> List[int]:
+        """Step numbers in file order."""
+        return [step for step, _ in self.index]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, step: int) -> bool:
+        return step in self._position
+
+    def _text_at(self, k: int) -> bytes:
+        end = self.index[k+1][1] if k + 1 < len(self.index) else len(self.log)
+        return self.log.buffer[self.index[k][1]:end]
+
+    def text(self, step: int) -> bytes:
+        """Bytes of a step, from its $UMSTEP header to the next one."""
+        return self._text_at(self._position[step])
+
+    def __getitem__(self, step: int) -> WrfStep:
+        return WrfStep(self.text(step))
+
+    def field(self, field: str, steps: Optional[Iterable[int]] = None
+              ) -> Iterator[Tuple[int, object]]:
+        """(step, value) of a field for the steps that have it, in file
+        order or the order of steps; one step is decoded at a time.
+        In file order a step written more than once is yielded once,
+        where its last copy is."""
+        if steps is None:
+            positions = [k for k, (step, _) in enumerate(self.index)
+                         if self._position[step] == k]
+        else:
+            positions = [self._position[step] for step in steps]
+        for k in positions:
+            value = WrfStep(self._text_at(k)).get(field, MISSING)
+            if value is not MISSING:
+                yield self.index[k][0], value
@@ -5,174 +5,49 @@ import sys
 import numpy as np
 import argparse
 
-def extract_data(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
+from gms_log_parser import ParsedLog, timing_parser, timing_state
 
-    dirscf = False
-    disk = False
+TIMING_PARSER = timing_parser()
 
-    t_of_ERI = 0.0
-    t_cpu_ERI = 0.0
-    t_write = 0.0
-    t_flush = 0.0
-    int_of_ERI = 0
-    skip_of_ERI = 0
-    t_of_scf = 0.0
-    t_cpu_scf = 0.0
-    t_util_scf = str(0)
-    int_of_scf = 0
-    skip_of_scf = 0
-    scf_iter = 0
-    buf_ncur =0
-    buf_j = 0
-    buf_size = 0
-    t_of_davidson = 0.0
-    t_cpu_davidson = 0.0
-    t_util_davidson = str(0)
-    davidson_int = 0
-    davidson_skip = 0
+def extract_data(log):
+    d = log.parse(TIMING_PARSER, timing_state())
     data_row = []
-    i=0
-    for il, l in enumerate(out):
-        if "dirscf=.t." in l:
-            i+=1
-            dirscf=True
-        elif "dirscf=.f." in l:
-            i+=1
-            disk=True
-        if disk and "Flushing page cache" in l:
-            # Timing of getting ERI
-            t_of_ERI = float(out[il-8].split()[4])
-            # Step CPU time of getting ERI
-            if (str(out[il-10].split()[5])==str("TOTAL")):
-                t_cpu_ERI = float(out[il-10].split()[4])
-            else:
-                t_cpu_ERI = float(out[il-10].split()[5])
-            # Time of writing int
-            t_write = float(out[il-1].split()[4])
-            # time of flushing
-            t_flush = float(out[il+4].split()[4])
-            # Mount of 2e integrals
-            int_of_ERI = int(out[il-6].split()[7])
-            # Skiped integrals
-            skip_of_ERI = int(out[il-7].split()[4])
-        if disk and "DENSITY CHANGE" in l:
-            # Timing of the first SCF stap
-            t_of_scf = float(out[il+3].split()[4])
-#           # Step CPU time of the first  SCF
-            if (str(out[il+1].split()[5])==str("PROCEDURE")):
-                continue
-            else:
-                if (str(out[il+1].split()[5])==str("TOTAL")):
-                    t_cpu_scf = float(out[il+1].split()[4])
-                else:
-                    t_cpu_scf = float(out[il+1].split()[5])
-#           # Total CPU utilization of the first  SCF
-            t_util_scf = str(out[il+2].split()[9])
-#           # Mount of 2e integrals calc in first SCF stap
-        if dirscf and "DENSITY CHANGE" in l:
-            # Timing of the first SCF stap
-            t_of_scf = float(out[il+3].split()[4])
-            # Total CPU time of the first  SCF
-            if (str(out[il+1].split()[5])==str("TOTAL")):
-                t_cpu_scf = float(out[il+1].split()[4])
-            else:
-                t_cpu_scf = float(out[il+1].split()[5])
-            # Total CPU utilization of the first  SCF
-            t_util_scf = str(out[il+2].split()[9])
-            # Mount of 2e integrals calc in first SCF stap
-            int_of_scf = int(out[il+5].split()[6])
-            # Skiped integrals
-            skip_of_scf = int(out[il+5].split()[7])
-
-        if disk and "ddd step wall" in l:
-            # calc number of SCF iterations
-            scf_iter += 1
-        if dirscf and "ddd step wall" in l:
-            # calc number of SCF iterations
-            scf_iter += 1
-
-        if disk and "kkk step wall time:" in l:
-            # Timing of the first Devidson iteration
-            t_of_davidson = float(out[il].split()[4])
-            # CPU time on step
-            if (str(out[il-2].split()[5])==str("TOTAL")):
-                t_cpu_davidson = float(out[il-2].split()[4])
-            else:
-                t_cpu_davidson = float(out[il-2].split()[5])
-            # CPU utilization of Davidson
-            t_util_davidson = str(out[il-1].split()[9])
-        if dirscf and "lll total number of" in l:
-            # ncur+j*mxbuf
-            buf_ncur = int(out[il].split()[6])
-            buf_size = int(out[il].split()[7])
-            davidson_int = buf_ncur
-            davidson_skip = buf_size
-        if dirscf and "kkk step wall time:" in l:
-            # Timing of the first Devidson iteration
-            t_of_davidson = float(out[il].split()[4])
-            # CPU time on step
-            if (str(out[il-2].split()[5])==str("TOTAL")):
-                t_cpu_davidson = float(out[il-2].split()[4])
-            else:
-                t_cpu_davidson = float(out[il-2].split()[5])
-            # CPU utilization of Davidson
-            t_util_davidson = str(out[il-1].split()[9])
-    row = (t_of_ERI,       #0
-           t_cpu_ERI,      #1
-           int_of_ERI,     #2
-           skip_of_ERI,    #3
-           t_write,        #4
-           t_flush,        #5
-           t_of_scf,       #6
-           t_cpu_scf,      #7
-           t_util_scf,     #8
-           int_of_scf,     #9
-           skip_of_scf,    #11
-           scf_iter,       #12
-           davidson_int,   #13
-           davidson_skip,  #14
-           t_of_davidson,  #15
-           t_cpu_davidson, #16
-           t_util_davidson)#17
+    row = (d['t_of_ERI'],
+           d['t_cpu_ERI'],
+           d['int_of_ERI'],
+           d['skip_of_ERI'],
+           d['t_write'],
+           d['t_flush'],
+           d['t_of_scf'],
+           d['t_cpu_scf'],
+           d['t_util_scf'],
+           d['int_of_scf'],
+           d['skip_of_scf'],
+           d['scf_iter'],
+           d['davidson_int'],
+           d['davidson_skip'],
+           d['t_of_davidson'],
+           d['t_cpu_davidson'],
+           d['t_util_davidson'])
     data_row.append(row)
     return  data_row
 
-def extract_n_state(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-    for il, l in enumerate(out):
-        if "NSTATE=" in l:
-            n_state = out[il].split()[1]
-            return n_state
+def extract_n_state(log):
+    return log.token("NSTATE=", 0, 1)
 
-def extract_cpu(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-    for il, l in enumerate(out):
-        if "Initiating" in l:
-            cpu = out[il].split()[1]
-            return cpu
+def extract_cpu(log):
+    return log.token("Initiating", 0, 1)
 
-def extract_basis(file):
+def extract_basis(log):
+    file = log.file_name
 
     theory = str(file.split("_")[0])
     molecule = file.count('c60')
     bas = file.count('q')
-    n_state = extract_n_state(file)
+    n_state = extract_n_state(log)
     m_type = file.count('r0')
 
-    cpu = extract_cpu(file)
+    cpu = extract_cpu(log)
 
     if m_type==0:
         memory = str('Direct ')
@@ -254,9 +129,10 @@ if __name__ == '__main__':
     for ifile in files:
 
         file = ifile.split()[0]
-        theory, n_bas_func, n_state, memory, n_cpu = extract_basis(file)
+        log = ParsedLog(file)
+        theory, n_bas_func, n_state, memory, n_cpu = extract_basis(log)
 
-        data = extract_data(file)
+        data = extract_data(log)
 
         print(file)
 
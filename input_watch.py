@@ -0,0 +1,82 @@
+""" Streaming discovery of Runner input files.
+iter_input_files walks the tree with os.scandir and yields inputs as it
+finds them. InputWatcher polls the tree while generation scripts
+(gradient-xyz-gen.py, gen_input.py) are still writing it, so new inputs
+reach the run queue as they appear instead of after generation ends.
+"""
+import os
+import time
+from typing import Iterator, List, Set
+
+from warm_restart import is_restart_input
+
+
+def iter_input_files(root: str, criterion: str = '') -> Iterator[str]:
+    """Yield .inp files below root, skipping extern_*, warm-restart
+    inputs and unmatched dirs."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except OSError:
+            # Removed or not yet readable while the tree is generated.
+            continue
+        match = not criterion or criterion in directory
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif (match and entry.name.endswith('.inp') and
+                  'extern' not in entry.name and not is_restart_input(entry.name)
+                  and entry.is_file()):
+                yield entry.path
+
+
+class InputWatcher:
+    """Polls an input tree and returns inputs that are new since last poll.
+
+    A file is reported once its mtime is 'settle' seconds old, so inputs
+    still being written are not started. The watch is idle when nothing
+    new appeared for 'idle' seconds.
+    """
+
+    def __init__(self, root: str, criterion: str = '', interval: float = 5.0,
+                 idle: float = 60.0, settle: float = 1.0):
+        self.root = root
+        self.criterion = criterion
+        self.interval = interval
+        self.idle_timeout = idle
+        self.settle = settle
+        self.seen: Set[str] = set()
+        self.last_new = time.monotonic()
+        self.last_poll = 0.0
+
+    def mark_seen(self, input_files: List[str]) -> None:
+        self.seen.update(input_files)
+
+    def due(self) -> bool:
+        """True if the tree has not been polled for 'interval' seconds."""
+        return time.monotonic() - self.last_poll >= self.interval
+
+    def poll(self) -> List[str]:
+        """New settled inputs, sorted."""
+        self.last_poll = time.monotonic()
+        now = time.time()
+        new = []
+        for path in iter_input_files(self.root, self.criterion):
+            if path in self.seen:
+                continue
+            try:
+                if now - os.stat(path).st_mtime < self.settle:
+                    continue
+            except OSError:
+                continue
+            self.seen.add(path)
+            new.append(path)
+        if new:
+            self.last_new = time.monotonic()
+        return sorted(new)
+
+    def idle(self) -> bool:
+        return time.monotonic() - self.last_new >= self.idle_timeout
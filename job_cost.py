@@ -0,0 +1,129 @@
+""" Job cost model for the Runner scheduler.
+@input: config dictionary, containing:
+  config['total cpus'] = int()
+  config['omp threads'] = int()        # upper bound of threads per job
+  config['min omp threads'] = int()    # lower bound of threads per job
+"""
+import glob
+import os
+from typing import Any, Dict, List, Optional
+
+
+class JobCostModel:
+    """Estimates relative cost of calculations and sizes their OMP threads."""
+
+    # Relative prefactors by calculation folder prefix (see gen_input.py).
+    CODE_FACTORS = {
+        'fat-molcas': 6.0,
+        'fat-cp2k': 3.0,
+        'cp2k': 1.0,
+        'molcas': 1.5,
+        'openqp': 1.0,
+    }
+
+    # Relative basis size, matched as a substring of folder/file names.
+    # Longer keys are checked first, so 'cc-pvtz' wins over 'tz'.
+    BASIS_FACTORS = {
+        'sz-gth': 0.5,
+        'dzvp': 1.0,
+        'tzvp': 1.8,
+        'tzv2p': 2.2,
+        'qzv': 3.0,
+        'ano-s': 1.0,
+        'ano-l': 2.5,
+        'ano-rcc': 2.5,
+        'cc-pvdz': 1.0,
+        'cc-pvtz': 2.2,
+        'cc-pvqz': 4.0,
+        '6-31g': 0.7,
+        '631g': 0.7,
+        'sto-3g': 0.3,
+    }
+
+    # Correlated wave-function methods inside molcas folders.
+    METHOD_FACTORS = {
+        'caspt2': 4.0,
+        'casscf': 2.0,
+    }
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.config.update({
+            'min omp threads': self.config.get('min omp threads', 1),
+        })
+
+    def find_xyz(self, input_file: str) -> Optional[str]:
+        """Locate tot.xyz of the molecule an input belongs to.
+
+        Inputs live in <mol dir>/<calc folder>/ and geometry in
+        <mol dir>/<mol name>_xyz/tot.xyz, as written by gen_input.py.
+        """
+        mol_dir = os.path.dirname(os.path.dirname(os.path.abspath(input_file)))
+        xyz_file = os.path.join(
+            mol_dir, f"{os.path.basename(mol_dir)}_xyz", "tot.xyz")
+        if os.path.isfile(xyz_file):
+            return xyz_file
+        candidates = sorted(glob.glob(os.path.join(mol_dir, "*_xyz", "tot.xyz")))
+        return candidates[0] if candidates else None
+
+    def count_atoms(self, input_file: str) -> int:
+        """Number of atoms of the system, 1 if geometry is unknown."""
+        xyz_file = self.find_xyz(input_file)
+        if xyz_file is None:
+            return 1
+        try:
+            with open(xyz_file, 'r', encoding="utf-8") as f:
+                return max(1, int(f.readline().strip()))
+        except (OSError, ValueError):
+            return 1
+
+    def code_factor(self, folder_name: str) -> float:
+        """Prefactor for the code and method encoded in the folder name."""
+        folder_lower = folder_name.lower()
+        factor = 1.0
+        for prefix in sorted(self.CODE_FACTORS, key=len, reverse=True):
+            if folder_lower.startswith(prefix):
+                factor = self.CODE_FACTORS[prefix]
+                break
+        for method, method_factor in self.METHOD_FACTORS.items():
+            if method in folder_lower:
+                factor *= method_factor
+                break
+        return factor
+
+    def basis_factor(self, name: str) -> float:
+        """Relative basis set size, 1.0 if the basis is not recognised."""
+        name_lower = name.lower()
+        for basis in sorted(self.BASIS_FACTORS, key=len, reverse=True):
+            if basis in name_lower:
+                return self.BASIS_FACTORS[basis]
+        return 1.0
+
+    def estimate(self, input_file: str) -> float:
+        """Relative cost of a calculation (cubic in the number of atoms)."""
+        folder_name = os.path.basename(os.path.dirname(os.path.abspath(input_file)))
+        name = f"{folder_name}_{os.path.basename(input_file)}"
+        n_atoms = self.count_atoms(input_file)
+        size = n_atoms * self.basis_factor(name)
+        return self.code_factor(folder_name) * size ** 3
+
+    def threads_for(self, cost: float, max_cost: float) -> int:
+        """OMP threads for a job: biggest job gets 'omp threads'.
+
+        Threads scale with the cube root of the relative cost, i.e.
+        roughly linearly with the system size.
+        """
+        max_threads = min(self.config['omp threads'], self.config['total cpus'])
+        min_threads = min(self.config['min omp threads'], max_threads)
+        if max_cost <= 0:
+            return max_threads
+        threads = round(max_threads * (cost / max_cost) ** (1 / 3))
+        return max(min_threads, min(max_threads, threads))
+
+    def plan(self, input_files: List[str]) -> List[Dict[str, Any]]:
+        """Return jobs sorted longest-first with cost and thread count."""
+        jobs = [{'input file': f, 'cost': self.estimate(f)} for f in input_files]
+        max_cost = max((job['cost'] for job in jobs), default=0.0)
+        for job in jobs:
+            job['omp threads'] = self.threads_for(job['cost'], max_cost)
+        return sorted(jobs, key=lambda job: (-job['cost'], job['input file']))
@@ -0,0 +1,161 @@
+""" Persistent job ledger of the Runner (stdlib sqlite3, WAL mode).
+Every job is written transactionally when it starts and when it
+finishes, so a campaign that dies midway can be resumed and failed
+jobs retried by an indexed query instead of parsing runner_report.txt.
+An input is hashed once per job, when it starts; resume compares size
+and mtime first and hashes only inputs whose stat changed.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    input_file TEXT PRIMARY KEY,
+    input_hash TEXT,
+    input_size INTEGER,
+    input_mtime_ns INTEGER,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    started TEXT,
+    finished TEXT,
+    execution_time REAL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+# Columns added after the first schema, created in older ledgers on open.
+NEW_COLUMNS = {'input_size': 'INTEGER', 'input_mtime_ns': 'INTEGER'}
+
+
+def file_hash(path: str) -> Optional[str]:
+    """SHA-256 of a file's content, None if it cannot be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def file_stat(path: str) -> Tuple[Optional[int], Optional[int]]:
+    """(size, mtime_ns) of a file, (None, None) if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class JobLedger:
+    """SQLite table of jobs keyed by absolute input file path."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in NEW_COLUMNS.items():
+                if name not in columns:
+                    self.conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        # Input hashes of started jobs, reused when they finish.
+        self._hashes: Dict[str, Optional[str]] = {}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def start(self, input_file: str) -> None:
+        """Mark a job RUNNING, count the attempt and record the input's
+        hash and stat."""
+        input_file = os.path.abspath(input_file)
+        size, mtime_ns = file_stat(input_file)
+        self._hashes[input_file] = file_hash(input_file)
+        with self.conn:
+            self.conn.execute(
+                """INSERT INTO jobs (input_file, input_hash, input_size, input_mtime_ns,
+                                     status, attempts, started)
+                   VALUES (?, ?, ?, ?, 'RUNNING', 1, ?)
+                   ON CONFLICT (input_file) DO UPDATE SET
+                       input_hash = excluded.input_hash,
+                       input_size = excluded.input_size,
+                       input_mtime_ns = excluded.input_mtime_ns,
+                       status = 'RUNNING',
+                       attempts = attempts + 1,
+                       started = excluded.started,
+                       finished = NULL""",
+                (input_file, self._hashes[input_file], size, mtime_ns,
+                 datetime.now().isoformat()))
+
+    def finish(self, result: Dict[str, Any]) -> None:
+        """Store the final status and result record of a job."""
+        input_file = os.path.abspath(result['input file'])
+        if input_file in self._hashes:
+            input_hash = self._hashes.pop(input_file)
+        else:
+            input_hash = file_hash(input_file)
+        with self.conn:
+            self.conn.execute(
+                """INSERT INTO jobs (input_file, input_hash, status, finished,
+                                     execution_time, result)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (input_file) DO UPDATE SET
+                       status = excluded.status,
+                       finished = excluded.finished,
+                       execution_time = excluded.execution_time,
+                       result = excluded.result""",
+                (input_file, input_hash, result['status'], datetime.now().isoformat(),
+                 result['execution time'], json.dumps(result)))
+
+    def failed(self) -> List[str]:
+        """Inputs that ended in ERROR or were left RUNNING by a dead runner."""
+        rows = self.conn.execute(
+            "SELECT input_file FROM jobs WHERE status IN ('ERROR', 'RUNNING') "
+            "ORDER BY input_file")
+        return [row[0] for row in rows]
+
+    def pending(self, input_files: Iterable[str]) -> List[str]:
+        """The inputs that have not completed, or changed since they did.
+
+        The completed rows are read in one query. An input whose size and
+        mtime are those recorded is unchanged; otherwise it is hashed.
+        """
+        done = {row[0]: row[1:] for row in self.conn.execute(
+            "SELECT input_file, input_hash, input_size, input_mtime_ns "
+            "FROM jobs WHERE status = 'COMPLETED'")}
+        pending = []
+        for input_file in input_files:
+            row = done.get(os.path.abspath(input_file))
+            if row is None:
+                pending.append(input_file)
+            elif (row[1] is None or file_stat(input_file) != (row[1], row[2])) \
+                    and file_hash(input_file) != row[0]:
+                pending.append(input_file)
+        return pending
+
+    def completed(self) -> List[Dict[str, Any]]:
+        """Result records of all completed jobs."""
+        rows = self.conn.execute(
+            "SELECT result FROM jobs WHERE status = 'COMPLETED' AND result IS NOT NULL")
+        return [json.loads(row[0]) for row in rows]
+
+    def results(self, input_files: Iterable[str]) -> List[Dict[str, Any]]:
+        """Stored result records of finished jobs, ordered by input file."""
+        wanted = {os.path.abspath(f) for f in input_files}
+        records = []
+        for input_file, result, attempts in self.conn.execute(
+                "SELECT input_file, result, attempts FROM jobs "
+                "WHERE result IS NOT NULL ORDER BY input_file"):
+            if input_file in wanted:
+                record = json.loads(result)
+                record['attempts'] = attempts
+                records.append(record)
+        return records
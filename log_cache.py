@@ -0,0 +1,243 @@
+""" Persistent cache of structured results parsed from finished logs.
+Extractors that are rerun over the same logs (table scripts, energy
+collectors) store what they parsed from each log in one SQLite file
+(stdlib sqlite3, WAL mode). A result is reused while the log's absolute
+path, size and mtime_ns and the extractor's version string are the same,
+so unchanged logs are never parsed again. Results are stored as JSON.
+Least recently used results are evicted above a size limit.
+
+Usage: log_cache.py stats
+       log_cache.py invalidate [PATH ...] [--extractor NAME]
+       log_cache.py evict [--max-mb MB]
+Environment: LOG_CACHE (database path), LOG_CACHE_MB (size limit).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence, Tuple
+
+from gms_log_parser import map_logs
+
+DEFAULT_PATH = os.path.join('~', '.cache', 'log_cache.sqlite')
+DEFAULT_MB = 512
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    path TEXT NOT NULL,
+    extractor TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    version TEXT NOT NULL,
+    result TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (path, extractor)
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+# Returned by LogCache.get() when a log has no valid cached result.
+MISS = object()
+
+Stamp = Tuple[str, int, int, str]
+
+
+def stamp(path: str, version: str, depends: Sequence[str] = ()) -> Optional[Stamp]:
+    """(absolute path, size, mtime_ns, version) of a log, None if missing.
+
+    The size and mtime_ns of the files in depends (e.g. a second log the
+    result is also read from) are folded into the version.
+    """
+    try:
+        stat = os.stat(path)
+        for dependency in depends:
+            dep_stat = os.stat(dependency)
+            version += (f"|{os.path.abspath(dependency)}:{dep_stat.st_size}:"
+                        f"{dep_stat.st_mtime_ns}")
+    except OSError:
+        return None
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns, version
+
+
+class LogCache:
+    """Parsed results keyed by (path, size, mtime_ns, extractor version)."""
+
+    def __init__(self, path: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.path = os.path.expanduser(path or os.environ.get('LOG_CACHE', DEFAULT_PATH))
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('LOG_CACHE_MB', DEFAULT_MB)) * 1024**2)
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Commit the access times, evict and close the database."""
+        self.conn.commit()
+        self.evict()
+        self.conn.close()
+
+    def __enter__(self) -> 'LogCache':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def get(self, path: str, extractor: str, version: str,
+            depends: Sequence[str] = ()) -> Any:
+        """Cached result of extractor for the log, MISS if none is valid."""
+        key = stamp(path, version, depends)
+        if key is None:
+            return MISS
+        row = self.conn.execute(
+            """SELECT result FROM results WHERE path = ? AND extractor = ?
+                   AND size = ? AND mtime_ns = ? AND version = ?""",
+            (key[0], extractor) + key[1:]).fetchone()
+        if row is None:
+            return MISS
+        # Committed with the next write or on close.
+        self.conn.execute("UPDATE results SET used = ? WHERE path = ? AND extractor = ?",
+                          (time.time(), key[0], extractor))
+        return json.loads(row[0])
+
+    def put(self, path: str, extractor: str, version: str, result: Any,
+            depends: Sequence[str] = (), key: Optional[Stamp] = None) -> None:
+        """Store the result of extractor for the log.
+
+        key is the stamp taken before the log was parsed; results that
+        are not JSON serializable are not cached.
+        """
+        key = key or stamp(path, version, depends)
+        if key is None:
+            return
+        try:
+            text = json.dumps(result)
+        except (TypeError, ValueError):
+            return
+        with self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO results
+                   (path, extractor, size, mtime_ns, version, result, bytes, used)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key[0], extractor) + key[1:] + (text, len(text), time.time()))
+
+    def cached(self, path: str, extractor: str, version: str,
+               fn: Callable[[str], Any], depends: Sequence[str] = ()) -> Any:
+        """Cached result of extractor for the log, else fn(path), stored."""
+        result = self.get(path, extractor, version, depends)
+        if result is MISS:
+            key = stamp(path, version, depends)
+            result = fn(path)
+            self.put(path, extractor, version, result, depends, key)
+        return result
+
+    def invalidate(self, paths: Iterable[str] = (), extractor: Optional[str] = None) -> int:
+        """Drop the results of the given logs (or all logs below given
+        directories), of one extractor or all; the number dropped."""
+        clauses = []
+        params: list = []
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                prefix = path.rstrip(os.sep) + os.sep
+                clauses.append("substr(path, 1, ?) = ?")
+                params += [len(prefix), prefix]
+            else:
+                clauses.append("path = ?")
+                params.append(path)
+        where = f"({' OR '.join(clauses)})" if clauses else "1"
+        if extractor is not None:
+            where += " AND extractor = ?"
+            params.append(extractor)
+        with self.conn:
+            return self.conn.execute(f"DELETE FROM results WHERE {where}", params).rowcount
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """Drop least recently used results until under max_bytes;
+        the number dropped."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        dropped = []
+        for path, extractor, size in self.conn.execute(
+                "SELECT path, extractor, bytes FROM results ORDER BY used"):
+            if total <= max_bytes:
+                break
+            dropped.append((path, extractor))
+            total -= size
+        with self.conn:
+            self.conn.executemany("DELETE FROM results WHERE path = ? AND extractor = ?",
+                                  dropped)
+        return len(dropped)
+
+    def stats(self) -> str:
+        """Number and size of the cached results per extractor."""
+        rows = self.conn.execute(
+            """SELECT extractor, COUNT(*), SUM(bytes) FROM results
+               GROUP BY extractor ORDER BY extractor""").fetchall()
+        text = f"Cache: {self.path} (limit {self.max_bytes / 1024**2:.0f} MB)\n"
+        for extractor, count, size in rows:
+            text += f"{extractor}: {count} logs, {size / 1024**2:.2f} MB\n"
+        return text
+
+
+def map_cached(fn: Callable[[str], Any], files: Iterable[str], jobs: int,
+               cache: Optional[LogCache], extractor: str,
+               version: str) -> Iterator[Tuple[str, Any, Optional[str]]]:
+    """map_logs() that takes results from cache and parses only the
+    other logs; successful results are stored. cache may be None."""
+    if cache is None:
+        yield from map_logs(fn, files, jobs)
+        return
+
+    files = list(files)
+    hits = {}
+    keys = {}
+    for file_name in files:
+        result = cache.get(file_name, extractor, version)
+        if result is MISS:
+            keys[file_name] = stamp(file_name, version)
+        else:
+            hits[file_name] = result
+    parsed = map_logs(fn, [f for f in files if f not in hits], jobs)
+    for file_name in files:
+        if file_name in hits:
+            yield file_name, hits[file_name], None
+            continue
+        file_name, result, error = next(parsed)
+        if error is None:
+            cache.put(file_name, extractor, version, result, key=keys[file_name])
+        yield file_name, result, error
+
+
+def command_line_args():
+    parser = argparse.ArgumentParser(description="Manage the parsed-log cache.")
+    parser.add_argument('command', choices=['stats', 'invalidate', 'evict'])
+    parser.add_argument('paths', nargs='*',
+                        help='Logs or directories to invalidate (default: all)')
+    parser.add_argument('--extractor', type=str, default=None,
+                        help='Only invalidate the results of this extractor')
+    parser.add_argument('--max-mb', type=float, default=None,
+                        help='Size to evict down to (default: LOG_CACHE_MB)')
+    parser.add_argument('--cache', type=str, default=None,
+                        help='Cache database (default: LOG_CACHE or ~/.cache)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    arg = command_line_args()
+    cache = LogCache(arg.cache)
+    if arg.command == 'stats':
+        print(cache.stats(), end='')
+    elif arg.command == 'invalidate':
+        print(f"Invalidated {cache.invalidate(arg.paths, arg.extractor)} results")
+    else:
+        max_bytes = None if arg.max_mb is None else int(arg.max_mb * 1024**2)
+        print(f"Evicted {cache.evict(max_bytes)} results")
+    cache.close()
@@ -0,0 +1,73 @@
+""" Streaming watch of calculation output for fatal errors.
+The Runner feeds the child's stdout through a LogWatcher while the job
+runs and kills it as soon as one of the fatal patterns of its code
+shows up, instead of checking the log after the process exits.
+"""
+import re
+from typing import Dict, List, Optional
+
+# Regular expressions per runner binary (see Runner._determine_runner).
+FATAL_PATTERNS: Dict[str, List[str]] = {
+    'common': [
+        r'Segmentation fault',
+        r'SIGSEGV',
+        r'MPI_ABORT was invoked',
+        r'BAD TERMINATION OF ONE OF YOUR APPLICATION PROCESSES',
+        r'Out of memory|Cannot allocate memory',
+    ],
+    'cp2k.ssmp': [
+        r'SCF run NOT converged',
+        r'\[ABORT\]',
+    ],
+    'pymolcas': [
+        r'/rc=_RC_\w*ERROR\w*_',
+        r'Non-zero return code',
+    ],
+    'openqp': [
+        r'SCF (is )?not converged',
+        r'Traceback \(most recent call last\)',
+    ],
+}
+
+
+def fatal_patterns(runner: str, extra: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """Patterns for a runner: common ones, code specific ones and extra."""
+    extra = extra or {}
+    patterns = FATAL_PATTERNS['common'] + FATAL_PATTERNS.get(runner, [])
+    return patterns + extra.get('common', []) + extra.get(runner, [])
+
+
+class LogWatcher:
+    """Matches fatal patterns on complete lines of a byte stream."""
+
+    # Longest partial line kept between chunks.
+    MAX_PENDING = 65536
+
+    def __init__(self, patterns: List[str]):
+        self.regex = (re.compile('|'.join(f"(?:{p})" for p in patterns))
+                      if patterns else None)
+        self.pending = b""
+        self.match: Optional[str] = None
+
+    def _scan(self, data: bytes) -> Optional[str]:
+        if self.regex is None or self.match is not None:
+            return self.match
+        text = data.decode('utf-8', errors='replace')
+        found = self.regex.search(text)
+        if found:
+            start = text.rfind('\n', 0, found.start()) + 1
+            end = text.find('\n', found.end())
+            self.match = text[start:end if end >= 0 else None].strip()
+        return self.match
+
+    def feed(self, chunk: bytes) -> Optional[str]:
+        """Scan the complete lines of chunk; return the fatal line if any."""
+        data = self.pending + chunk
+        end = data.rfind(b'\n') + 1
+        self.pending = data[end:][-self.MAX_PENDING:]
+        return self._scan(data[:end]) if end else self.match
+
+    def close(self) -> Optional[str]:
+        """Scan the unterminated last line at end of stream."""
+        data, self.pending = self.pending, b""
+        return self._scan(data) if data else self.match
@@ -0,0 +1,288 @@
+""" Memory-mapped log reader for very large GAMESS and CP2K outputs.
+MappedLog maps a log file instead of reading it into a string. Anchors
+are found with find/rfind and regular expressions on the mapped bytes,
+and only the windows a caller asks for are decoded, so memory use does
+not grow with the size of the log. Offsets are byte offsets into the
+file. LineView gives `out[il+k]` style access to lines by number for
+handlers ported from per-line loops. Lines end where str.splitlines()
+ends them once decoded: besides b'\n', at the LINE_BREAKS encodable in
+the log's encoding.
+"""
+import functools
+import mmap
+import re
+from typing import Iterator, Optional, Union
+
+# Bytes scanned at once when counting lines.
+CHUNK = 1 << 24
+
+# Line breaks of str.splitlines(), '\r\n' first.
+LINE_BREAKS = ('\r\n', '\n', '\r', '\x0b', '\x0c', '\x1c', '\x1d', '\x1e',
+               '\x85', '\u2028', '\u2029')
+
+# Bytes searched back at once for the start of a line.
+LINE_WINDOW = 4096
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str, flags: int):
+    return re.compile(pattern.encode(), flags)
+
+
+@functools.lru_cache(maxsize=16)
+def _line_breaks(encoding: str):
+    """Byte regexes of the LINE_BREAKS encodable in encoding: all of
+    them, and all but b'\n'."""
+    encoded = []
+    for line_break in LINE_BREAKS:
+        try:
+            encoded.append(line_break.encode(encoding))
+        except UnicodeEncodeError:
+            pass
+    other = [line_break for line_break in encoded if line_break != b'\n']
+    return (re.compile(b'|'.join(map(re.escape, encoded))),
+            re.compile(b'|'.join(map(re.escape, other))))
+
+
+class MappedMatch:
+    """A match on the mapped bytes with its groups decoded to str.
+
+    Offsets (start, end, span) are byte offsets, like every offset of a
+    MappedLog; group(), groups() and groupdict() return text.
+    """
+
+    def __init__(self, match: 're.Match', log: 'MappedLog'):
+        self.match = match
+        self.log = log
+
+    def _decode(self, value: Optional[bytes], default=None):
+        if value is None:
+            return default
+        return value.decode(self.log.encoding, self.log.errors)
+
+    def group(self, *idx):
+        values = self.match.group(*idx)
+        if len(idx) > 1:
+            return tuple(self._decode(value) for value in values)
+        return self._decode(values)
+
+    def __getitem__(self, idx):
+        return self.group(idx)
+
+    def groups(self, default=None) -> tuple:
+        return tuple(self._decode(value, default) for value in self.match.groups())
+
+    def groupdict(self, default=None) -> dict:
+        return {name: self._decode(value, default)
+                for name, value in self.match.groupdict().items()}
+
+    def start(self, group=0) -> int:
+        return self.match.start(group)
+
+    def end(self, group=0) -> int:
+        return self.match.end(group)
+
+    def span(self, group=0) -> tuple:
+        return self.match.span(group)
+
+    def __repr__(self) -> str:
+        return f"<MappedMatch span={self.span()} match={self.group()!r}>"
+
+
+class MappedLog:
+    """A log file mapped into memory, decoded on demand."""
+
+    def __init__(self, file_name: str, encoding: str = 'utf-8',
+                 errors: str = 'replace', sequential: bool = False):
+        self.file_name = file_name
+        self.encoding = encoding
+        self.errors = errors
+        self._file = open(file_name, 'rb')
+        try:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            # Read-ahead hint for callers that scan the whole file once.
+            if sequential and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self.buffer.madvise(mmap.MADV_SEQUENTIAL)
+        except ValueError:
+            # Empty files cannot be mapped.
+            self.buffer = b''
+        self._lines: Optional['LineView'] = None
+        self._breaks, self._other_breaks = _line_breaks(encoding)
+        self._newlines_only: Optional[bool] = None
+
+    def close(self) -> None:
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> 'MappedLog':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def _encode(self, sub: Union[str, bytes]) -> bytes:
+        return sub.encode(self.encoding) if isinstance(sub, str) else sub
+
+    def decode(self, start: int, end: Optional[int] = None) -> str:
+        """Text of the bytes [start, end)."""
+        return self.buffer[start:end].decode(self.encoding, self.errors)
+
+    def __getitem__(self, key: slice) -> str:
+        return self.decode(key.start or 0, key.stop)
+
+    def find(self, sub: Union[str, bytes], start: int = 0,
+             end: Optional[int] = None) -> int:
+        return self.buffer.find(self._encode(sub), start,
+                                len(self.buffer) if end is None else end)
+
+    def rfind(self, sub: Union[str, bytes], start: int = 0,
+              end: Optional[int] = None) -> int:
+        return self.buffer.rfind(self._encode(sub), start,
+                                 len(self.buffer) if end is None else end)
+
+    def search(self, pattern: str, flags: int = 0,
+               start: int = 0) -> Optional[MappedMatch]:
+        """First match of pattern on the mapped bytes, None if none.
+
+        Only the groups the caller reads are decoded.
+        """
+        match = _compile(pattern, flags).search(self.buffer, start)
+        return None if match is None else MappedMatch(match, self)
+
+    def finditer(self, pattern: str, flags: int = 0) -> Iterator[MappedMatch]:
+        """All matches of pattern on the mapped bytes, as in search()."""
+        for match in _compile(pattern, flags).finditer(self.buffer):
+            yield MappedMatch(match, self)
+
+    @property
+    def newlines_only(self) -> bool:
+        """True if b'\n' is the only line break in the log."""
+        if self._newlines_only is None:
+            self._newlines_only = self._other_breaks.search(self.buffer) is None
+        return self._newlines_only
+
+    def line_start(self, pos: int) -> int:
+        """Offset of the start of the line containing pos."""
+        if self.newlines_only:
+            return self.buffer.rfind(b'\n', 0, pos) + 1
+        end = pos
+        while end > 0:
+            start = max(0, end - LINE_WINDOW)
+            # Up to pos + 1, so a '\r' before a '\n' at pos is not a break.
+            ends = [match.end() for match in self._breaks.finditer(
+                self.buffer, start, min(pos + 1, len(self.buffer)))
+                if match.end() <= pos]
+            if ends:
+                return ends[-1]
+            end = start
+        return 0
+
+    def line_end(self, pos: int) -> int:
+        """Offset of the line break ending the line containing pos."""
+        if self.newlines_only:
+            end = self.buffer.find(b'\n', pos)
+            return len(self.buffer) if end < 0 else end
+        match = self._breaks.search(self.buffer, pos)
+        return len(self.buffer) if match is None else match.start()
+
+    def next_line(self, pos: int) -> int:
+        """Start of the line after the one containing pos, -1 at the end."""
+        if self.newlines_only:
+            end = self.buffer.find(b'\n', pos)
+            return -1 if end < 0 else end + 1
+        match = self._breaks.search(self.buffer, pos)
+        return -1 if match is None else match.end()
+
+    def line_at(self, pos: int) -> str:
+        """The line containing pos."""
+        return self.decode(self.line_start(pos), self.line_end(pos))
+
+    def count_lines(self, start: int = 0, end: Optional[int] = None) -> int:
+        """Number of line breaks in [start, end); b'\n' are counted
+        chunk by chunk."""
+        end = len(self.buffer) if end is None else end
+        if not self.newlines_only:
+            return sum(1 for _ in self._breaks.finditer(self.buffer, start, end))
+        count = 0
+        for chunk in range(start, end, CHUNK):
+            count += self.buffer[chunk:min(chunk + CHUNK, end)].count(b'\n')
+        return count
+
+    def line_number(self, pos: int) -> int:
+        """Number of the line containing pos, from 0."""
+        return self.count_lines(0, pos)
+
+    @property
+    def lines(self) -> 'LineView':
+        if self._lines is None:
+            self._lines = LineView(self)
+        return self._lines
+
+
+class LineView:
+    """Lines of a MappedLog by number, decoded on access.
+
+    Lines are located by walking from the last line accessed, so the
+    few lines a handler reads around an anchor cost O(distance), not
+    O(position in the file). Lines and their number are those of
+    str.splitlines() on the decoded log; negative indices count from
+    the end as in a list.
+    """
+
+    def __init__(self, log: MappedLog):
+        self.log = log
+        self.il = 0
+        self.pos = 0  # start of line il
+        self._len: Optional[int] = None
+
+    def seek(self, il: int, pos: int) -> None:
+        """Tell the view that line il starts at offset pos."""
+        self.il = il
+        self.pos = pos
+
+    def _start_of(self, il: int) -> int:
+        if il < 0:
+            il += len(self)
+            if il < 0:
+                raise IndexError(il)
+        while self.il < il:
+            start = self.log.next_line(self.pos)
+            if start < 0:
+                raise IndexError(il)
+            self.pos = start
+            self.il += 1
+        while self.il > il:
+            self.pos = self.log.line_start(self.pos - 1)
+            self.il -= 1
+        # After a final line break there is no line.
+        if self.pos >= len(self.log):
+            raise IndexError(il)
+        return self.pos
+
+    def __getitem__(self, il: int) -> str:
+        start = self._start_of(il)
+        return self.log.decode(start, self.log.line_end(start))
+
+    def __len__(self) -> int:
+        if self._len is None:
+            end = len(self.log)
+            self._len = self.log.count_lines() + (self.log.line_start(end) < end)
+        return self._len
+
+
+def search(pattern: str, content: Union[str, MappedLog], flags: int = 0):
+    """re.search on a string or a MappedLog."""
+    if isinstance(content, MappedLog):
+        return content.search(pattern, flags)
+    return re.search(pattern, content, flags)
+
+
+def finditer(pattern: str, content: Union[str, MappedLog], flags: int = 0) -> Iterator:
+    """re.finditer on a string or a MappedLog."""
+    if isinstance(content, MappedLog):
+        return content.finditer(pattern, flags)
+    return re.finditer(pattern, content, flags)
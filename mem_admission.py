@@ -0,0 +1,152 @@
+""" Memory-aware admission control for the Runner.
+Every job gets a memory estimate, from the peak RSS of similar finished
+jobs (same calculation folder, scaled by the atom count) when there is
+one, otherwise from its input: the CP2K real-space grid (CUTOFF, ABC
+cell, one grid set per &DFT section), MOLCAS_MEM for Molcas, and the
+basis size for all codes. A job is held back while starting it would
+push the node above a fraction of its RAM.
+
+@input: config dictionary, containing:
+  config['mem fraction'] = float()     # 0 = no admission control
+"""
+import math
+import os
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from job_cost import JobCostModel
+
+MB = 1024**2
+
+# Basis functions per atom for a basis factor of 1.0 (DZVP-like).
+FUNCTIONS_PER_ATOM = 13
+# Dense matrices of basis size a code keeps (overlap, KS, density, ...).
+N_MATRICES = 20
+# Real-space grids CP2K keeps per force environment.
+N_GRIDS = 40
+# Resident size of a code before any system-dependent allocation.
+BASE_BYTES = {'cp2k.ssmp': 300 * MB, 'pymolcas': 200 * MB, 'openqp': 200 * MB}
+
+CUTOFF_PATTERN = re.compile(r'^\s*CUTOFF\s+([\d.]+)', re.IGNORECASE | re.MULTILINE)
+ABC_PATTERN = re.compile(r'^\s*ABC(?:\s+\[\w+\])?\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)',
+                         re.IGNORECASE | re.MULTILINE)
+DFT_PATTERN = re.compile(r'^\s*&DFT\b', re.IGNORECASE | re.MULTILINE)
+
+# Seconds a /proc/meminfo reading is reused by admit().
+MEMINFO_TTL = 1.0
+
+
+def meminfo() -> Tuple[int, int]:
+    """(MemTotal, MemAvailable) in bytes from /proc/meminfo."""
+    values = {}
+    try:
+        with open('/proc/meminfo', 'r', encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('MemTotal', 'MemAvailable'):
+                    values[key] = int(value.split()[0]) * 1024
+    except (OSError, ValueError):
+        pass
+    total = values.get('MemTotal', 0)
+    return total, values.get('MemAvailable', total)
+
+
+class MemoryAdmission:
+    """Estimates job memory and decides whether a job may start now."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.config.update({
+            'mem fraction': self.config.get('mem fraction', 0.9),
+        })
+        self.cost_model = JobCostModel(dict(config))
+        # folder name -> [(atoms, peak rss bytes), ...] of finished jobs
+        self.history: Dict[str, List[Tuple[int, float]]] = {}
+        # input file -> (len(history) of its folder, estimate); an
+        # estimate is redone only when its folder got a new record.
+        self._estimates: Dict[str, Tuple[int, float]] = {}
+        self.reserved = 0.0
+        total, available = meminfo()
+        self._meminfo = (time.monotonic(), total, available)
+        self.total = total
+        # Memory used by everything but our jobs when the campaign starts.
+        self.baseline = total - available
+
+    def _grid_bytes(self, input_text: str) -> float:
+        """Size of the CP2K real-space grids of an input."""
+        cutoff = CUTOFF_PATTERN.search(input_text)
+        cell = ABC_PATTERN.search(input_text)
+        if not cutoff or not cell:
+            return 0.0
+        # Points per dimension of the density grid: L * sqrt(Ecut[Ry]) / pi
+        points = 1.0
+        for length in cell.groups():
+            points *= math.ceil(float(length) * 1.8897 *
+                                math.sqrt(float(cutoff.group(1))) / math.pi)
+        n_force_evals = max(1, len(DFT_PATTERN.findall(input_text)))
+        return N_GRIDS * 8 * points * n_force_evals
+
+    def _input_estimate(self, input_file: str, runner: str) -> float:
+        folder_name = os.path.basename(os.path.dirname(os.path.abspath(input_file)))
+        atoms = self.cost_model.count_atoms(input_file)
+        basis = self.cost_model.basis_factor(
+            f"{folder_name}_{os.path.basename(input_file)}")
+        n_functions = atoms * basis * FUNCTIONS_PER_ATOM
+        estimate = BASE_BYTES.get(runner, 200 * MB) + N_MATRICES * 8 * n_functions**2
+
+        if runner == 'cp2k.ssmp':
+            with open(input_file, 'r', encoding="utf-8", errors="replace") as f:
+                estimate += self._grid_bytes(f.read())
+        elif runner == 'pymolcas':
+            # Molcas allocates MOLCAS_MEM (MB, default 1024) up front.
+            estimate += int(os.environ.get('MOLCAS_MEM', '1024')) * MB
+        return estimate
+
+    def estimate(self, input_file: str, runner: str) -> float:
+        """Expected peak memory of a job in bytes."""
+        folder_name = os.path.basename(os.path.dirname(os.path.abspath(input_file)))
+        n_records = len(self.history.get(folder_name, ()))
+        cached = self._estimates.get(input_file)
+        if cached is None or cached[0] != n_records:
+            cached = n_records, self._estimate(input_file, runner, folder_name)
+            self._estimates[input_file] = cached
+        return cached[1]
+
+    def _estimate(self, input_file: str, runner: str, folder_name: str) -> float:
+        history = self.history.get(folder_name)
+        if history:
+            atoms = self.cost_model.count_atoms(input_file)
+            # Closest system size seen, memory scaled quadratically.
+            ref_atoms, ref_rss = min(history, key=lambda h: abs(h[0] - atoms))
+            return ref_rss * max(1.0, (atoms / ref_atoms) ** 2)
+        return self._input_estimate(input_file, runner)
+
+    def record(self, input_file: str, peak_rss_mb: float) -> None:
+        """Remember the measured peak RSS of a finished job."""
+        if peak_rss_mb <= 0:
+            return
+        folder_name = os.path.basename(os.path.dirname(os.path.abspath(input_file)))
+        self.history.setdefault(folder_name, []).append(
+            (self.cost_model.count_atoms(input_file), peak_rss_mb * MB))
+
+    def admit(self, estimate: float, running: int) -> bool:
+        """True if a job of estimate bytes may start now.
+
+        The projected use is the larger of the live use and the baseline
+        plus the estimates of running jobs. A lone job always starts.
+        """
+        if running == 0 or self.total == 0:
+            return True
+        read_at, total, available = self._meminfo
+        if time.monotonic() - read_at > MEMINFO_TTL:
+            total, available = meminfo()
+            self._meminfo = (time.monotonic(), total, available)
+        projected = max(total - available, self.baseline + self.reserved)
+        return projected + estimate <= self.config['mem fraction'] * total
+
+    def reserve(self, estimate: float) -> None:
+        self.reserved += estimate
+
+    def release(self, estimate: float) -> None:
+        self.reserved = max(0.0, self.reserved - estimate)
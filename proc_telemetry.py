@@ -0,0 +1,215 @@
+""" Resource telemetry of Runner jobs sampled from /proc.
+ProcessTreeSampler follows every process of a job (the Runner starts
+each job in its own session, led by the job's process) and records peak
+RSS, CPU time, involuntary context switches and I/O bytes. The tree is
+walked from the session leader through /proc/<pid>/task/*/children, so
+a sample costs a few reads per process of the job instead of a scan of
+all of /proc; kernels without that file fall back to the scan.
+NodeTimeline logs node-wide CPU usage and the number of running jobs,
+so idle gaps of a campaign are visible.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+# /proc/<pid>/task/<tid>/children needs CONFIG_PROC_CHILDREN.
+HAS_CHILDREN = os.path.exists(f"/proc/self/task/{os.getpid()}/children")
+
+
+def _read_stat(pid: str) -> Optional[Tuple[int, float, int]]:
+    """(session, cpu seconds, rss bytes) of a process from /proc/<pid>/stat."""
+    try:
+        with open(f"/proc/{pid}/stat", 'r', encoding="utf-8") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # Fields after the command name, which may contain spaces.
+    fields = data[data.rfind(')') + 2:].split()
+    session = int(fields[3])
+    cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    rss = int(fields[21]) * PAGE_SIZE
+    return session, cpu, rss
+
+
+def _read_keys(path: str, keys: Tuple[str, ...]) -> Dict[str, int]:
+    """Integer 'key: value' entries of /proc/<pid>/status or io."""
+    values = {}
+    try:
+        with open(path, 'r', encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in keys:
+                    values[key] = int(value.split()[0])
+    except (OSError, ValueError):
+        pass
+    return values
+
+
+def _pids() -> Iterator[str]:
+    try:
+        names = os.listdir('/proc')
+    except OSError:
+        return iter(())
+    return (name for name in names if name.isdigit())
+
+
+def _children(pid: str) -> List[str]:
+    """Child pids of all threads of a process."""
+    children = []
+    try:
+        tasks = os.listdir(f"/proc/{pid}/task")
+    except OSError:
+        return children
+    for tid in tasks:
+        try:
+            with open(f"/proc/{pid}/task/{tid}/children", 'r', encoding="utf-8") as f:
+                children += f.read().split()
+        except OSError:
+            pass
+    return children
+
+
+def _tree(leader: int) -> Iterator[str]:
+    """Pids of a process and its descendants, parents first."""
+    stack = [str(leader)]
+    while stack:
+        pid = stack.pop()
+        yield pid
+        stack += _children(pid)
+
+
+class ProcessTreeSampler:
+    """Background thread polling the process tree of a job."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.session: Optional[int] = None
+        self.peak_rss = 0
+        # Last seen counters per pid; exited processes keep their values.
+        self.cpu: Dict[str, float] = {}
+        self.ctx: Dict[str, int] = {}
+        self.io: Dict[str, Tuple[int, int]] = {}
+        self.start_time = time.perf_counter()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self) -> None:
+        self.start_time = time.perf_counter()
+        self._thread.start()
+
+    def watch(self, pid: int) -> None:
+        """Follow the session led by pid (one per attempt)."""
+        with self._lock:
+            self.session = pid
+        self.sample()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """Take one sample of all processes in the watched session."""
+        with self._lock:
+            session = self.session
+            if session is None:
+                return
+            rss_total = 0
+            for pid in _tree(session) if HAS_CHILDREN else _pids():
+                stat = _read_stat(pid)
+                if stat is None or stat[0] != session:
+                    continue
+                key = f"{session}:{pid}"
+                self.cpu[key] = stat[1]
+                rss_total += stat[2]
+                status = _read_keys(f"/proc/{pid}/status",
+                                    ('nonvoluntary_ctxt_switches',))
+                if status:
+                    self.ctx[key] = status['nonvoluntary_ctxt_switches']
+                io = _read_keys(f"/proc/{pid}/io", ('read_bytes', 'write_bytes'))
+                if io:
+                    self.io[key] = (io.get('read_bytes', 0), io.get('write_bytes', 0))
+            self.peak_rss = max(self.peak_rss, rss_total)
+
+    def summary(self, threads: int) -> Dict[str, float]:
+        """Telemetry of the job, to be stored in its result record."""
+        wall = max(time.perf_counter() - self.start_time, 1e-9)
+        cpu_seconds = sum(self.cpu.values())
+        return {
+            'peak rss mb': self.peak_rss / 1024**2,
+            'cpu seconds': cpu_seconds,
+            'avg cpu cores': cpu_seconds / wall,
+            'cpu utilization': cpu_seconds / wall / max(1, threads),
+            'involuntary ctx switches': sum(self.ctx.values()),
+            'read mb': sum(r for r, _ in self.io.values()) / 1024**2,
+            'write mb': sum(w for _, w in self.io.values()) / 1024**2,
+        }
+
+
+class NodeTimeline:
+    """Background thread writing node CPU usage and running jobs to CSV."""
+
+    def __init__(self, path: str, interval: float, total_cpus: int,
+                 running: Callable[[], int]):
+        self.path = path
+        self.interval = interval
+        self.total_cpus = total_cpus
+        self.running = running
+        self.samples = 0
+        self.busy_sum = 0.0
+        self.idle_core_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    @staticmethod
+    def _cpu_times() -> Tuple[float, float]:
+        """(busy, total) jiffies of all CPUs from /proc/stat."""
+        try:
+            with open('/proc/stat', 'r', encoding="utf-8") as f:
+                values = [int(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return 0.0, 0.0
+        idle = values[3] + (values[4] if len(values) > 4 else 0)
+        return sum(values) - idle, sum(values)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _loop(self) -> None:
+        n_cpus = os.cpu_count() or 1
+        start = time.perf_counter()
+        busy0, total0 = self._cpu_times()
+        with open(self.path, 'w', encoding="utf-8") as f:
+            f.write("elapsed s,busy cpus,running jobs\n")
+            while not self._stop.wait(self.interval):
+                busy1, total1 = self._cpu_times()
+                if total1 <= total0:
+                    continue
+                busy_cpus = n_cpus * (busy1 - busy0) / (total1 - total0)
+                busy0, total0 = busy1, total1
+                f.write(f"{time.perf_counter() - start:.1f},{busy_cpus:.2f},"
+                        f"{self.running()}\n")
+                f.flush()
+                self.samples += 1
+                self.busy_sum += min(busy_cpus, self.total_cpus)
+                self.idle_core_seconds += (max(0.0, self.total_cpus - busy_cpus)
+                                           * self.interval)
+
+    def mean_utilization(self) -> float:
+        """Mean fraction of the Runner's CPUs that were busy."""
+        if not self.samples:
+            return 0.0
+        return self.busy_sum / self.samples / max(1, self.total_cpus)
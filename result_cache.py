@@ -0,0 +1,199 @@
+""" Content-addressed cache of calculation outputs for the Runner.
+The key hashes everything that determines a result: the input file and
+its name, the geometry files it references, the other inputs and
+scripts of its folder (FAT-Molcas extern_N.inp, run scripts), the
+resolved runner binary and a set of environment variables. Only the
+job's own outputs are stored, the files named after its input, so jobs
+sharing a folder never pick up each other's files. A hit restores (or
+hard-links) the stored log and outputs instead of running the code again.
+
+Layout: <cache dir>/<key[:2]>/<key>/{manifest.json, files...}
+Eviction is LRU by the manifest mtime, which is touched on each hit.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from typing import Dict, List, Optional, Tuple
+
+from job_ledger import file_hash
+from warm_restart import is_restart_input
+
+# Environment variables that change what the codes compute.
+CACHE_ENV = ['CP2K_DATA_DIR', 'MOLCAS', 'MOLCAS_MEM', 'OPENQP_ROOT',
+             'OMP_STACKSIZE']
+
+# Geometry files referenced from CP2K, Molcas and OpenQP inputs.
+REFERENCE_PATTERN = re.compile(r'[\w$./-]+\.xyz\b')
+
+# Files next to an input that are part of the calculation.
+SIBLING_EXTENSIONS = ('.inp', '.sh', '.py')
+
+# Characters that may follow the input name in the name of an output.
+OUTPUT_SEPARATORS = '.-_'
+
+Snapshot = Dict[str, Tuple[int, int]]
+
+
+def snapshot(directory: str) -> Snapshot:
+    """Name -> (mtime_ns, size) of the regular files in directory."""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False):
+                stat = entry.stat()
+                files[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def siblings(input_file: str) -> List[str]:
+    """Other inputs and scripts in the input's folder, sorted."""
+    input_dir = os.path.dirname(os.path.abspath(input_file))
+    name = os.path.basename(input_file)
+    with os.scandir(input_dir) as entries:
+        return sorted(entry.path for entry in entries
+                      if entry.name != name and entry.name.endswith(SIBLING_EXTENSIONS)
+                      and not is_restart_input(entry.name) and entry.is_file())
+
+
+def job_outputs(names: List[str], input_file: str) -> List[str]:
+    """The names that are outputs of input_file: its stem followed by a
+    separator, and not the longer stem of another input of the folder
+    (a.inp does not own a_1.log when a_1.inp exists)."""
+    stem = os.path.splitext(os.path.basename(input_file))[0]
+    longer = [os.path.splitext(os.path.basename(path))[0]
+              for path in siblings(input_file) if path.endswith('.inp')]
+    longer = [other for other in longer if other != stem and other.startswith(stem)]
+
+    def owned(name: str, prefix: str) -> bool:
+        return (name.startswith(prefix) and len(name) > len(prefix)
+                and name[len(prefix)] in OUTPUT_SEPARATORS)
+
+    return [name for name in names
+            if owned(name, stem) and not any(owned(name, other) for other in longer)]
+
+
+class ResultCache:
+    """Size-bounded LRU cache of calculation outputs."""
+
+    def __init__(self, cache_dir: str, max_bytes: int, link: bool = False,
+                 env_vars: Optional[List[str]] = None):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_bytes = max_bytes
+        self.link = link
+        self.env_vars = CACHE_ENV if env_vars is None else env_vars
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _references(self, input_file: str) -> List[str]:
+        """Existing files referenced by the input, relative to its dir."""
+        input_dir = os.path.dirname(os.path.abspath(input_file))
+        with open(input_file, 'r', encoding="utf-8", errors="replace") as f:
+            content = f.read()
+        paths = set()
+        for match in REFERENCE_PATTERN.findall(content):
+            path = match.replace('$CurrDir', input_dir)
+            path = os.path.normpath(os.path.join(input_dir, path))
+            if os.path.isfile(path):
+                paths.add(path)
+        return sorted(paths)
+
+    def key(self, input_file: str, runner: str) -> str:
+        """Hash of input and its name, referenced files, sibling inputs
+        and scripts, runner binary and environment."""
+        digest = hashlib.sha256()
+        digest.update(f"input {os.path.basename(input_file)} "
+                      f"{file_hash(input_file)}\n".encode())
+        for path in self._references(input_file):
+            digest.update(f"ref {os.path.basename(path)} {file_hash(path)}\n".encode())
+        for path in siblings(input_file):
+            digest.update(f"sibling {os.path.basename(path)} {file_hash(path)}\n".encode())
+        binary = shutil.which(runner) or runner
+        try:
+            stat = os.stat(binary)
+            digest.update(f"bin {os.path.realpath(binary)} {stat.st_size} "
+                          f"{stat.st_mtime_ns}\n".encode())
+        except OSError:
+            digest.update(f"bin {binary}\n".encode())
+        for var in self.env_vars:
+            digest.update(f"env {var}={os.environ.get(var, '')}\n".encode())
+        return digest.hexdigest()
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def restore(self, key: str, output_dir: str) -> Optional[List[str]]:
+        """Put cached outputs into output_dir; their names, None on a miss."""
+        entry = self._entry(key)
+        manifest = os.path.join(entry, "manifest.json")
+        try:
+            with open(manifest, 'r', encoding="utf-8") as f:
+                names = json.load(f)['files']
+        except (OSError, ValueError, KeyError):
+            return None
+
+        for name in names:
+            source = os.path.join(entry, name)
+            target = os.path.join(output_dir, name)
+            if os.path.lexists(target):
+                os.remove(target)
+            if self.link:
+                try:
+                    os.link(source, target)
+                    continue
+                except OSError:
+                    pass
+            shutil.copy2(source, target)
+        os.utime(manifest)
+        return names
+
+    def store(self, key: str, input_file: str, output_dir: str, before: Snapshot,
+              exclude: List[str]) -> None:
+        """Cache the outputs of input_file (see job_outputs) created or
+        changed in output_dir since before."""
+        after = snapshot(output_dir)
+        names = job_outputs(sorted(name for name, stat in after.items()
+                                   if before.get(name) != stat and name not in exclude),
+                            input_file)
+        entry = self._entry(key)
+        if not names or os.path.isdir(entry):
+            return
+
+        tmp = f"{entry}.tmp-{os.getpid()}"
+        os.makedirs(tmp, exist_ok=True)
+        for name in names:
+            shutil.copy2(os.path.join(output_dir, name), os.path.join(tmp, name))
+        with open(os.path.join(tmp, "manifest.json"), 'w', encoding="utf-8") as f:
+            json.dump({'files': names, 'stored': time.time()}, f)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another worker stored the same key first.
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries until under max_bytes."""
+        entries = []
+        total = 0
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry = os.path.join(prefix_dir, key)
+                manifest = os.path.join(entry, "manifest.json")
+                if not os.path.isfile(manifest):
+                    continue
+                size = sum(os.path.getsize(os.path.join(entry, name))
+                           for name in os.listdir(entry))
+                entries.append((os.path.getmtime(manifest), size, entry))
+                total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,127 @@
+""" Live status of a Runner campaign.
+The Runner rewrites a JSON status file and a Prometheus textfile
+(node_exporter textfile collector format) on every job transition, so
+a multi-day campaign can be watched and rebalanced while it runs.
+Both files are replaced atomically.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+
+def _write_atomic(path: str, content: str) -> None:
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'w', encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _format_seconds(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "-"
+    hours, rem = divmod(int(seconds), 3600)
+    return f"{hours:d}:{rem // 60:02d}:{rem % 60:02d}"
+
+
+class StatusWriter:
+    """Writes campaign counters, throughput and ETA to status files.
+
+    Finished jobs are counted once, by record(); an update only formats
+    the running totals.
+    """
+
+    def __init__(self, json_path: str, prom_path: str, info: Dict[str, Any]):
+        self.json_path = json_path
+        self.prom_path = prom_path
+        self.info = info
+        self.started = time.time()
+        self.completed = 0
+        self.failed = 0
+        # Total duration and number of executed jobs by runner.
+        self.durations: Dict[str, List[float]] = {}
+
+    def record(self, result: Dict[str, Any]) -> None:
+        """Count a finished job."""
+        if result['status'] == 'COMPLETED':
+            self.completed += 1
+        else:
+            self.failed += 1
+        if result.get('runner') and not result.get('cached'):
+            total = self.durations.setdefault(result['runner'], [0.0, 0])
+            total[0] += result['execution time']
+            total[1] += 1
+
+    def status(self, queued: int, running: int, state: str) -> Dict[str, Any]:
+        """Status record from the queue sizes and the recorded jobs."""
+        elapsed = max(time.time() - self.started, 1e-9)
+        jobs_per_hour = (self.completed + self.failed) / elapsed * 3600
+        remaining = queued + running
+        eta = remaining / jobs_per_hour * 3600 if jobs_per_hour > 0 else None
+        return dict(self.info, **{
+            'state': state,
+            'pid': os.getpid(),
+            'started': self.started,
+            'updated': time.time(),
+            'queued': queued,
+            'running': running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'jobs per hour': jobs_per_hour,
+            'eta seconds': eta,
+            'mean duration seconds': {runner: total / count for runner, (total, count)
+                                      in sorted(self.durations.items())},
+        })
+
+    def _prometheus(self, status: Dict[str, Any]) -> str:
+        eta = status['eta seconds'] if status['eta seconds'] is not None else float('nan')
+        lines = [
+            "# HELP runner_jobs Number of Runner jobs by state.",
+            "# TYPE runner_jobs gauge",
+        ]
+        for state in ('queued', 'running', 'completed', 'failed'):
+            lines.append(f'runner_jobs{{state="{state}"}} {status[state]}')
+        lines += [
+            "# HELP runner_jobs_per_hour Finished jobs per hour since start.",
+            "# TYPE runner_jobs_per_hour gauge",
+            f"runner_jobs_per_hour {status['jobs per hour']:.6g}",
+            "# HELP runner_eta_seconds Estimated seconds until all jobs finish.",
+            "# TYPE runner_eta_seconds gauge",
+            f"runner_eta_seconds {eta:.6g}",
+            "# HELP runner_mean_duration_seconds Mean job duration by runner.",
+            "# TYPE runner_mean_duration_seconds gauge",
+        ]
+        for runner, mean in status['mean duration seconds'].items():
+            lines.append(f'runner_mean_duration_seconds{{runner="{runner}"}} {mean:.6g}')
+        lines += [
+            "# HELP runner_last_update_timestamp_seconds Time of the last update.",
+            "# TYPE runner_last_update_timestamp_seconds gauge",
+            f"runner_last_update_timestamp_seconds {status['updated']:.3f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def update(self, queued: int, running: int, state: str = 'running') -> None:
+        """Rewrite both status files."""
+        status = self.status(queued, running, state)
+        if self.json_path:
+            _write_atomic(self.json_path, json.dumps(status, indent=2) + "\n")
+        if self.prom_path:
+            _write_atomic(self.prom_path, self._prometheus(status))
+
+
+def format_status(path: str) -> str:
+    """Human readable summary of a status file, for runner.py --status."""
+    with open(path, 'r', encoding="utf-8") as f:
+        status = json.load(f)
+    age = time.time() - status['updated']
+    text = (f"State: {status['state']} (pid {status['pid']}, "
+            f"updated {age:.0f} s ago)\n"
+            f"Input: {status.get('input path', '-')}\n"
+            f"Queued: {status['queued']}  Running: {status['running']}  "
+            f"Completed: {status['completed']}  Failed: {status['failed']}\n"
+            f"Elapsed: {_format_seconds(status['updated'] - status['started'])}  "
+            f"Throughput: {status['jobs per hour']:.1f} jobs/h  "
+            f"ETA: {_format_seconds(status['eta seconds'])}\n")
+    for runner, mean in status['mean duration seconds'].items():
+        text += f"Mean duration {runner}: {_format_seconds(mean)}\n"
+    return text
@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
 import os
+import shlex
+import signal
 import subprocess
+import sys
 import time
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
+
+from cpu_topology import (PIN_POLICIES, CpuAllocator, CpuTopology,
+                          format_cpulist, pin_command)
+from input_watch import InputWatcher, iter_input_files
+from job_cost import JobCostModel
+from job_ledger import JobLedger
+from log_watch import LogWatcher, fatal_patterns
+from mem_admission import MB, MemoryAdmission
+from proc_telemetry import NodeTimeline, ProcessTreeSampler
+from result_cache import ResultCache, snapshot
+from run_status import StatusWriter, format_status
+from scratch import COPY_BACK, ScratchManager
+from slurm_array import SlurmArraySubmitter
+from warm_restart import restart_inputs, warm_restart
 
 
 class Runner:
@@ -18,24 +37,97 @@ class Runner:
             'max restarts': self.config.get('max restarts', 3),
             'output to log': self.config.get('output to log', True),
             'folder criterion': self.config.get('folder criterion', ''),
+            'schedule': self.config.get('schedule', 'uniform'),
+            'min omp threads': self.config.get('min omp threads', 1),
+            'pinning': self.config.get('pinning', 'none'),
+            'mem fraction': self.config.get('mem fraction', 0.9),
+            'engine': self.config.get('engine', 'process'),
+            'timeout': self.config.get('timeout', 0),
+            'warm restart': self.config.get('warm restart', True),
+            'restart backoff': self.config.get('restart backoff', 1.0),
+            'restart halve threads': self.config.get('restart halve threads', False),
+            'watch log': self.config.get('watch log', True),
+            'fatal patterns': self.config.get('fatal patterns', {}),
+            'ledger': self.config.get('ledger', 'runner_ledger.db'),
+            'resume': self.config.get('resume', False),
+            'cache': self.config.get('cache', True),
+            'cache dir': self.config.get('cache dir', '~/.cache/runner'),
+            'cache size': self.config.get('cache size', 20 * 1024**3),
+            'cache link': self.config.get('cache link', False),
+            'scratch': self.config.get('scratch', False),
+            'scratch dir': self.config.get('scratch dir', ''),
+            'copy back': self.config.get('copy back', COPY_BACK),
+            'watch': self.config.get('watch', False),
+            'watch interval': self.config.get('watch interval', 5.0),
+            'watch idle': self.config.get('watch idle', 60.0),
+            'telemetry interval': self.config.get('telemetry interval', 1.0),
+            'timeline file': self.config.get('timeline file', 'runner_timeline.csv'),
+            'status file': self.config.get('status file', 'runner_status.json'),
+            'metrics file': self.config.get('metrics file', 'runner_status.prom'),
+            'backend': self.config.get('backend', 'local'),
+            'slurm': self.config.get('slurm', {}),
+            'scan inputs': self.config.get('scan inputs', True),
             'input files': [],
             'results': []
         })
 
-        self.config['max workers'] = max(1, self.config['total cpus'] //
-                                          self.config['omp threads'])
+        if self.config['schedule'] == 'cost':
+            self.config['max workers'] = max(1, self.config['total cpus'] //
+                                              self.config['min omp threads'])
+        else:
+            self.config['max workers'] = max(1, self.config['total cpus'] //
+                                              self.config['omp threads'])
 
         os.environ['OMP_NUM_THREADS'] = str(self.config['omp threads'])
 
-        if isinstance(self.config['input path'], str):
+        self.ledger = (JobLedger(self.config['ledger'])
+                       if self.config['ledger'] else None)
+        self.cache = (ResultCache(self.config['cache dir'], self.config['cache size'],
+                                  self.config['cache link'])
+                      if self.config['cache'] else None)
+        self.scratch = (ScratchManager(self.config['scratch dir'] or None,
+                                       self.config['copy back'])
+                        if self.config['scratch'] else None)
+        self.admission = (MemoryAdmission(dict(self.config))
+                          if self.config['mem fraction'] > 0 else None)
+        if self.admission and self.ledger:
+            for record in self.ledger.completed():
+                if 'telemetry' in record:
+                    self.admission.record(record['input file'],
+                                          record['telemetry']['peak rss mb'])
+        self.timeline: Optional[NodeTimeline] = None
+        self.status: Optional[StatusWriter] = None
+        self.running_jobs = 0
+
+        if self.config['scan inputs'] and isinstance(self.config['input path'], str):
             if os.path.isfile(self.config['input path']):
                 if self.config['input path'].endswith('.inp'):
                     self.config['input files'] = [self.config['input path']]
                 elif self.config['input path'].endswith('_report.txt'):
                     self._load_failed_from_report()
+                elif self.config['input path'].endswith('.db'):
+                    self._load_failed_from_ledger()
             else:
                 self.config['input files'] = self._find_input_files()
 
+        if self.config['resume'] and self.ledger:
+            total = len(self.config['input files'])
+            self.config['input files'] = self.ledger.pending(self.config['input files'])
+            self._log(f"Resuming: {total - len(self.config['input files'])} "
+                      f"of {total} calculations already completed")
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Do not send the ledger, timeline or status to worker processes."""
+        state = self.__dict__.copy()
+        state['ledger'] = None
+        state['timeline'] = None
+        state['status'] = None
+        return state
+
+    def _is_retry(self) -> bool:
+        """True if the inputs are failed jobs of a previous report/ledger."""
+        return self.config['input path'].endswith(('_report.txt', '.db'))
+
     def _log(self, message: str):
         """Simple logging function to stdout."""
         print(f"[Runner] {message}")
@@ -57,111 +149,441 @@ class Runner:
 
     def _find_input_files(self) -> List[str]:
         """Find all input files in directory that match criteria."""
-        input_files = []
-        input_path = self.config['input path']
-        criterion = self.config['folder criterion']
+        return sorted(iter_input_files(self.config['input path'],
+                                       self.config['folder criterion']))
 
-        for root, _, files in os.walk(input_path):
-            if criterion and criterion not in root:
-                continue
-            for file in files:
-                if file.endswith('.inp') and 'extern' not in file:
-                    input_files.append(os.path.join(root, file))
+    def _input_watcher(self) -> Optional[InputWatcher]:
+        """Watcher of the input tree in watch mode, None otherwise."""
+        if not (self.config['watch'] and os.path.isdir(self.config['input path'])):
+            return None
+        watcher = InputWatcher(self.config['input path'],
+                               self.config['folder criterion'],
+                               self.config['watch interval'],
+                               self.config['watch idle'])
+        watcher.mark_seen(self.config['input files'])
+        self._log(f"Watching {self.config['input path']} for new inputs "
+                  f"(stops after {self.config['watch idle']:g} s without any)")
+        return watcher
 
-        return sorted(input_files)
+    def _poll_inputs(self, watcher: Optional[InputWatcher],
+                     pending: List[Dict[str, Any]]) -> None:
+        """Queue inputs that appeared since the last poll."""
+        if not watcher or not watcher.due():
+            return
+        new = watcher.poll()
+        if self.config['resume'] and self.ledger:
+            new = self.ledger.pending(new)
+        if not new:
+            return
+        self._log(f"Found {len(new)} new input files")
+        self.config['input files'].extend(new)
+        pending.extend(self._plan_jobs(new))
+        if self.config['schedule'] == 'cost':
+            pending.sort(key=lambda job: job['cost'], reverse=True)
 
-    def _run_single_calculation(self, input_file: str) -> Dict[str, Any]:
-        """Run a single calculation with automatic restarts on segfaults."""
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        input_dir = os.path.dirname(input_file)
+    def _watching(self, watcher: Optional[InputWatcher]) -> bool:
+        """True while the watched tree may still get new inputs."""
+        return watcher is not None and not watcher.idle()
 
+    def _output_dir(self, input_file: str) -> str:
+        """Directory in which a calculation runs and writes its log."""
         # For retry from report, use original directory structure
-        if self.config['input path'].endswith('_report.txt'):
-            output_dir = os.path.dirname(input_file)
+        if self._is_retry():
+            return os.path.dirname(input_file)
         # For single file input
-        elif os.path.isfile(self.config['input path']):
-            output_dir = self.config['output dir']
+        if os.path.isfile(self.config['input path']):
+            return self.config['output dir']
         # For directory input
-        else:
-            output_subdir = os.path.relpath(input_dir, self.config['input path'])
-            output_dir = os.path.join(self.config['output dir'], output_subdir)
+        output_subdir = os.path.relpath(os.path.dirname(input_file),
+                                        self.config['input path'])
+        return os.path.join(self.config['output dir'], output_subdir)
 
+    def _new_result(self, input_file: str, omp_threads: int,
+                    cpus: Optional[List[int]]) -> Dict[str, Any]:
+        """Create the result record of a calculation and its output dir."""
+        base_name = os.path.splitext(os.path.basename(input_file))[0]
+        output_dir = self._output_dir(input_file)
         os.makedirs(output_dir, exist_ok=True)
-        log_file = f"{base_name}.log"
 
         result = {
             "input file": input_file,
-            "log file": os.path.join(output_dir, log_file),
+            "log file": os.path.join(output_dir, f"{base_name}.log"),
             "status": "UNKNOWN",
             "message": "",
             "execution time": 0,
-            "restarts": 0
+            "restarts": 0,
+            "omp threads": omp_threads,
+            "cpu set": format_cpulist(cpus) if cpus else "-"
         }
 
         if not os.path.exists(input_file):
             result["status"] = "ERROR"
             result["message"] = f"Input file {input_file} not found"
-            return result
+        return result
+
+    def _command(self, input_file: str, cpus: Optional[List[int]],
+                 mem_nodes: Optional[List[int]],
+                 run_input: Optional[str] = None) -> str:
+        """Command line of a calculation, pinned if CPUs were assigned."""
+        runner = self._determine_runner(os.path.basename(os.path.dirname(input_file)))
+        command = f"{runner} {run_input or os.path.basename(input_file)}"
+        if cpus:
+            command = pin_command(command, cpus, mem_nodes or [])
+        return command
+
+    def _watcher(self, input_file: str) -> LogWatcher:
+        """Log watcher with the fatal patterns of the input's code."""
+        if not self.config['watch log']:
+            return LogWatcher([])
+        runner = self._determine_runner(os.path.basename(os.path.dirname(input_file)))
+        return LogWatcher(fatal_patterns(runner, self.config['fatal patterns']))
+
+    def _check_attempt(self, result: Dict[str, Any], attempt: int, command: str,
+                       returncode: int, fatal: Optional[str]) -> bool:
+        """Record the outcome of an attempt; True if it should be restarted.
+
+        Segfaults and fatal log patterns trigger the restart policy.
+        """
+        if returncode == 0 and fatal is None:
+            result["status"] = "COMPLETED"
+            result["message"] = "Calculation completed successfully"
+            return False
+
+        result["status"] = "ERROR"
+        if fatal is not None:
+            result["message"] = f"Error: Fatal pattern in output: {fatal}"
+        else:
+            result["message"] = (f"Error: Command '{command}' returned "
+                                 f"non-zero exit status {returncode}.")
+        if fatal is None and returncode not in (139, -signal.SIGSEGV):
+            return False
+
+        result["restarts"] += 1
+        if attempt < self.config['max restarts']:
+            self._log(f"{'Fatal error' if fatal else 'Segmentation fault'} "
+                      f"detected. Restarting (Attempt {attempt + 2}/"
+                      f"{self.config['max restarts'] + 1})")
+            return True
+        result["message"] += "\nMax restarts reached."
+        return False
+
+    def _restart_delay(self, attempt: int) -> float:
+        """Exponential backoff before restart number attempt + 1."""
+        return self.config['restart backoff'] * 2 ** attempt
+
+    def _restart(self, input_file: str, run_dir: str, result: Dict[str, Any],
+                 cpus: Optional[List[int]], mem_nodes: Optional[List[int]],
+                 env: Dict[str, str]) -> Tuple[str, Dict[str, str]]:
+        """Command and environment of the next attempt after a crash.
+
+        The input is restarted from the crashed run's wavefunction when
+        the code has a restart strategy, and the OMP threads are halved
+        if requested.
+        """
+        run_input = None
+        if self.config['warm restart']:
+            runner = self._determine_runner(
+                os.path.basename(os.path.dirname(input_file)))
+            restart = warm_restart(runner, input_file, run_dir)
+            if restart:
+                run_input, how = restart
+                result["warm restarts"] = result.get("warm restarts", 0) + 1
+                self._log(f"Warm restart of {os.path.abspath(input_file)}: {how}")
+        if self.config['restart halve threads']:
+            threads = max(1, int(env['OMP_NUM_THREADS']) // 2)
+            env = dict(env, OMP_NUM_THREADS=str(threads))
+            result["omp threads"] = threads
+        return self._command(input_file, cpus, mem_nodes, run_input), env
+
+    def _cache_restore(self, input_file: str,
+                       result: Dict[str, Any]) -> Optional[str]:
+        """Look the calculation up in the result cache.
+
+        On a hit the outputs are restored and result is marked COMPLETED.
+        Returns the cache key, None if caching is off.
+        """
+        # A log hard-linked by an earlier hit must not be truncated in place.
+        log_file = result["log file"]
+        if os.path.exists(log_file) and os.stat(log_file).st_nlink > 1:
+            os.remove(log_file)
+        if not self.cache:
+            return None
+
+        runner = self._determine_runner(os.path.basename(os.path.dirname(input_file)))
+        key = self.cache.key(input_file, runner)
+        restored = self.cache.restore(key, os.path.dirname(log_file))
+        if restored is not None:
+            self._log(f"Cache hit for {os.path.abspath(input_file)}")
+            result["status"] = "COMPLETED"
+            result["message"] = f"Restored {len(restored)} files from cache"
+            result["cached"] = True
+        return key
+
+    def _cache_store(self, key: Optional[str], input_file: str,
+                     result: Dict[str, Any], before: Dict) -> None:
+        """Store the outputs of a completed calculation in the cache."""
+        if key and result["status"] == "COMPLETED":
+            self.cache.store(key, input_file, os.path.dirname(result["log file"]), before,
+                             exclude=[os.path.basename(input_file)]
+                             + restart_inputs(input_file))
+
+    def _stage(self, output_dir: str, result: Dict[str, Any]) -> Optional[str]:
+        """Directory to run in: a node-local copy of output_dir if enabled."""
+        if not self.scratch:
+            return output_dir
+        try:
+            return self.scratch.stage(output_dir)
+        except OSError as e:
+            result["status"] = "ERROR"
+            result["message"] = f"Error: Staging to scratch failed: {str(e)}"
+            return None
+
+    def _copy_back(self, input_file: str, result: Dict[str, Any],
+                   run_dir: str, staged: Dict) -> None:
+        """Copy whitelisted outputs from scratch and remove the scratch dir.
+
+        Files unchanged since staging are not copied. A failed copy
+        marks the job ERROR and keeps the scratch dir.
+        """
+        if not self.scratch:
+            return
+        output_dir = os.path.dirname(result["log file"])
+        try:
+            self.scratch.copy_back(run_dir, output_dir, exclude=[
+                os.path.basename(input_file), os.path.basename(result["log file"])],
+                staged=staged)
+        except OSError as e:
+            result["status"] = "ERROR"
+            result["message"] += f"\nCopy-back failed, scratch kept at {run_dir}: {e}"
+            return
+        self.scratch.cleanup(run_dir)
 
-        runner = self._determine_runner(os.path.basename(input_dir))
+    def _finish(self, input_file: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy back and cache the outputs of a job whose process has exited.
+
+        The schedulers run this in a thread after releasing the job's
+        CPUs and memory, for results that have a 'finish' entry (jobs
+        that ran).
+        """
+        cache_key, run_dir, before = result.pop('finish')
+        # The output dir is staged right after the snapshot before.
+        self._copy_back(input_file, result, run_dir, before)
+        self._cache_store(cache_key, input_file, result, before)
+        return result
+
+    def _sampler(self) -> Optional[ProcessTreeSampler]:
+        """Started /proc sampler for one job, None if telemetry is off."""
+        if self.config['telemetry interval'] <= 0:
+            return None
+        sampler = ProcessTreeSampler(self.config['telemetry interval'])
+        sampler.start()
+        return sampler
+
+    def _kill_group(self, pid: int) -> None:
+        """Kill a job and all its children, it runs in its own session."""
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def _run_single_calculation(self, input_file: str,
+                                omp_threads: Optional[int] = None,
+                                cpus: Optional[List[int]] = None,
+                                mem_nodes: Optional[List[int]] = None,
+                                finish: bool = True) -> Dict[str, Any]:
+        """Run a single calculation with automatic restarts on fatal errors.
+
+        The child's output is watched while it runs and the job is
+        killed as soon as a fatal pattern appears. With finish=False the
+        copy-back and caching of its outputs are left to _finish.
+        """
+        if omp_threads is None:
+            omp_threads = self.config['omp threads']
+        env = dict(os.environ, OMP_NUM_THREADS=str(omp_threads))
+
+        result = self._new_result(input_file, omp_threads, cpus)
+        if result["status"] == "ERROR":
+            return result
+        output_dir = os.path.dirname(result["log file"])
+        command = self._command(input_file, cpus, mem_nodes)
+        cache_key = self._cache_restore(input_file, result)
+        if result["status"] == "COMPLETED":
+            return result
+        before = snapshot(output_dir)
+        run_dir = self._stage(output_dir, result)
+        if run_dir is None:
+            return result
+        sampler = self._sampler()
 
         for attempt in range(self.config['max restarts'] + 1):
             self._log(f"Running calculation for {os.path.abspath(input_file)} "
                      f"(Attempt {attempt + 1}/{self.config['max restarts'] + 1})")
             start_time = time.perf_counter()
+            watcher = self._watcher(input_file)
 
+            log_f = (open(result["log file"], 'wb')
+                     if self.config['output to log'] else None)
             try:
-                command = f"{runner} {os.path.basename(input_file)}"
-                if self.config['output to log']:
-                    with open(os.path.join(output_dir, log_file), 'w') as log_f:
-                        subprocess.run(
-                            command,
-                            shell=True,
-                            check=True,
-                            cwd=output_dir,
-                            stdout=log_f,
-                            stderr=subprocess.STDOUT,
-                            text=True
-                        )
-                else:
-                    subprocess.run(
-                        command,
-                        shell=True,
-                        check=True,
-                        cwd=output_dir,
-                        capture_output=True,
-                        text=True
-                    )
-
-                with open(os.path.join(output_dir, log_file), 'r') as log_f:
-                    log_content = log_f.read()
-                    if "Segmentation fault" in log_content:
-                        raise subprocess.CalledProcessError(
-                            1, command, output="Segmentation fault detected")
-
-                result["status"] = "COMPLETED"
-                result["message"] = "Calculation completed successfully"
-                break
-            except subprocess.CalledProcessError as e:
-                if e.returncode == 139:
-                    result["status"] = "ERROR"
-                    result["message"] = f"Error: {str(e)}\nOutput: {e.output}"
-                    result["restarts"] += 1
-                    if attempt < self.config['max restarts']:
-                        self._log(f"Segmentation fault detected. Restarting "
-                                f"(Attempt {attempt + 2}/"
-                                f"{self.config['max restarts'] + 1})")
-                        continue
-                    else:
-                        result["message"] += "\nMax restarts reached."
-                else:
-                    result["status"] = "ERROR"
-                    result["message"] = f"Error: {str(e)}\nOutput: {e.output}"
+                process = subprocess.Popen(
+                    command,
+                    shell=True,
+                    cwd=run_dir,
+                    env=env,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True
+                )
+                if sampler:
+                    sampler.watch(process.pid)
+                for chunk in iter(lambda: process.stdout.read1(65536), b""):
+                    if log_f:
+                        log_f.write(chunk)
+                    if watcher.feed(chunk):
+                        self._kill_group(process.pid)
+                        break
+                process.stdout.close()
+                returncode = process.wait()
+            finally:
+                if log_f:
+                    log_f.close()
+
+            if not self._check_attempt(result, attempt, command, returncode,
+                                       watcher.close()):
                 break
+            time.sleep(self._restart_delay(attempt))
+            command, env = self._restart(input_file, run_dir, result, cpus,
+                                         mem_nodes, env)
+
+        result["execution time"] = time.perf_counter() - start_time
+        if sampler:
+            sampler.stop()
+            result["telemetry"] = sampler.summary(omp_threads)
+        result['finish'] = (cache_key, run_dir, before)
+        return self._finish(input_file, result) if finish else result
+
+    async def _stream_process(self, argv: List[str], run_dir: str,
+                              env: Dict[str, str], log_file: str,
+                              watcher: LogWatcher,
+                              sampler: Optional[ProcessTreeSampler]) -> int:
+        """Run argv, streaming its output into log_file through watcher.
+
+        Returns the exit code. The process is killed when the watcher
+        matches a fatal pattern, on timeout or on cancellation.
+        """
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            cwd=run_dir,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            start_new_session=True
+        )
+        if sampler:
+            await asyncio.to_thread(sampler.watch, process.pid)
+
+        async def pump() -> None:
+            log_f = open(log_file, 'wb') if self.config['output to log'] else None
+            try:
+                while True:
+                    chunk = await process.stdout.read(65536)
+                    if not chunk:
+                        break
+                    if log_f:
+                        log_f.write(chunk)
+                    if watcher.feed(chunk):
+                        self._kill_group(process.pid)
+                        break
+            finally:
+                if log_f:
+                    log_f.close()
+            await process.wait()
+
+        timeout = self.config['timeout'] or None
+        try:
+            await asyncio.wait_for(pump(), timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            self._kill_group(process.pid)
+            await process.wait()
+            raise
+        return process.returncode
+
+    async def _run_single_calculation_async(self, input_file: str,
+                                            omp_threads: int,
+                                            cpus: Optional[List[int]],
+                                            mem_nodes: Optional[List[int]],
+                                            semaphore: asyncio.Semaphore) -> Dict[str, Any]:
+        """Asyncio counterpart of _run_single_calculation(finish=False).
+
+        Hashing, copying and /proc scans run in threads so they do not
+        stall the output pumps of the other jobs.
+        """
+        env = dict(os.environ, OMP_NUM_THREADS=str(omp_threads))
+        result = self._new_result(input_file, omp_threads, cpus)
+        if result["status"] == "ERROR":
+            return result
+        output_dir = os.path.dirname(result["log file"])
+        command = self._command(input_file, cpus, mem_nodes)
+        cache_key = await asyncio.to_thread(self._cache_restore, input_file, result)
+        if result["status"] == "COMPLETED":
+            return result
+        before = await asyncio.to_thread(snapshot, output_dir)
+        run_dir = await asyncio.to_thread(self._stage, output_dir, result)
+        if run_dir is None:
+            return result
+        sampler = self._sampler()
+
+        start_time = time.perf_counter()
+        try:
+            async with semaphore:
+                for attempt in range(self.config['max restarts'] + 1):
+                    self._log(f"Running calculation for {os.path.abspath(input_file)} "
+                              f"(Attempt {attempt + 1}/{self.config['max restarts'] + 1})")
+                    start_time = time.perf_counter()
+                    watcher = self._watcher(input_file)
+                    try:
+                        returncode = await self._stream_process(
+                            shlex.split(command), run_dir, env,
+                            result["log file"], watcher, sampler)
+                    except asyncio.TimeoutError:
+                        result["status"] = "ERROR"
+                        result["message"] = f"Timeout after {self.config['timeout']} s"
+                        break
+                    except OSError as e:
+                        result["status"] = "ERROR"
+                        result["message"] = f"Error: {str(e)}"
+                        break
+                    except asyncio.CancelledError:
+                        if self.scratch:
+                            self.scratch.cleanup(run_dir)
+                        raise
+
+                    if not self._check_attempt(result, attempt, command, returncode,
+                                               watcher.close()):
+                        break
+                    await asyncio.sleep(self._restart_delay(attempt))
+                    command, env = await asyncio.to_thread(
+                        self._restart, input_file, run_dir, result, cpus, mem_nodes, env)
+        finally:
+            # Also on cancellation: the sampler thread must not outlive the job.
+            if sampler:
+                sampler.stop()
 
         result["execution time"] = time.perf_counter() - start_time
+        if sampler:
+            result["telemetry"] = sampler.summary(omp_threads)
+        result['finish'] = (cache_key, run_dir, before)
         return result
 
+    def run_job(self, input_file: str, omp_threads: Optional[int] = None) -> Dict[str, Any]:
+        """Run one input now, outside the scheduler, and return its result.
+
+        Restarts, log watching, scratch and the cache work as for
+        scheduled jobs; there is no pinning, memory admission or ledger
+        row. Callers that drive their own scheduling (workflow_dag) build
+        the Runner with 'scan inputs' False.
+        """
+        return self._run_single_calculation(input_file, omp_threads)
+
     def _format_time(self, seconds: float) -> str:
         """Format time duration in HH:MM:SS.mmm format."""
         hours, rem = divmod(seconds, 3600)
@@ -172,30 +594,318 @@ class Runner:
         """Run all calculations in parallel."""
         self.config['start time'] = time.perf_counter()
 
-        if not self.config['input files']:
+        watcher = self._input_watcher()
+        if not self.config['input files'] and not watcher:
             self._log("No input files to process.")
+            self.config['end time'] = time.perf_counter()
             return
 
-        with ProcessPoolExecutor(max_workers=self.config['max workers']) as executor:
-            future_to_file = {
-                executor.submit(self._run_single_calculation, f): f
-                for f in self.config['input files']
-            }
-            for future in as_completed(future_to_file):
-                self.config['results'].append(future.result())
+        if self.config['telemetry interval'] > 0:
+            self.timeline = NodeTimeline(self.config['timeline file'],
+                                         self.config['telemetry interval'],
+                                         self.config['total cpus'],
+                                         lambda: self.running_jobs)
+            self.timeline.start()
+        if self.config['status file'] or self.config['metrics file']:
+            self.status = StatusWriter(self.config['status file'],
+                                       self.config['metrics file'],
+                                       {'input path': self.config['input path'],
+                                        'total cpus': self.config['total cpus'],
+                                        'omp threads': self.config['omp threads']})
+
+        try:
+            if self.config['engine'] == 'asyncio':
+                try:
+                    asyncio.run(self._run_scheduled_async(
+                        self._plan_jobs(self.config['input files']), watcher))
+                except (KeyboardInterrupt, asyncio.CancelledError):
+                    self._log("Calculations cancelled, reporting finished ones")
+            else:
+                self._run_scheduled(self._plan_jobs(self.config['input files']),
+                                    watcher)
+        finally:
+            if self.timeline:
+                self.timeline.stop()
+            self._update_status(0, 'finished')
 
         self.config['results'].sort(key=lambda x: x['input file'])
         self.config['end time'] = time.perf_counter()
 
+    def _plan_jobs(self, input_files: List[str]) -> List[Dict[str, Any]]:
+        """Build the queue of jobs with their OMP thread counts."""
+        if self.config['schedule'] != 'cost':
+            pending = [{'input file': f, 'omp threads': self.config['omp threads']}
+                       for f in input_files]
+        else:
+            pending = JobCostModel(self.config).plan(input_files)
+            for job in pending:
+                self._log(f"Planned {job['input file']}: cost {job['cost']:.3g}, "
+                          f"{job['omp threads']} OMP threads")
+        if self.admission:
+            for job in pending:
+                job['mem'] = self._memory_estimate(job['input file'])
+        return pending
+
+    def _runner_of(self, input_file: str) -> str:
+        """Runner of an input, '' if its folder name is not recognised."""
+        try:
+            return self._determine_runner(os.path.basename(os.path.dirname(input_file)))
+        except ValueError:
+            return ''
+
+    def _memory_estimate(self, input_file: str) -> float:
+        """Expected peak memory of a job in bytes."""
+        return self.admission.estimate(input_file, self._runner_of(input_file))
+
+    def _update_status(self, queued: int, state: str = 'running') -> None:
+        """Rewrite the live status files after a job transition."""
+        if self.status:
+            self.status.update(queued, self.running_jobs, state)
+
+    def _admit(self, job: Dict[str, Any]) -> bool:
+        """True if the job's memory estimate fits on the node now.
+
+        A held job is re-estimated, similar jobs may have finished since;
+        the estimate is cached until a job of its folder is recorded.
+        """
+        if not self.admission or self.admission.admit(job['mem'], self.running_jobs):
+            return True
+        job['mem'] = self._memory_estimate(job['input file'])
+        if self.admission.admit(job['mem'], self.running_jobs):
+            return True
+        if not job.get('held'):
+            job['held'] = True
+            self._log(f"Holding back {job['input file']}: needs about "
+                      f"{job['mem'] / MB:.0f} MB")
+        return False
+
+    def _next_job(self, pending: List[Dict[str, Any]],
+                  free_cpus: int) -> Optional[Dict[str, Any]]:
+        """Pick the next job to start on free_cpus cores, or None.
+
+        The longest pending job starts if it fits. Otherwise the largest
+        job that fits is backfilled. If nothing fits, the longest job is
+        started on the free cores so they do not sit idle.
+        """
+        if self.config['schedule'] == 'cost':
+            min_threads = self.config['min omp threads']
+        else:
+            min_threads = self.config['omp threads']
+        min_threads = min(min_threads, self.config['total cpus'])
+
+        if not pending or free_cpus < min_threads:
+            return None
+        for index, job in enumerate(pending):
+            if job['omp threads'] <= free_cpus and self._admit(job):
+                return pending.pop(index)
+        if not self._admit(pending[0]):
+            return None
+        job = pending.pop(0)
+        job['omp threads'] = free_cpus
+        return job
+
+    def _make_allocator(self) -> Optional[CpuAllocator]:
+        """CPU allocator for the pinning policy, None without pinning."""
+        if self.config['pinning'] == 'none':
+            return None
+        return CpuAllocator(CpuTopology(), self.config['pinning'],
+                            self.config['total cpus'])
+
+    def _claim(self, job: Dict[str, Any],
+               allocator: Optional[CpuAllocator]) -> None:
+        """Assign CPUs and memory nodes to a job that is about to start."""
+        job['cpus'], job['mem nodes'] = None, None
+        self.running_jobs += 1
+        if self.admission:
+            self.admission.reserve(job['mem'])
+        if self.ledger:
+            self.ledger.start(job['input file'])
+        if allocator:
+            job['cpus'] = allocator.acquire(job['omp threads'])
+            job['mem nodes'] = allocator.topology.nodes_of(job['cpus'])
+
+    def _collect(self, job: Dict[str, Any], result: Dict[str, Any],
+                 allocator: Optional[CpuAllocator]) -> None:
+        """Release resources of a finished job and store its result."""
+        self._release(job, result, allocator)
+        self._record(result)
+
+    def _release(self, job: Dict[str, Any], result: Dict[str, Any],
+                 allocator: Optional[CpuAllocator]) -> None:
+        """Release the CPUs and memory of a job whose process has exited."""
+        self.running_jobs = max(0, self.running_jobs - 1)
+        if allocator:
+            allocator.release(job.get('cpus') or [])
+        result['runner'] = self._runner_of(job['input file'])
+        if 'cost' in job:
+            result['cost'] = job['cost']
+        if self.admission:
+            self.admission.release(job['mem'])
+            result['mem estimate mb'] = job['mem'] / MB
+            if 'telemetry' in result:
+                self.admission.record(job['input file'],
+                                      result['telemetry']['peak rss mb'])
+
+    def _record(self, result: Dict[str, Any]) -> None:
+        """Store the final result of a job."""
+        if self.ledger:
+            self.ledger.finish(result)
+        if self.status:
+            self.status.record(result)
+        self.config['results'].append(result)
+
+    def _complete_async(self, job: Dict[str, Any], result: Dict[str, Any],
+                        allocator: Optional[CpuAllocator],
+                        finishing: Dict[asyncio.Future, Dict[str, Any]]) -> None:
+        """Release a finished job and record its result, after the
+        copy-back in a thread if it has one."""
+        self._release(job, result, allocator)
+        if 'finish' in result:
+            finishing[asyncio.ensure_future(asyncio.to_thread(
+                self._finish, job['input file'], result))] = job
+        else:
+            self._record(result)
+
+    def _run_scheduled(self, pending: List[Dict[str, Any]],
+                       watcher: Optional[InputWatcher] = None) -> None:
+        """Run queued jobs as CPUs become free, pinning them if requested.
+
+        In watch mode new inputs are queued while others run. Outputs
+        are copied back in a thread pool after the job's CPUs are freed.
+        """
+        allocator = self._make_allocator()
+        free_cpus = self.config['total cpus']
+        running = {}
+        finishing = {}
+        timeout = watcher.interval if watcher else None
+        with ProcessPoolExecutor(max_workers=self.config['max workers']) as executor, \
+                ThreadPoolExecutor(max_workers=self.config['max workers']) as copier:
+            while pending or running or finishing or self._watching(watcher):
+                self._poll_inputs(watcher, pending)
+                job = self._next_job(pending, free_cpus)
+                while job is not None:
+                    self._claim(job, allocator)
+                    future = executor.submit(self._run_single_calculation,
+                                             job['input file'], job['omp threads'],
+                                             job['cpus'], job['mem nodes'], False)
+                    running[future] = job
+                    free_cpus -= job['omp threads']
+                    job = self._next_job(pending, free_cpus)
+                self._update_status(len(pending))
+
+                if not running and not finishing:
+                    if not pending:
+                        time.sleep(watcher.interval)
+                    continue
+                done, _ = wait(list(running) + list(finishing), timeout=timeout,
+                               return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in finishing:
+                        finishing.pop(future)
+                        self._record(future.result())
+                        continue
+                    job = running.pop(future)
+                    free_cpus += job['omp threads']
+                    result = future.result()
+                    self._release(job, result, allocator)
+                    if 'finish' in result:
+                        finishing[copier.submit(self._finish, job['input file'],
+                                                result)] = job
+                    else:
+                        self._record(result)
+
+    async def _run_scheduled_async(self, pending: List[Dict[str, Any]],
+                                   watcher: Optional[InputWatcher] = None) -> None:
+        """Asyncio engine: one process drives all external jobs.
+
+        A semaphore sized to 'max workers' bounds concurrent jobs; the
+        free CPU accounting and the copy-back after release are the same
+        as in _run_scheduled.
+        """
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        semaphore = asyncio.Semaphore(self.config['max workers'])
+        allocator = self._make_allocator()
+        free_cpus = self.config['total cpus']
+        running = {}
+        finishing = {}
+        timeout = watcher.interval if watcher else None
+        try:
+            while pending or running or finishing or self._watching(watcher):
+                self._poll_inputs(watcher, pending)
+                job = self._next_job(pending, free_cpus)
+                while job is not None:
+                    self._claim(job, allocator)
+                    task = asyncio.ensure_future(self._run_single_calculation_async(
+                        job['input file'], job['omp threads'],
+                        job['cpus'], job['mem nodes'], semaphore))
+                    running[task] = job
+                    free_cpus -= job['omp threads']
+                    job = self._next_job(pending, free_cpus)
+                self._update_status(len(pending))
+
+                if not running and not finishing:
+                    if not pending:
+                        await asyncio.sleep(watcher.interval)
+                    continue
+                done, _ = await asyncio.wait(list(running) + list(finishing),
+                                             timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task in finishing:
+                        finishing.pop(task)
+                        self._record(task.result())
+                        continue
+                    job = running.pop(task)
+                    free_cpus += job['omp threads']
+                    self._complete_async(job, task.result(), allocator, finishing)
+        except asyncio.CancelledError:
+            # A second SIGTERM (sent to the whole process group) must not
+            # interrupt the cleanup.
+            loop.add_signal_handler(signal.SIGTERM, lambda: None)
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            # Jobs that finished before the cancel reached them are
+            # completed as usual, copy-back and cache store included.
+            cancelled = []
+            for task, job in running.items():
+                if task.cancelled() or task.exception() is not None:
+                    cancelled.append(job)
+                else:
+                    self._complete_async(job, task.result(), allocator, finishing)
+            self._log(f"Cancelled {len(cancelled)} running calculations")
+            # Copy-backs run in threads and cannot be interrupted.
+            await asyncio.gather(*finishing, return_exceptions=True)
+            for task in finishing:
+                if task.exception() is None:
+                    self._record(task.result())
+            # Keep cancelled and queued jobs in the report and the ledger
+            # for a retry run. Only started jobs hold CPUs and memory.
+            for started, jobs in ((True, cancelled), (False, pending)):
+                for job in jobs:
+                    result = self._new_result(job['input file'], job['omp threads'],
+                                              job.get('cpus'))
+                    result["status"] = "ERROR"
+                    result["message"] = "Cancelled"
+                    if started:
+                        self._collect(job, result, allocator)
+                    else:
+                        result['runner'] = self._runner_of(job['input file'])
+                        self._record(result)
+            raise
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
 
     def _generate_report(self) -> str:
         """Generate and save detailed execution report."""
-        is_retry = self.config['input path'].endswith('_report.txt')
+        is_retry = self._is_retry()
         report_name = "retry_report.txt" if is_retry else "runner_report.txt"
 
         completed = sum(1 for r in self.config['results']
                        if r['status'] == 'COMPLETED')
         errors = sum(1 for r in self.config['results'] if r['status'] == 'ERROR')
+        cache_hits = sum(1 for r in self.config['results'] if r.get('cached'))
         total_time = self.config['end time'] - self.config['start time']
 
         summary = f"""
@@ -205,6 +915,7 @@ Execution Date: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
 Total calculations: {len(self.config['results'])}
 Completed: {completed}
 Errors: {errors}
+Restored from cache: {cache_hits}
 
 Folder criterion: {self.config['folder criterion']}
 
@@ -212,18 +923,53 @@ Input files directory: {self.config['input path']}
 Output files directory: {self.config['output dir']}
 
 Total CPUs: {self.config['total cpus']}
+Schedule: {self.config['schedule']}
 OMP threads per calculation: {self.config['omp threads']}
+CPU pinning: {self.config['pinning']}
+Memory admission: {f"{100 * self.config['mem fraction']:.0f}% of RAM" if self.admission else 'off'}
+Engine: {self.config['engine']}
+Scratch: {self.scratch.scratch_root if self.scratch else 'off'}
 Max parallel calculations: {self.config['max workers']}
 
 Total execution time: {self._format_time(total_time)}
 """
+        if self.timeline:
+            summary += (f"Mean node utilization: "
+                        f"{100 * self.timeline.mean_utilization():.1f}%\n"
+                        f"Idle core-seconds: {self.timeline.idle_core_seconds:.0f}\n"
+                        f"Utilization timeline: {self.config['timeline file']}\n")
+
+        # The detailed part is a view of the ledger when there is one.
+        results = self.config['results']
+        if self.ledger:
+            results = self.ledger.results(r['input file'] for r in results)
 
         detailed = "\nDetailed Results:\n"
-        for result in self.config['results']:
+        for result in results:
             detailed += f"\nCalculation: {result['input file']}\n"
             detailed += f"Status: {result['status']}\n"
             detailed += f"Execution time: {self._format_time(result['execution time'])}\n"
             detailed += f"Restarts: {result['restarts']}\n"
+            if result.get('warm restarts'):
+                detailed += f"Warm restarts: {result['warm restarts']}\n"
+            if 'attempts' in result:
+                detailed += f"Attempts (all runs): {result['attempts']}\n"
+            detailed += f"OMP threads: {result['omp threads']}\n"
+            detailed += f"CPU set: {result['cpu set']}\n"
+            if 'cost' in result:
+                detailed += f"Cost estimate: {result['cost']:.3g}\n"
+            if 'mem estimate mb' in result:
+                detailed += f"Memory estimate: {result['mem estimate mb']:.0f} MB\n"
+            if result.get('cached'):
+                detailed += "Cached: yes\n"
+            if 'telemetry' in result:
+                t = result['telemetry']
+                detailed += (f"Peak RSS: {t['peak rss mb']:.1f} MB\n"
+                             f"Avg CPU: {t['avg cpu cores']:.2f} cores "
+                             f"({100 * t['cpu utilization']:.0f}% of OMP threads)\n"
+                             f"Involuntary ctx switches: {t['involuntary ctx switches']}\n"
+                             f"I/O: read {t['read mb']:.1f} MB, "
+                             f"write {t['write mb']:.1f} MB\n")
             detailed += f"Message: {result['message']}\n"
 
         report = summary + detailed
@@ -256,8 +1002,76 @@ Total execution time: {self._format_time(total_time)}
         except FileNotFoundError:
             self._log("No previous runner report found")
 
+    def _load_failed_from_ledger(self) -> None:
+        """Load failed and interrupted calculations from a job ledger."""
+        if self.ledger and os.path.samefile(self.ledger.path,
+                                            self.config['input path']):
+            self.config['input files'] = self.ledger.failed()
+            return
+        ledger = JobLedger(self.config['input path'])
+        self.config['input files'] = ledger.failed()
+        ledger.close()
+
+    def _submit_slurm(self) -> str:
+        """Submit the inputs as Slurm job arrays, one runner per input.
+
+        Every option that affects a single job is forwarded to the array
+        tasks; fatal patterns other than the common ones have no command
+        line form and are rejected.
+        """
+        extra = {code: patterns for code, patterns in self.config['fatal patterns'].items()
+                 if code != 'common' and patterns}
+        if extra:
+            raise ValueError(f"Slurm backend: per-code fatal patterns ({', '.join(extra)}) "
+                             f"cannot be forwarded to array tasks")
+        options = [
+            f"--total_cpus {self.config['omp threads']}",
+            f"--omp_threads {self.config['omp threads']}",
+            f"--max_restarts {self.config['max restarts']}",
+            "--ledger '' --status_file '' --metrics_file ''",
+            f"--telemetry_interval {self.config['telemetry interval']}",
+            f"--engine {self.config['engine']}",
+            f"--timeout {self.config['timeout']}",
+            f"--pinning {self.config['pinning']}",
+            f"--mem_fraction {self.config['mem fraction']}",
+            f"--restart_backoff {self.config['restart backoff']}",
+        ]
+        if not self.config['warm restart']:
+            options.append("--cold_restart")
+        if self.config['restart halve threads']:
+            options.append("--restart_halve_threads")
+        if not self.config['watch log']:
+            options.append("--no_watch")
+        options += [f"--fatal_pattern {shlex.quote(pattern)}"
+                    for pattern in self.config['fatal patterns'].get('common', [])]
+        if self.config['cache']:
+            options.append(f"--cache_dir {shlex.quote(self.config['cache dir'])} "
+                           f"--cache_size {self.config['cache size'] / 1024**3}")
+            if self.config['cache link']:
+                options.append("--cache_link")
+        else:
+            options.append("--no-cache")
+        if self.config['scratch']:
+            options.append("--scratch")
+            if self.config['scratch dir']:
+                options.append(f"--scratch_dir {shlex.quote(self.config['scratch dir'])}")
+            if self.config['copy back'] != COPY_BACK:
+                options += [f"--copy_back {shlex.quote(p)}"
+                            for p in self.config['copy back']]
+        command = (f"{sys.executable} {os.path.abspath(__file__)} {{path}} --log "
+                   + " ".join(options))
+        slurm_config = dict(self.config['slurm'], **{'task command': command})
+        slurm_config.setdefault('job name', 'runner')
+        job_ids = SlurmArraySubmitter(slurm_config).submit(self.config['input files'])
+        summary = (f"\nSubmitted {len(self.config['input files'])} calculations "
+                   f"as Slurm array job(s): {', '.join(job_ids)}\n")
+        self._log(summary.strip())
+        return summary
+
     def run(self) -> str:
         """Main execution method that runs calculations and generates report."""
+        if self.config['backend'] == 'slurm':
+            return self._submit_slurm()
         self._log(f"Starting Runner calculations")
         self._run_calculations()
         return self._generate_report()
@@ -265,7 +1079,12 @@ Total execution time: {self._format_time(total_time)}
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Run calculations in parallel")
-    parser.add_argument("input_path", help="Path to input file/dir or report")
+    parser.add_argument("input_path", nargs='?',
+                        help="Path to input file/dir, report or ledger")
+    parser.add_argument("--status", nargs='?', const='runner_status.json',
+                        metavar="STATUS_FILE",
+                        help="Print the live status of a running campaign "
+                             "and exit")
     parser.add_argument("--log", action="store_true", help="Write output to log")
     parser.add_argument("--output_dir", help="Output directory for results")
     parser.add_argument("--total_cpus", type=int, default=16,
@@ -273,15 +1092,100 @@ def parse_args():
     parser.add_argument("--omp_threads", type=int, default=16,
                         help="OMP threads per calc")
     parser.add_argument("--max_restarts", type=int, default=4,
-                        help="Max restarts for segmentation faults")
+                        help="Max restarts for segfaults and fatal errors")
     parser.add_argument("--spec", type=str, default='',
                         help="Criterion for folder names")
-    return parser.parse_args()
+    parser.add_argument("--schedule", choices=['uniform', 'cost'],
+                        default='uniform',
+                        help="uniform: same OMP threads for every job; "
+                             "cost: longest-first with per-job OMP threads")
+    parser.add_argument("--min_omp_threads", type=int, default=1,
+                        help="Min OMP threads per calc for cost schedule")
+    parser.add_argument("--pinning", choices=PIN_POLICIES, default='none',
+                        help="Pin each calc to a disjoint CPU set and its "
+                             "NUMA memory node(s)")
+    parser.add_argument("--mem_fraction", type=float, default=0.9,
+                        help="Hold back calcs while their estimated memory "
+                             "would exceed this fraction of RAM (0 = off)")
+    parser.add_argument("--engine", choices=['process', 'asyncio'],
+                        default='process',
+                        help="process: worker process per calc; asyncio: "
+                             "one event loop drives all calcs")
+    parser.add_argument("--timeout", type=float, default=0,
+                        help="Wall time limit per calc in seconds "
+                             "(asyncio engine, 0 = none)")
+    parser.add_argument("--cold_restart", action="store_true",
+                        help="Restart crashed calcs from scratch instead of "
+                             "from their last wavefunction")
+    parser.add_argument("--restart_backoff", type=float, default=1.0,
+                        help="Seconds before the first restart, doubled "
+                             "for each further one")
+    parser.add_argument("--restart_halve_threads", action="store_true",
+                        help="Halve OMP threads on every restart")
+    parser.add_argument("--fatal_pattern", action='append', default=[],
+                        help="Extra regex that aborts a calc when it shows up "
+                             "in its output (repeatable)")
+    parser.add_argument("--no_watch", action="store_true",
+                        help="Do not watch output for fatal patterns")
+    parser.add_argument("--ledger", type=str, default='runner_ledger.db',
+                        help="SQLite job ledger ('' to disable); pass a "
+                             ".db file as input_path to retry its failures")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip inputs completed unchanged in the ledger")
+    parser.add_argument("--no_cache", "--no-cache", action="store_true",
+                        help="Always run, do not use the result cache")
+    parser.add_argument("--cache_dir", type=str, default='~/.cache/runner',
+                        help="Result cache directory")
+    parser.add_argument("--cache_size", type=float, default=20,
+                        help="Result cache size limit in GB (LRU eviction)")
+    parser.add_argument("--cache_link", action="store_true",
+                        help="Hard-link cached outputs instead of copying")
+    parser.add_argument("--backend", choices=['local', 'slurm'], default='local',
+                        help="local: run here; slurm: submit as job arrays")
+    parser.add_argument("--slurm_args", type=str, default='',
+                        help="Extra sbatch arguments for the slurm backend")
+    parser.add_argument("--per_task", type=int, default=1,
+                        help="Inputs per Slurm array task")
+    parser.add_argument("--array_throttle", type=int, default=0,
+                        help="Max running Slurm array tasks (%%k)")
+    parser.add_argument("--sbatch", type=str, default='sbatch',
+                        help="sbatch command (e.g. a local fake for tests)")
+    parser.add_argument("--scratch", action="store_true",
+                        help="Run each calc in node-local scratch and copy "
+                             "back only whitelisted outputs")
+    parser.add_argument("--scratch_dir", type=str, default='',
+                        help="Scratch root (default $LOCAL_SCR_DIR, /dev/shm)")
+    parser.add_argument("--copy_back", action='append', default=None,
+                        help="Glob of outputs copied back from scratch "
+                             "(repeatable, replaces the default whitelist)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep polling input_path and run new inputs "
+                             "as they are generated")
+    parser.add_argument("--watch_interval", type=float, default=5.0,
+                        help="Seconds between polls of the input tree")
+    parser.add_argument("--watch_idle", type=float, default=60.0,
+                        help="Stop watching after this many seconds "
+                             "without new inputs")
+    parser.add_argument("--status_file", type=str, default='runner_status.json',
+                        help="Live JSON status file ('' to disable)")
+    parser.add_argument("--metrics_file", type=str, default='runner_status.prom',
+                        help="Live Prometheus textfile ('' to disable)")
+    parser.add_argument("--telemetry_interval", type=float, default=1.0,
+                        help="Seconds between /proc samples of each calc "
+                             "and of the node (0 = off)")
+    args = parser.parse_args()
+    if args.input_path is None and args.status is None:
+        parser.error("the following arguments are required: input_path")
+    return args
 
 
 def main():
     args = parse_args()
 
+    if args.status:
+        print(format_status(args.status), end='')
+        return
+
     if args.output_dir is None:
         if os.path.isfile(args.input_path):
             output_dir = os.path.dirname(args.input_path)
@@ -297,7 +1201,40 @@ def main():
         'omp threads': args.omp_threads,
         'max restarts': args.max_restarts,
         'output to log': args.log,
-        'folder criterion': args.spec
+        'folder criterion': args.spec,
+        'schedule': args.schedule,
+        'min omp threads': args.min_omp_threads,
+        'pinning': args.pinning,
+        'mem fraction': args.mem_fraction,
+        'engine': args.engine,
+        'timeout': args.timeout,
+        'warm restart': not args.cold_restart,
+        'restart backoff': args.restart_backoff,
+        'restart halve threads': args.restart_halve_threads,
+        'watch log': not args.no_watch,
+        'fatal patterns': {'common': args.fatal_pattern},
+        'ledger': args.ledger,
+        'resume': args.resume,
+        'cache': not args.no_cache,
+        'cache dir': args.cache_dir,
+        'cache size': int(args.cache_size * 1024**3),
+        'cache link': args.cache_link,
+        'scratch': args.scratch,
+        'scratch dir': args.scratch_dir,
+        'copy back': args.copy_back or COPY_BACK,
+        'watch': args.watch,
+        'watch interval': args.watch_interval,
+        'watch idle': args.watch_idle,
+        'telemetry interval': args.telemetry_interval,
+        'status file': args.status_file,
+        'metrics file': args.metrics_file,
+        'backend': args.backend,
+        'slurm': {
+            'slurm args': shlex.split(args.slurm_args),
+            'inputs per task': args.per_task,
+            'throttle': args.array_throttle,
+            'sbatch': args.sbatch
+        }
     }
 
     runner = Runner(config)
@@ -0,0 +1,145 @@
+""" Node-local scratch staging for external-code jobs.
+A job's directory is copied to fast local storage ($LOCAL_SCR_DIR, as
+rungms.slurm.base.konst expects, else /dev/shm or the temp dir), the
+code runs there, and only whitelisted outputs are copied back to the
+shared filesystem in parallel, each verified by SHA-256. This keeps
+cube/wfn writes and temporary files off the parallel filesystem.
+"""
+import fnmatch
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+# Outputs copied back by default: logs, cubes, wavefunctions, energies, forces.
+COPY_BACK = ['*.log', '*.out', '*.cube', '*.wfn', '*.e', '*force*', '*.molden']
+
+# Files referenced relative to the job dir, e.g. ../mol_xyz/tot.xyz
+REFERENCE_PATTERN = re.compile(r'(?:\$CurrDir/)?((?:\.\./)+[\w./-]+)')
+
+# Larger files are not scanned for references.
+MAX_SCAN_BYTES = 1 << 20
+
+
+def _copy_with_hash(source: str, target: str) -> str:
+    """Copy source to target, return the SHA-256 of the copied bytes."""
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f_in, open(target, 'wb') as f_out:
+        for block in iter(lambda: f_in.read(1 << 20), b""):
+            digest.update(block)
+            f_out.write(block)
+    shutil.copystat(source, target)
+    return digest.hexdigest()
+
+
+def _hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ScratchManager:
+    """Stages job directories to local scratch and copies results back."""
+
+    def __init__(self, scratch_root: Optional[str] = None,
+                 copy_back: Optional[List[str]] = None, copy_threads: int = 4):
+        self.scratch_root = (scratch_root or os.environ.get('LOCAL_SCR_DIR')
+                             or ('/dev/shm' if os.path.isdir('/dev/shm') else None)
+                             or tempfile.gettempdir())
+        self.copy_back_patterns = copy_back or COPY_BACK
+        self.copy_threads = copy_threads
+
+    def _references(self, job_dir: str) -> List[str]:
+        """Relative paths outside job_dir referenced by its small files."""
+        refs = set()
+        with os.scandir(job_dir) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.stat().st_size > MAX_SCAN_BYTES:
+                    continue
+                with open(entry.path, 'r', encoding="utf-8", errors="replace") as f:
+                    for match in REFERENCE_PATTERN.findall(f.read()):
+                        path = os.path.normpath(os.path.join(job_dir, match))
+                        if os.path.isfile(path):
+                            refs.add(os.path.normpath(match))
+        return sorted(refs)
+
+    def stage(self, job_dir: str) -> str:
+        """Copy job_dir and the files it references into a new scratch dir.
+
+        Returns the scratch copy of job_dir. Referenced ../ files keep
+        their relative location, so inputs run unchanged.
+        """
+        job_dir = os.path.abspath(job_dir)
+        refs = self._references(job_dir)
+        depth = max((ref.split(os.sep).count('..') for ref in refs), default=0)
+        tail = job_dir.split(os.sep)[-(depth + 1):]
+
+        os.makedirs(self.scratch_root, exist_ok=True)
+        root = tempfile.mkdtemp(prefix=f"runner-{tail[-1]}-", dir=self.scratch_root)
+        work_dir = os.path.join(root, *tail)
+        os.makedirs(work_dir)
+        with os.scandir(job_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    shutil.copy2(entry.path, os.path.join(work_dir, entry.name))
+        for ref in refs:
+            target = os.path.normpath(os.path.join(work_dir, ref))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.normpath(os.path.join(job_dir, ref)), target)
+        return work_dir
+
+    def _copy_checked(self, source: str, target: str) -> None:
+        """Copy one file and verify it, retrying once on a mismatch."""
+        for _ in range(2):
+            tmp = f"{target}.copy-{os.getpid()}-{threading.get_ident()}"
+            digest = _copy_with_hash(source, tmp)
+            if _hash(tmp) == digest:
+                os.replace(tmp, target)
+                return
+            os.remove(tmp)
+        raise OSError(f"Checksum mismatch copying {source} to {target}")
+
+    def copy_back(self, work_dir: str, output_dir: str,
+                  exclude: Optional[List[str]] = None,
+                  staged: Optional[Dict[str, Tuple[int, int]]] = None) -> List[str]:
+        """Copy whitelisted outputs of work_dir to output_dir in parallel.
+
+        staged maps names to (mtime_ns, size) of the files when they were
+        staged; files still unchanged (other jobs' outputs) are skipped.
+        """
+        exclude = exclude or []
+        staged = staged or {}
+        names = []
+        with os.scandir(work_dir) as entries:
+            for entry in entries:
+                if (entry.is_file() and entry.name not in exclude and
+                        any(fnmatch.fnmatch(entry.name, p)
+                            for p in self.copy_back_patterns)):
+                    stat = entry.stat()
+                    if staged.get(entry.name) != (stat.st_mtime_ns, stat.st_size):
+                        names.append(entry.name)
+
+        os.makedirs(output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.copy_threads) as executor:
+            futures = [executor.submit(self._copy_checked,
+                                       os.path.join(work_dir, name),
+                                       os.path.join(output_dir, name))
+                       for name in names]
+            for future in futures:
+                future.result()
+        return sorted(names)
+
+    def cleanup(self, work_dir: str) -> None:
+        """Remove the whole scratch tree of a staged job."""
+        root = os.path.abspath(work_dir)
+        scratch_root = os.path.abspath(self.scratch_root)
+        while os.path.dirname(root) != scratch_root and root != os.path.dirname(root):
+            root = os.path.dirname(root)
+        if os.path.dirname(root) == scratch_root:
+            shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+""" Slurm job-array submission backend.
+Packs many inputs into one Slurm job array instead of one sbatch per
+input (gms_sbatch_konst style). Every array task processes a slice of
+a manifest file, and '%k' throttles how many tasks run at once.
+
+@input: config dictionary, containing:
+  config['job name'] = string()
+  config['task command'] = string()   # {input}, {path}, {dir} placeholders
+  config['inputs per task'] = int()
+  config['throttle'] = int()          # 0 = no %k limit
+  config['max array size'] = int()    # Slurm MaxArraySize - 1
+  config['slurm args'] = [string(), ...]
+  config['manifest dir'] = string()
+  config['sbatch'] = string()         # e.g. a local fake for testing
+  config['squeue'] = string()
+"""
+import argparse
+import os
+import shlex
+import subprocess
+import sys
+from datetime import datetime
+from typing import Any, Dict, List
+
+# Default task command; {rungms} is --rungms or $RUNGMS.
+GAMESS_COMMAND = "{rungms} {input} {verno} {exepath} {userscr}"
+
+
+class SlurmArraySubmitter:
+    """Submits inputs as Slurm job arrays driven by manifest files."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.config.update({
+            'job name': self.config.get('job name', 'array'),
+            'inputs per task': max(1, self.config.get('inputs per task', 1)),
+            'throttle': self.config.get('throttle', 0),
+            'max array size': self.config.get('max array size', 1000),
+            'slurm args': self.config.get('slurm args', []),
+            'manifest dir': self.config.get('manifest dir', '.'),
+            'sbatch': self.config.get('sbatch', 'sbatch'),
+            'squeue': self.config.get('squeue', 'squeue'),
+        })
+
+    def _log(self, message: str):
+        print(f"[SlurmArray] {message}")
+
+    def _task_command(self) -> str:
+        """Shell line run for each manifest entry $INP inside its dir."""
+        return self.config['task command'].format(
+            input='"$(basename "$INP")"', path='"$INP"', dir='"$(dirname "$INP")"')
+
+    def write_script(self, manifest: str, n_tasks: int) -> str:
+        """Write the batch script of one array over manifest."""
+        per_task = self.config['inputs per task']
+        array = f"0-{n_tasks - 1}"
+        if self.config['throttle']:
+            array += f"%{self.config['throttle']}"
+        script = f"""#!/bin/bash
+#SBATCH --job-name={self.config['job name']}
+#SBATCH --array={array}
+#SBATCH --output={os.path.splitext(manifest)[0]}_%A_%a.out
+
+MANIFEST="{manifest}"
+PER_TASK={per_task}
+FIRST=$((SLURM_ARRAY_TASK_ID * PER_TASK + 1))
+LAST=$((FIRST + PER_TASK - 1))
+
+STATUS=0
+while IFS= read -r INP; do
+    [ -z "$INP" ] && continue
+    echo "[$(date '+%Y-%m-%d %H:%M:%S')] task $SLURM_ARRAY_TASK_ID: $INP"
+    ( cd "$(dirname "$INP")" && {self._task_command()} ) || STATUS=1
+done < <(sed -n "${{FIRST}},${{LAST}}p" "$MANIFEST")
+exit $STATUS
+"""
+        path = os.path.splitext(manifest)[0] + ".sbatch"
+        with open(path, 'w', encoding="utf-8") as f:
+            f.write(script)
+        os.chmod(path, 0o755)
+        return path
+
+    def _sbatch(self, script: str) -> str:
+        """Submit script, return the job id."""
+        command = (shlex.split(self.config['sbatch']) + ['--parsable']
+                   + self.config['slurm args'] + [script])
+        out = subprocess.run(command, check=True, capture_output=True, text=True)
+        # --parsable prints "jobid" or "jobid;cluster"
+        return out.stdout.strip().split(';')[0]
+
+    def submit(self, input_files: List[str]) -> List[str]:
+        """Write manifests and submit them as arrays; return the job ids."""
+        inputs = [os.path.abspath(f) for f in input_files]
+        per_task = self.config['inputs per task']
+        chunk = self.config['max array size'] * per_task
+        os.makedirs(self.config['manifest dir'], exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        job_ids = []
+        for index, start in enumerate(range(0, len(inputs), chunk)):
+            part = inputs[start:start + chunk]
+            manifest = os.path.abspath(os.path.join(
+                self.config['manifest dir'],
+                f"{self.config['job name']}_{stamp}_{index}.manifest"))
+            with open(manifest, 'w', encoding="utf-8") as f:
+                f.write("\n".join(part) + "\n")
+            n_tasks = (len(part) + per_task - 1) // per_task
+            job_id = self._sbatch(self.write_script(manifest, n_tasks))
+            self._log(f"Submitted array {job_id}: {len(part)} inputs in "
+                      f"{n_tasks} tasks ({manifest})")
+            job_ids.append(job_id)
+        return job_ids
+
+    def status(self, job_ids: List[str]) -> Dict[str, int]:
+        """Number of array tasks per Slurm state (one squeue call)."""
+        if not job_ids:
+            return {}
+        command = shlex.split(self.config['squeue']) + [
+            '-h', '-r', '-j', ','.join(job_ids), '-o', '%T']
+        out = subprocess.run(command, check=True, capture_output=True, text=True)
+        counts: Dict[str, int] = {}
+        for state in out.stdout.split():
+            counts[state] = counts.get(state, 0) + 1
+        return counts
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Submit GAMESS (or any) inputs as one Slurm job array",
+        epilog="Unknown arguments are passed to sbatch, as in gms_sbatch.")
+    parser.add_argument("-l", "--list", required=True,
+                        help="File with one input per line")
+    parser.add_argument("-v", "--verno", default="konst",
+                        help="runs gamess.<version>.x")
+    parser.add_argument("-e", "--exepath", default="/home/share/local/sbin/gamess",
+                        help="path to look for executables")
+    parser.add_argument("-s", "--userscr", default="$HOME/scr",
+                        help="user scratch folder")
+    parser.add_argument("-r", "--rungms", default=os.environ.get('RUNGMS'),
+                        help="rungms script run by the default task command "
+                             "(default $RUNGMS)")
+    parser.add_argument("--command", default=None,
+                        help="Task command template with {input}/{path}/{dir}, "
+                             "default runs --rungms")
+    parser.add_argument("--per_task", type=int, default=1,
+                        help="Inputs processed by one array task")
+    parser.add_argument("--throttle", type=int, default=0,
+                        help="Max simultaneously running tasks (%%k)")
+    parser.add_argument("--job_name", default="gms-array")
+    parser.add_argument("--manifest_dir", default=".")
+    parser.add_argument("--sbatch", default="sbatch")
+    parser.add_argument("--squeue", default="squeue")
+    parser.add_argument("--status", nargs='+', metavar="JOBID",
+                        help="Only print task states of submitted arrays")
+    args, slurm_args = parser.parse_known_args()
+    if not (args.command or args.rungms or args.status):
+        parser.error("give --command or --rungms (or set $RUNGMS)")
+    return args, slurm_args
+
+
+def main():
+    args, slurm_args = parse_args()
+
+    command = args.command or GAMESS_COMMAND.format(
+        rungms=args.rungms, input='{input}', verno=args.verno, exepath=args.exepath,
+        userscr=args.userscr)
+    config = {
+        'job name': args.job_name,
+        'task command': command,
+        'inputs per task': args.per_task,
+        'throttle': args.throttle,
+        'slurm args': slurm_args,
+        'manifest dir': args.manifest_dir,
+        'sbatch': args.sbatch,
+        'squeue': args.squeue,
+    }
+    submitter = SlurmArraySubmitter(config)
+
+    if args.status:
+        for state, count in sorted(submitter.status(args.status).items()):
+            print(f"{state}: {count}")
+        return
+
+    with open(args.list, 'r', encoding="utf-8") as f:
+        inputs = [line.strip() for line in f if line.strip()]
+    missing = [f for f in inputs if not os.path.isfile(f)]
+    if missing:
+        print(f"Input files do not exist: {' '.join(missing)}")
+        sys.exit(4)
+    submitter.submit(inputs)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,9 +8,11 @@ import sys
 import numpy as np
 import argparse
 
+from soc_engine import SOCCouplings
+
 
 def Extract_SOC_1e_2e(file):
-    global energy_and_order, soc_energy_and_order, SOC_val, E_ref, GS, nstate
+    global energy_and_order, soc_energy_and_order, SOC_val, SOC, E_ref, GS, nstate
     filedata = None
     f = open(file, 'r')
     filedata = f.read()
@@ -21,6 +23,7 @@ def Extract_SOC_1e_2e(file):
     SOC_Order_of_states = []
     energy_and_order = []
     SOC_val = []
+    SOC = None
     soc_energy_and_order = []
     nstate=0
     for il, l in enumerate(out):
@@ -65,31 +68,8 @@ def Extract_SOC_1e_2e(file):
             Right_order_of_states = sorted(energy_and_order, key=lambda x: x[0])
 
         if 'SOC COUPLINGS (OFF DIAGONAL ELEMENT)' in l:
-            Right_order_soc = sorted(SOC_Order_of_states)
-            ij = 0
-            bla = 0
-            for i in range(1,nstate*4+1):
-                bra = Right_order_soc[i-1]
-                for j in range(i+1,nstate*4+1):
-                    ket = Right_order_soc[j-i+bla]
-                    soc_value_real_1e = float(out[il+1+ij].split()[9])
-                    soc_value_imag_1e = float(out[il+1+ij].split()[11])
-                    soc_value_real_2e = float(out[il+2+ij].split()[9])
-                    soc_value_imag_2e = float(out[il+2+ij].split()[11])
-                    soc_sum_real_1e_2e = soc_value_real_1e+soc_value_real_2e
-                    soc_sum_imag_1e_2e = soc_value_imag_1e+soc_value_imag_2e
-                    soc_value_abs = np.sqrt(soc_sum_real_1e_2e**2+soc_sum_imag_1e_2e**2)
-                    soc_value_abs_1e = np.sqrt(soc_value_real_1e**2+soc_value_imag_1e**2)
-                    row = (bra, ket, soc_value_real_1e, soc_value_imag_1e,
-                                     soc_value_real_2e, soc_value_imag_2e,
-                                     soc_sum_real_1e_2e, soc_sum_imag_1e_2e,
-                                     soc_value_abs, soc_value_abs_1e)
-                    SOC_val.append( row )
-                    ij+=2
-                bla +=1
-            k=0
-            while k <= ij*2-1:
-                k+=1
+            SOC = SOCCouplings.from_block(out, il+1, sorted(SOC_Order_of_states))
+            SOC_val = SOC.rows()
 
         if "THE ROHF/DFT SCF ENERGY IS AT 0 HARTREE" in l:
             k=0
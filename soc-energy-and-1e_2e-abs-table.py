@@ -5,12 +5,18 @@
 import fileinput
 import os
 import sys
-import numpy as np
 import argparse
 
+from soc_engine import SOCCouplings, state_name
+
+from log_cache import LogCache
+
+# Bump when Parse_log results change, to invalidate cached ones.
+CACHE_VERSION = '2'
+
 
 def Extract_SOC_1e_2e(file):
-    global energy_and_order, soc_energy_and_order, SOC_val, E_ref, GS
+    global energy_and_order, soc_energy_and_order, SOC_val, SOC, E_ref, GS
     filedata = None
     f = open(file, 'r')
     filedata = f.read()
@@ -21,7 +27,10 @@ def Extract_SOC_1e_2e(file):
     SOC_Order_of_states = []
     energy_and_order = []
     SOC_val = []
+    SOC = None
     soc_energy_and_order = []
+    E_ref = None
+    GS = None
     nstate=0
     for il, l in enumerate(out):
         if "TDDFT INPUT PARAMETERS" in l:
@@ -65,31 +74,8 @@ def Extract_SOC_1e_2e(file):
             Right_order_of_states = sorted(energy_and_order, key=lambda x: x[0])
 
         if 'SOC COUPLINGS (OFF DIAGONAL ELEMENT)' in l:
-            Right_order_soc = sorted(SOC_Order_of_states)
-            ij = 0
-            bla = 0
-            for i in range(1,nstate*4+1):
-                bra = Right_order_soc[i-1]
-                for j in range(i+1,nstate*4+1):
-                    ket = Right_order_soc[j-i+bla]
-                    soc_value_real_1e = float(out[il+1+ij].split()[9])
-                    soc_value_imag_1e = float(out[il+1+ij].split()[11])
-                    soc_value_real_2e = float(out[il+2+ij].split()[9])
-                    soc_value_imag_2e = float(out[il+2+ij].split()[11])
-                    soc_sum_real_1e_2e = soc_value_real_1e+soc_value_real_2e
-                    soc_sum_imag_1e_2e = soc_value_imag_1e+soc_value_imag_2e
-                    soc_value_abs = np.sqrt(soc_sum_real_1e_2e**2+soc_sum_imag_1e_2e**2)
-                    soc_value_abs_1e = np.sqrt(soc_value_real_1e**2+soc_value_imag_1e**2)
-                    row = (bra, ket, soc_value_real_1e, soc_value_imag_1e,
-                                     soc_value_real_2e, soc_value_imag_2e,
-                                     soc_sum_real_1e_2e, soc_sum_imag_1e_2e,
-                                     soc_value_abs, soc_value_abs_1e)
-                    SOC_val.append( row )
-                    ij+=2
-                bla +=1
-            k=0
-            while k <= ij*2-1:
-                k+=1
+            SOC = SOCCouplings.from_block(out, il+1, sorted(SOC_Order_of_states))
+            SOC_val = SOC.rows()
 
         if "THE ROHF/DFT SCF ENERGY IS AT 0 HARTREE" in l:
             k=0
@@ -131,6 +117,30 @@ def ECP_checking(file):
                 beep = 1
                 return
 
+def Parse_log(file):
+    """ Check_file and ECP_checking flags and, for a usable log, the
+    MRSF energies, SOC energies, SOC couplings and the spin-mixed states
+    of the SOC Hamiltonian. """
+    Check_file(file)
+    if status == 1:
+        return {'status': status}
+    ECP_checking(file)
+    parsed = {'status': status, 'beep': beep, 'sbkjc': sbkjc, 'check': check}
+    if beep == 1:
+        return parsed
+    Extract_SOC_1e_2e(file)
+    SOC_states = []
+    if SOC is not None:
+        energies = {state_name(row[0]): row[1] for row in energy_and_order}
+        SOC_states = SOC.state_rows(SOC.diagonal(energies, GS), two_electron=check == 0)
+    parsed.update({'energy_and_order': energy_and_order,
+                   'soc_energy_and_order': soc_energy_and_order,
+                   'SOC_val': SOC_val,
+                   'SOC_states': SOC_states,
+                   'E_ref': E_ref,
+                   'GS': GS})
+    return parsed
+
 def command_line_args():
     import argparse
     parser = argparse.ArgumentParser()
@@ -146,6 +156,11 @@ def command_line_args():
         type=int,
         help="Rounding of excited energy 1=0.0, 2=0.00, 3=0.000 and so om")
 
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Parse the log again, do not use the log cache')
+
     return parser.parse_args()
 
 if __name__ == '__main__':
@@ -154,14 +169,19 @@ if __name__ == '__main__':
     file = arg.input
     rounding = arg.rounding_energy
 
-    Check_file(file)#  >>>>>>>> TRY >>>>>>>>>> TO >>>>>>>>>>>>> USE LIKE >>>>>>>>>>>> THIS >>>>>>>>>>>>>>>>    script-SOC-table-1e-2e-abs.py -i log_file.log
+    if arg.no_cache:
+        parsed = Parse_log(file)
+    else:
+        with LogCache() as cache:
+            parsed = cache.cached(file, 'soc-energy-and-1e_2e-abs-table', CACHE_VERSION, Parse_log)
+    status = parsed['status']
     if status == 1:
         print(' ')
         os.system('echo " Hi" $USER"!"')
         print(' I checked your',file,'file. There is ERROR!','\n')
         sys.exit()
 
-    ECP_checking(file)
+    beep, sbkjc, check = parsed['beep'], parsed['sbkjc'], parsed['check']
     if beep == 1:
         print(' ')
         os.system('echo " Hi" $USER"!"')
@@ -175,7 +195,12 @@ if __name__ == '__main__':
         print(' Please, recalculate with the correct input data, and I will give you what you want!\n')
         sys.exit()
 
-    Extract_SOC_1e_2e(file)
+    energy_and_order = parsed['energy_and_order']
+    soc_energy_and_order = parsed['soc_energy_and_order']
+    SOC_val = parsed['SOC_val']
+    SOC_states = parsed['SOC_states']
+    E_ref = parsed['E_ref']
+    GS = parsed['GS']
 
     f = file.replace('.log','.out')
     fout = open(f, 'w')
@@ -273,5 +298,17 @@ if __name__ == '__main__':
                 soc_states = soc_states+' '*(norm1_line-state_line)
             wout = soc_states+soc_Re1e+' '+soc_Im1e+' '+soc_ABS
             fout.write(wout+'\n')
+
+    if SOC_states:
+        fout.write('\n')
+        fout.write('Spin.mixed.states.of.SOC.Hamiltonian.rel.MRSF.S0:\n')
+        fout.write('State'+' '*8+'cm_1'+' '*8+'eV'+' '*4+'Main.component  Weight\n')
+        for i, (E_cm, E_ev, main, weight) in enumerate(SOC_states):
+            wout = str('%5i' % (i+1))+' '*2\
+                 + str('%10.4f' % E_cm)+' '*2\
+                 + str(newline % round(E_ev,rounding))+' '*4\
+                 + main+' '*(16-len(main))\
+                 + str('%6.4f' % weight)
+            fout.write(wout+'\n')
     fout.close()
 
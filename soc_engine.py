@@ -0,0 +1,110 @@
+""" Spin-orbit coupling of MRSF logs as a complex Hermitian Hamiltonian.
+GAMESS prints the block SOC COUPLINGS (OFF DIAGONAL ELEMENT) as two lines
+(one-electron, then two-electron part) per pair of basis states, pairs
+in upper-triangle order of the sorted S/T(Ms) labels. The 10th and 12th
+fields of a line are the real and imaginary parts in cm-1. The block is
+read with one regular expression into complex arrays, the Hamiltonian
+(diagonal: spin-free energies, off diagonal: couplings) is assembled
+with index arrays and diagonalized with LAPACK into spin-mixed states.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.linalg
+
+HARTREE_TO_CM = 219474.6313705
+CM_TO_EV = 1.23981e-4
+
+# Real and imaginary parts: fields 10 and 12 of a coupling line.
+SOC_LINE = re.compile(r'^[ \t]*(?:\S+[ \t]+){9}(\S+)[ \t]+\S+[ \t]+(\S+)', re.M)
+
+
+def state_name(label: str) -> str:
+    """Spin-free state of a basis label, 'T2' for 'T2{1}(Ms=-1)'."""
+    return re.match(r'[ST]\d+', label).group()
+
+
+def clean_label(label: str) -> str:
+    """Basis label as printed in the tables, 'T2(Ms=-1)'."""
+    return (label.replace('{1}', '').replace('{2}', '').replace('{3}', '')
+            .replace('(Ms=0).', '(Ms=0)'))
+
+
+class SOCCouplings:
+    """Couplings <bra|H_SO|ket> (cm-1) between the basis states labels,
+    one-electron and two-electron parts, upper triangle row by row."""
+
+    def __init__(self, labels: Sequence[str], soc_1e: np.ndarray, soc_2e: np.ndarray):
+        self.labels = list(labels)
+        self.soc_1e = soc_1e
+        self.soc_2e = soc_2e
+
+    @classmethod
+    def from_block(cls, out: Sequence[str], il: int, labels: Sequence[str]) -> 'SOCCouplings':
+        """Couplings from the block whose first line is out[il].
+
+        out are the log lines as the SOC scripts read them, after their
+        'I. Abs. value =' -> ' I. Abs. value =' rewrite; fields are then
+        the same as the split()[9] and split()[11] of their old loops.
+        """
+        n_lines = len(labels) * (len(labels) - 1)
+        text = '\n'.join(out[il:il+n_lines])
+        values = np.array(SOC_LINE.findall(text), dtype=float).reshape(-1, 2)
+        if len(values) != n_lines:
+            raise ValueError(f"SOC block: {len(values)} couplings read, {n_lines} expected")
+        soc = values[:, 0] + 1j * values[:, 1]
+        return cls(labels, soc[0::2], soc[1::2])
+
+    def pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Row and column of every coupling in the Hamiltonian."""
+        return np.triu_indices(len(self.labels), 1)
+
+    def rows(self) -> List[tuple]:
+        """(bra, ket, 1e re, 1e im, 2e re, 2e im, sum re, sum im,
+        |sum|, |1e|) per coupling, as plain Python values."""
+        total = self.soc_1e + self.soc_2e
+        bra, ket = self.pairs()
+        labels = np.array(self.labels, dtype=object)
+        return list(zip(labels[bra], labels[ket],
+                        self.soc_1e.real.tolist(), self.soc_1e.imag.tolist(),
+                        self.soc_2e.real.tolist(), self.soc_2e.imag.tolist(),
+                        total.real.tolist(), total.imag.tolist(),
+                        np.abs(total).tolist(), np.abs(self.soc_1e).tolist()))
+
+    def diagonal(self, energies: Dict[str, float], reference: float) -> np.ndarray:
+        """Spin-free energies (Hartree, by state name) of the basis states
+        in cm-1 relative to reference."""
+        return np.array([(energies[state_name(label)] - reference) * HARTREE_TO_CM
+                         for label in self.labels])
+
+    def hamiltonian(self, diagonal: np.ndarray, two_electron: bool = True) -> np.ndarray:
+        """Complex Hermitian SOC Hamiltonian (cm-1) in the label basis."""
+        couplings = self.soc_1e + self.soc_2e if two_electron else self.soc_1e
+        n = len(self.labels)
+        h = np.zeros((n, n), dtype=complex)
+        h[np.diag_indices(n)] = diagonal
+        bra, ket = self.pairs()
+        h[bra, ket] = couplings
+        h[ket, bra] = couplings.conj()
+        return h
+
+    def spin_mixed_states(self, diagonal: np.ndarray, two_electron: bool = True,
+                          n_lowest: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Energies (cm-1) and eigenvectors (columns) of the spin-mixed
+        states, only the n_lowest lowest ones if given."""
+        h = self.hamiltonian(diagonal, two_electron)
+        subset = None if n_lowest is None else [0, min(n_lowest, len(h)) - 1]
+        return scipy.linalg.eigh(h, subset_by_index=subset, overwrite_a=True,
+                                 check_finite=False)
+
+    def state_rows(self, diagonal: np.ndarray, two_electron: bool = True,
+                   n_lowest: Optional[int] = None) -> List[tuple]:
+        """(energy cm-1, energy eV, main basis state, its weight) per
+        spin-mixed state, as plain Python values."""
+        energies, vectors = self.spin_mixed_states(diagonal, two_electron, n_lowest)
+        weights = np.abs(vectors) ** 2
+        main = weights.argmax(axis=0)
+        return list(zip(energies.tolist(), (energies * CM_TO_EV).tolist(),
+                        [clean_label(self.labels[k]) for k in main],
+                        weights[main, np.arange(len(main))].tolist()))
@@ -8,6 +8,11 @@ import sys
 import numpy as np
 import argparse
 
+from log_cache import LogCache
+
+# Bump when Parse_log results change, to invalidate cached ones.
+CACHE_VERSION = '1'
+
 
 def Extract_SOC_1e_2e(file):
     global energy_and_order,SOC_val, E_ref, GS
@@ -22,6 +27,8 @@ def Extract_SOC_1e_2e(file):
     energy_and_order = []
     SOC_val = []
     soc_energy_and_order = []
+    E_ref = None
+    GS = None
     nstate=0
     for il, l in enumerate(out):
         if "TDDFT INPUT PARAMETERS" in l:
@@ -92,6 +99,17 @@ def Check_file(file):
            status = 1
            return
 
+def Parse_log(file):
+    """ Check_file status and, for a clean log, the MRSF energies. """
+    Check_file(file)
+    if status == 1:
+        return {'status': status}
+    Extract_SOC_1e_2e(file)
+    return {'status': status,
+            'energy_and_order': energy_and_order,
+            'E_ref': E_ref,
+            'GS': GS}
+
 def command_line_args():
     import argparse
     parser = argparse.ArgumentParser()
@@ -107,6 +125,11 @@ def command_line_args():
         type=int,
         help="Rounding of excited energy 1=0.0, 2=0.00, 3=0.000 and so om")
 
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Parse the log again, do not use the log cache')
+
     return parser.parse_args()
 
 if __name__ == '__main__':
@@ -115,14 +138,21 @@ if __name__ == '__main__':
     file = arg.input
     rounding = arg.rounding_energy
 
-    Check_file(file)#  >>>>>>>> TRY >>>>>>>>>> TO >>>>>>>>>>>>> USE LIKE >>>>>>>>>>>> THIS >>>>>>>>>>>>>>>>    script-SOC-table-1e-2e-abs.py -i log_file.log
+    if arg.no_cache:
+        parsed = Parse_log(file)
+    else:
+        with LogCache() as cache:
+            parsed = cache.cached(file, 'vee-energy-table', CACHE_VERSION, Parse_log)
+    status = parsed['status']
     if status == 1:
         print(' ')
         os.system('echo " Hi" $USER"!"')
         print(' I checked your',file,'file. There is ERROR!','\n')
         sys.exit()
 
-    Extract_SOC_1e_2e(file)
+    energy_and_order = parsed['energy_and_order']
+    E_ref = parsed['E_ref']
+    GS = parsed['GS']
 
     f = file.replace('.log','.out')
     fout = open(f, 'w')
@@ -0,0 +1,148 @@
+""" Warm restarts of crashed calculations from their last wavefunction.
+Instead of rerunning an input from scratch after a segfault, the input
+is rewritten to start from the wavefunction the crashed run left on
+disk: CP2K gets SCF_GUESS RESTART with WFN_RESTART_FILE_NAME pointing at
+<project>-RESTART.wfn, GAMESS gets GUESS=MOREAD with the last $VEC of
+its .dat file. The original input is never modified.
+"""
+import glob
+import os
+import re
+from typing import List, Optional, Tuple
+
+# Suffix of the rewritten CP2K input, not picked up as a new .inp.
+RESTART_SUFFIX = '.restart'
+# Suffix of the rewritten GAMESS input (rungms needs the .inp extension);
+# input scans and the result cache skip it, see is_restart_input.
+MOREAD_SUFFIX = '_moread.inp'
+
+PROJECT_PATTERN = re.compile(r'^\s*PROJECT(?:_NAME)?\s+(\S+)', re.IGNORECASE | re.MULTILINE)
+VEC_PATTERN = re.compile(r'^ \$VEC\s*$.*?^ \$END\s*$', re.MULTILINE | re.DOTALL)
+GROUP_PATTERN = r'^ *\${}\b.*?\$END[^\n]*\n'
+
+
+def is_restart_input(name: str) -> bool:
+    """Whether a file name is a warm-restart input written by this module."""
+    return name.endswith((RESTART_SUFFIX, MOREAD_SUFFIX))
+
+
+def restart_inputs(input_file: str) -> List[str]:
+    """Names of the warm-restart inputs that may be written for input_file."""
+    name = os.path.basename(input_file)
+    return [name + RESTART_SUFFIX, os.path.splitext(name)[0] + MOREAD_SUFFIX]
+
+
+def find_cp2k_wfn(run_dir: str, input_text: str) -> Optional[str]:
+    """Newest non-empty restart wavefunction of the input's project."""
+    match = PROJECT_PATTERN.search(input_text)
+    project = match.group(1) if match else '*'
+    candidates = [path for path in
+                  glob.glob(os.path.join(run_dir, f"{project}-RESTART.wfn"))
+                  + glob.glob(os.path.join(run_dir, f"{project}-RESTART.wfn.bak-1"))
+                  if os.path.getsize(path) > 0]
+    if not candidates:
+        return None
+    return max(candidates, key=os.path.getmtime)
+
+
+def cp2k_restart_input(input_text: str, wfn_file: str) -> Optional[str]:
+    """Input with SCF_GUESS RESTART from wfn_file, None for multi-DFT inputs.
+
+    FAT inputs have one &DFT per force environment, each with its own
+    wavefunction; they are restarted cold.
+    """
+    lines = [line for line in input_text.splitlines()
+             if not re.match(r'\s*(SCF_GUESS|WFN_RESTART_FILE_NAME)\b', line,
+                             re.IGNORECASE)]
+    if sum(bool(re.match(r'\s*&DFT\b', l, re.IGNORECASE)) for l in lines) != 1:
+        return None
+
+    out = []
+    depth = 0  # section depth inside &DFT, 0 outside
+    has_scf = False
+    for line in lines:
+        indent = line[:len(line) - len(line.lstrip())] + "  "
+        if depth and re.match(r'\s*&END\b', line, re.IGNORECASE):
+            depth -= 1
+            if not depth and not has_scf:
+                # No &SCF section: add one, the default guess is not a restart.
+                out += [f"{indent}&SCF", f"{indent}  SCF_GUESS RESTART", f"{indent}&END SCF"]
+        elif depth and re.match(r'\s*&\w', line):
+            depth += 1
+        out.append(line)
+        if re.match(r'\s*&DFT\b', line, re.IGNORECASE):
+            depth = 1
+            out.append(f"{indent}WFN_RESTART_FILE_NAME {wfn_file}")
+        elif depth and re.match(r'\s*&SCF\b', line, re.IGNORECASE):
+            has_scf = True
+            out.append(f"{indent}SCF_GUESS RESTART")
+    return "\n".join(out) + "\n"
+
+
+def last_vec(dat_text: str) -> Optional[str]:
+    """Last $VEC group of a GAMESS .dat file."""
+    groups = VEC_PATTERN.findall(dat_text)
+    return groups[-1] if groups else None
+
+
+def count_orbitals(vec: str) -> int:
+    """Number of orbitals of a $VEC group (card number 1 starts one)."""
+    count = 0
+    for line in vec.splitlines()[1:-1]:
+        if line[2:5].strip() == '1':
+            count += 1
+    return count
+
+
+def gamess_moread_input(input_text: str, vec: str) -> str:
+    """Input with GUESS=MOREAD and the given $VEC group."""
+    text = input_text
+    for group in ('GUESS', 'VEC'):
+        text = re.sub(GROUP_PATTERN.format(group), '', text,
+                      flags=re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    guess = f" $GUESS GUESS=MOREAD NORB={count_orbitals(vec)} $END\n"
+    contrl = re.search(GROUP_PATTERN.format('CONTRL'), text,
+                       re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    position = contrl.end() if contrl else 0
+    text = text[:position] + guess + text[position:]
+    return text.rstrip('\n') + "\n" + vec.rstrip('\n') + "\n"
+
+
+def warm_restart(runner: str, input_file: str,
+                 run_dir: str) -> Optional[Tuple[str, str]]:
+    """Write a warm-restart input into run_dir.
+
+    Returns (restart input file name, description), None if the code has
+    no restart strategy or no usable wavefunction was found.
+    """
+    with open(input_file, 'r', encoding="utf-8", errors="replace") as f:
+        input_text = f.read()
+    name = os.path.basename(input_file)
+
+    if runner == 'cp2k.ssmp':
+        wfn = find_cp2k_wfn(run_dir, input_text)
+        if wfn is None:
+            return None
+        text = cp2k_restart_input(input_text, os.path.basename(wfn))
+        restart_name = name + RESTART_SUFFIX
+        how = f"SCF_GUESS RESTART from {os.path.basename(wfn)}"
+    elif '$CONTRL' in input_text.upper():
+        base = os.path.splitext(name)[0]
+        dat_file = os.path.join(run_dir, f"{base}.dat")
+        if not os.path.isfile(dat_file):
+            return None
+        with open(dat_file, 'r', encoding="utf-8", errors="replace") as f:
+            vec = last_vec(f.read())
+        if vec is None:
+            return None
+        text = gamess_moread_input(input_text, vec)
+        restart_name = base + MOREAD_SUFFIX
+        how = f"GUESS=MOREAD from {base}.dat"
+    else:
+        return None
+
+    if text is None:
+        return None
+    with open(os.path.join(run_dir, restart_name), 'w', encoding="utf-8") as f:
+        f.write(text)
+    return restart_name, how
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+""" Multi-stage workflow executor for FAT-Molcas embedding jobs.
+Every fat-molcas_* directory becomes a chain of tasks
+
+  generate -> run extern_N (pymolcas) -> post-process extern_N
+  (energy, grid2cube, roll_cubefile.py) -> run CP2K -> extract
+
+declared per directory, so the tasks of different directories overlap:
+extraction of finished directories runs while other calculations are
+still in flight. The extern_N.sh scripts written by
+OpenMOLCASInputGenerator.generate_run_script are split into their
+pymolcas line (run) and the remaining lines (post-process). CP2K runs go
+through Runner, results are collected with get_energy.ResultExtractor.
+
+@input: config dictionary, containing:
+  config['input path'] = string()
+  config['generate command'] = string()   # {dir} placeholder, '' = none
+  config['total cpus'] = int()
+  config['omp threads'] = int()
+  config['max restarts'] = int()
+  config['results file'] = string()
+"""
+import argparse
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from get_energy import ResultExtractor
+from input_watch import iter_input_files
+from runner import Runner
+
+# Ready tasks of later stages start first, so finished directories
+# are completed before new ones occupy the CPUs.
+STAGES = ['generate', 'run', 'post-process', 'extract']
+
+
+def run_shell(command: str, cwd: str, omp_threads: int,
+              log_file: Optional[str] = None) -> Dict[str, Any]:
+    """Run a shell command of a task, return its result record."""
+    start_time = time.perf_counter()
+    env = dict(os.environ, OMP_NUM_THREADS=str(omp_threads))
+    log_f = open(log_file, 'wb') if log_file else subprocess.DEVNULL
+    try:
+        process = subprocess.run(command, shell=True, cwd=cwd, env=env,
+                                 stdout=log_f, stderr=subprocess.STDOUT)
+    finally:
+        if log_file:
+            log_f.close()
+    result = {"status": "COMPLETED", "message": "",
+              "execution time": time.perf_counter() - start_time}
+    if process.returncode != 0:
+        result["status"] = "ERROR"
+        result["message"] = (f"Error: Command '{command}' returned "
+                             f"non-zero exit status {process.returncode}.")
+    return result
+
+
+def extract_fat(directory: str, _cpus: int = 1) -> Dict[str, Any]:
+    """ResultExtractor records of one FAT directory."""
+    start_time = time.perf_counter()
+    extractor = ResultExtractor({'spec': None})
+    parent = os.path.dirname(directory)
+    xyz_file = os.path.join(parent, f"{os.path.basename(parent)}_xyz", "tot.xyz")
+    distance = None
+    if os.path.isfile(xyz_file):
+        with open(xyz_file, 'r', encoding="utf-8") as f:
+            distance = extractor.extract_distance(f.read())
+
+    calc_type = os.path.basename(directory)
+    extractor.process_fat_calculation(directory, distance, calc_type)
+    records = extractor.results["calculations"].get(calc_type, [])
+    return {"status": "COMPLETED" if records else "ERROR",
+            "message": "" if records else "No log file to extract",
+            "execution time": time.perf_counter() - start_time,
+            "records": records}
+
+
+class DagExecutor:
+    """Runs tasks with dependencies on a fixed number of CPUs.
+
+    A task is a dict with 'name', 'stage', 'deps', 'fn', 'args' and
+    'cpus'; an optional 'then' callback runs in the main process after
+    the task completed and may return new tasks.
+    """
+
+    def __init__(self, total_cpus: int):
+        self.total_cpus = total_cpus
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.results: List[Dict[str, Any]] = []
+
+    def _log(self, message: str):
+        print(f"[Workflow] {message}")
+
+    def add(self, task: Dict[str, Any]) -> None:
+        task.setdefault('deps', [])
+        task.setdefault('cpus', 1)
+        task['status'] = 'PENDING'
+        self.tasks[task['name']] = task
+
+    def _finish(self, task: Dict[str, Any], result: Dict[str, Any]) -> None:
+        task['status'] = result['status']
+        result.update({'task': task['name'], 'stage': task['stage']})
+        self.results.append(result)
+        if result['status'] == 'COMPLETED' and task.get('then'):
+            for new_task in task['then']():
+                self.add(new_task)
+
+    def _ready(self) -> List[Dict[str, Any]]:
+        """Pending tasks whose dependencies completed, latest stage first.
+
+        Tasks depending on a failed task are marked SKIPPED.
+        """
+        skipped = True
+        while skipped:
+            skipped = False
+            ready = []
+            for task in list(self.tasks.values()):
+                if task['status'] != 'PENDING':
+                    continue
+                states = [self.tasks[dep]['status'] for dep in task['deps']]
+                if any(s in ('ERROR', 'SKIPPED') for s in states):
+                    self._finish(task, {"status": "SKIPPED", "execution time": 0,
+                                        "message": "Dependency failed"})
+                    skipped = True
+                elif all(s == 'COMPLETED' for s in states):
+                    ready.append(task)
+        ready.sort(key=lambda t: (-STAGES.index(t['stage']), t['name']))
+        return ready
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Run all tasks; returns their result records."""
+        free_cpus = self.total_cpus
+        running = {}
+        with ProcessPoolExecutor(max_workers=self.total_cpus) as executor:
+            while True:
+                for task in self._ready():
+                    cpus = min(task['cpus'], self.total_cpus)
+                    if cpus > free_cpus:
+                        if running:
+                            continue
+                        cpus = free_cpus
+                    task['status'] = 'RUNNING'
+                    task['cpus'] = cpus
+                    self._log(f"Starting {task['name']} on {cpus} CPUs")
+                    future = executor.submit(task['fn'], *task['args'], cpus)
+                    running[future] = task
+                    free_cpus -= cpus
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    free_cpus += task['cpus']
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {"status": "ERROR", "execution time": 0,
+                                  "message": f"Error: {str(e)}"}
+                    self._log(f"{task['name']}: {result['status']}")
+                    self._finish(task, result)
+        return self.results
+
+
+class FatMolcasWorkflow:
+    """Builds and runs the task graph of all fat-molcas_* directories."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.config.update({
+            'generate command': self.config.get('generate command', ''),
+            'total cpus': self.config.get('total cpus', os.cpu_count()),
+            'omp threads': self.config.get('omp threads', 16),
+            'max restarts': self.config.get('max restarts', 3),
+            'results file': self.config.get('results file', 'results.json'),
+        })
+        self.runner = Runner({
+            'input path': self.config['input path'],
+            'output dir': self.config['input path'],
+            'total cpus': self.config['total cpus'],
+            'omp threads': self.config['omp threads'],
+            'max restarts': self.config['max restarts'],
+            'output to log': True,
+            'scan inputs': False,
+            'ledger': '',
+            'cache': False,
+            'mem fraction': 0,
+            'telemetry interval': 0,
+        })
+        self.dag = DagExecutor(self.config['total cpus'])
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Workers only need the config and the Runner, not the graph."""
+        state = self.__dict__.copy()
+        state['dag'] = None
+        return state
+
+    def _log(self, message: str):
+        print(f"[Workflow] {message}")
+
+    def directories(self) -> List[str]:
+        """fat-molcas_* directories below the input path."""
+        found = []
+        for root, dirs, _ in os.walk(self.config['input path']):
+            found.extend(os.path.join(root, d) for d in dirs
+                         if d.lower().startswith('fat-molcas'))
+        return sorted(found)
+
+    def _generate(self, directory: str, _cpus: int) -> Dict[str, Any]:
+        command = self.config['generate command']
+        if not command:
+            return {"status": "COMPLETED", "message": "Inputs present",
+                    "execution time": 0}
+        return run_shell(command.format(dir=directory), directory, 1)
+
+    def _run_main(self, input_file: str, cpus: int) -> Dict[str, Any]:
+        return self.runner.run_job(input_file, cpus)
+
+    def _split_script(self, script: str) -> Tuple[str, str]:
+        """(run, post-process) command lines of an extern_N.sh script."""
+        with open(script, 'r', encoding="utf-8") as f:
+            lines = [line.strip() for line in f
+                     if line.strip() and not line.startswith('#')]
+        run = [line for line in lines if line.startswith('pymolcas')]
+        post = [line for line in lines if not line.startswith('pymolcas')]
+        return " && ".join(run), " && ".join(post)
+
+    def _expand(self, directory: str) -> List[Dict[str, Any]]:
+        """Run, post-process and extract tasks of a generated directory."""
+        tag = os.path.relpath(directory, self.config['input path'])
+        inputs = sorted(iter_input_files(directory))
+        inputs = [f for f in inputs if os.path.dirname(f) == directory]
+        if not inputs:
+            self._log(f"No CP2K input in {directory}, skipped")
+            return []
+
+        tasks = []
+        post_names = []
+        for script in sorted(f for f in os.listdir(directory)
+                             if f.startswith('extern_') and f.endswith('.sh')):
+            fragment = script[:-3]
+            run, post = self._split_script(os.path.join(directory, script))
+            run_name = f"run {tag}/{fragment}"
+            tasks.append({'name': run_name, 'stage': 'run',
+                          'deps': [f"generate {tag}"],
+                          'fn': run_shell, 'args': (run, directory),
+                          'cpus': self.config['omp threads']})
+            post_names.append(f"post-process {tag}/{fragment}")
+            tasks.append({'name': post_names[-1], 'stage': 'post-process',
+                          'deps': [run_name], 'fn': run_shell,
+                          'args': (post or "true", directory), 'cpus': 1})
+
+        run_name = f"run {tag}"
+        tasks.append({'name': run_name, 'stage': 'run', 'deps': post_names,
+                      'fn': self._run_main, 'args': (inputs[0],),
+                      'cpus': self.config['omp threads']})
+        tasks.append({'name': f"extract {tag}", 'stage': 'extract',
+                      'deps': [run_name], 'fn': extract_fat,
+                      'args': (directory,), 'cpus': 1})
+        return tasks
+
+    def run(self) -> Dict[str, Any]:
+        """Run the whole graph and save the extracted results."""
+        for directory in self.directories():
+            tag = os.path.relpath(directory, self.config['input path'])
+            self.dag.add({'name': f"generate {tag}", 'stage': 'generate',
+                          'fn': self._generate, 'args': (directory,),
+                          'then': lambda d=directory: self._expand(d)})
+        start_time = time.perf_counter()
+        results = self.dag.run()
+
+        extracted: Dict[str, Any] = {"calculations": {}}
+        for result in results:
+            for record in result.pop("records", []):
+                calc_type = os.path.basename(os.path.dirname(record["logfile"]))
+                extracted["calculations"].setdefault(calc_type, []).append(record)
+        with open(self.config['results file'], 'w', encoding="utf-8") as f:
+            json.dump(extracted, f, indent=2)
+
+        for stage in STAGES:
+            stage_results = [r for r in results if r['stage'] == stage]
+            completed = sum(r['status'] == 'COMPLETED' for r in stage_results)
+            self._log(f"{stage}: {completed}/{len(stage_results)} completed")
+        for result in results:
+            if result['status'] != 'COMPLETED':
+                self._log(f"{result['task']}: {result['status']} "
+                          f"{result['message']}")
+        self._log(f"Total time {time.perf_counter() - start_time:.1f} s, "
+                  f"results saved to {self.config['results file']}")
+        return extracted
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Run FAT-Molcas embedding workflows as a task graph")
+    parser.add_argument("input_path",
+                        help="Directory with fat-molcas_* calculation folders")
+    parser.add_argument("--generate", type=str, default='',
+                        help="Command generating the inputs of a folder, "
+                             "{dir} is replaced by its path")
+    parser.add_argument("--total_cpus", type=int, default=16,
+                        help="Total number of CPUs")
+    parser.add_argument("--omp_threads", type=int, default=16,
+                        help="OMP threads per pymolcas/CP2K run")
+    parser.add_argument("--max_restarts", type=int, default=4,
+                        help="Max restarts of CP2K runs")
+    parser.add_argument("--results", type=str, default='results.json',
+                        help="JSON file of extracted results")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = {
+        'input path': args.input_path,
+        'generate command': args.generate,
+        'total cpus': args.total_cpus,
+        'omp threads': args.omp_threads,
+        'max restarts': args.max_restarts,
+        'results file': args.results,
+    }
+    FatMolcasWorkflow(config).run()
+
+
+if __name__ == "__main__":
+    main()
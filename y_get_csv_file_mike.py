@@ -9,10 +9,11 @@ import numpy as np
 import argparse
 import csv
 
+from gms_log_parser import ParsedLog
+
 def Extract_data(file_name,index):
-    f = open(file_name, 'r', encoding='ISO-8859-1')
-    file_data = f.read().splitlines()
-    f.close()
+    log = ParsedLog(file_name, 'ISO-8859-1')
+    file_data = log.out
 
     scftype = ''
     dfttype = ''
@@ -96,7 +97,6 @@ def Extract_data(file_name,index):
 
     total_energy_Hartree = 0.0
     state_energy_Hartree = 0.0
-    state_location_in_log = []
     range_of_transitions = []
     state_transt_dominant = []
     state_transt = []
@@ -128,13 +128,6 @@ def Extract_data(file_name,index):
         if "CAM-MRSF" in l:
             camflag = True
 
-        states = range(1,nstate+1)
-        for i in states:
-            length = 4
-            step = int(length-len(str(i)))
-            if "STATE #"+' '*step+str(i)+"  ENERGY" in l:
-                state_location_in_log.append(int(il))
-
 #        if l_mrsfs or l_mrsft:
 #            if "SPIN-PAIRING COUPLINGS" in l:
 #                mrsf_hf = float(file_data[il+2].split()[0])
@@ -155,6 +148,7 @@ def Extract_data(file_name,index):
                     mrsf_hf = float(file_data[il+8].split()[0])
 
         if "SUMMARY OF" in l:
+            state_location_in_log = log.index.state_lines(nstate, il)
             step = 0; mrs = False
             if l_mrsfs or l_mrsft:
                 for i in [*range(nstate-1)]:
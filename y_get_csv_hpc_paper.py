@@ -6,149 +6,99 @@ import numpy as np
 import argparse
 import csv
 
-def extract_data(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-
-    dirscf = False
-
-    t_of_ERI = 0.0
-    t_cpu_ERI = 0.0
-    t_write = 0.0
-    t_flush = 0.0
-    t_of_scf = 0.0
-    t_cpu_scf = 0.0
-    t_of_davidson = 0.0
-    t_of_dav_transp = 0.0
-    t_of_dav_trans1 = 0.0
-    t_of_dav_trans2 = 0.0
-    t_cpu_davidson = 0.0
+from gms_log_parser import LogParser, ParsedLog, step_cpu_time
+
+def _direct_scf(out, il, d):
+    d['dirscf'] = True
+
+def _eri_flush(out, il, d):
+    if not d['dirscf']:
+        if d['n_flush']==0:
+            # Timing of getting ERI
+            d['t_of_ERI'] = float(out[il-8].split()[4])
+            # Step CPU time of getting ERI
+            d['t_cpu_ERI'] = step_cpu_time(out[il-10])
+            # Time of writing int
+            d['t_write'] = float(out[il-1].split()[4])
+            # time of flushing
+            d['t_flush'] = float(out[il+4].split()[4])
+        d['n_flush'] += 1
+
+def _density_change(out, il, d):
+    # Timing of the first SCF stap
+    d['t_of_scf'] = float(out[il+3].split()[4])
+    # Step CPU time of the first  SCF
+    if not d['dirscf'] and str(out[il+1].split()[5])==str("PROCEDURE"):
+        return True
+    d['t_cpu_scf'] = step_cpu_time(out[il+1])
+
+def _transpose(key):
+    def handler(out, il, d):
+        # Timing of the transpose in first Devidson iteration
+        d[key] = float(out[il+3].split()[4])
+    return handler
+
+def _davidson_step(out, il, d):
+    # Timing of the first Devidson iteration
+    d['t_of_davidson'] = float(out[il].split()[4])
+    # CPU time on step
+    d['t_cpu_davidson'] = step_cpu_time(out[il-2])
+
+TIMING_PARSER = LogParser()
+TIMING_PARSER.on("dirscf=.t.", _direct_scf)
+TIMING_PARSER.on("Flushing page cache", _eri_flush)
+TIMING_PARSER.on("DENSITY CHANGE", _density_change)
+TIMING_PARSER.on("timing for transpose 1", _transpose('t_of_dav_trans1'))
+TIMING_PARSER.on("timing for transpose 2", _transpose('t_of_dav_trans2'))
+TIMING_PARSER.on("kkk step wall time:", _davidson_step)
+
+def extract_data(log):
+    d = {'dirscf': False,
+         'n_flush': 0,
+         't_of_ERI': 0.0,
+         't_cpu_ERI': 0.0,
+         't_write': 0.0,
+         't_flush': 0.0,
+         't_of_scf': 0.0,
+         't_cpu_scf': 0.0,
+         't_of_davidson': 0.0,
+         't_of_dav_trans1': 0.0,
+         't_of_dav_trans2': 0.0,
+         't_cpu_davidson': 0.0,
+         }
+    log.parse(TIMING_PARSER, d)
     data_row = []
-    iii=0
-    for il, l in enumerate(out):
-        if "dirscf=.t." in l:
-            dirscf=True
-        if not dirscf and "Flushing page cache" in l:
-            if iii==0:
-                # Timing of getting ERI
-                t_of_ERI = float(out[il-8].split()[4])
-                # Step CPU time of getting ERI
-                if (str(out[il-10].split()[5])==str("TOTAL")):
-                    t_cpu_ERI = float(out[il-10].split()[4])
-                else:
-                    t_cpu_ERI = float(out[il-10].split()[5])
-                # Time of writing int
-                t_write = float(out[il-1].split()[4])
-                # time of flushing
-                t_flush = float(out[il+4].split()[4])
-            iii+=1
-        if not dirscf and "DENSITY CHANGE" in l:
-            # Timing of the first SCF stap
-            t_of_scf = float(out[il+3].split()[4])
-#           # Step CPU time of the first  SCF
-            if (str(out[il+1].split()[5])==str("PROCEDURE")):
-                continue
-            else:
-                if (str(out[il+1].split()[5])==str("TOTAL")):
-                    t_cpu_scf = float(out[il+1].split()[4])
-                else:
-                    t_cpu_scf = float(out[il+1].split()[5])
-        if dirscf and "DENSITY CHANGE" in l:
-            # Timing of the first SCF stap
-            t_of_scf = float(out[il+3].split()[4])
-            # Total CPU time of the first  SCF
-            if (str(out[il+1].split()[5])==str("TOTAL")):
-                t_cpu_scf = float(out[il+1].split()[4])
-            else:
-                t_cpu_scf = float(out[il+1].split()[5])
-
-        if "timing for transpose 1" in l:
-            # Timing of the transpose in first Devidson iteration
-            t_of_dav_trans1 = float(out[il+3].split()[4])
-        if "timing for transpose 2" in l:
-            # Timing of the transpose in first Devidson iteration
-            t_of_dav_trans2 = float(out[il+3].split()[4])
-        t_of_dav_transp = t_of_dav_trans1+t_of_dav_trans2
-        if not dirscf and "kkk step wall time:" in l:
-            # Timing of the first Devidson iteration
-            t_of_davidson = float(out[il].split()[4])
-            # CPU time on step
-            if (str(out[il-2].split()[5])==str("TOTAL")):
-                t_cpu_davidson = float(out[il-2].split()[4])
-            else:
-                t_cpu_davidson = float(out[il-2].split()[5])
-        if dirscf and "kkk step wall time:" in l:
-            # Timing of the first Devidson iteration
-            t_of_davidson = float(out[il].split()[4])
-            # CPU time on step
-            if (str(out[il-2].split()[5])==str("TOTAL")):
-                t_cpu_davidson = float(out[il-2].split()[4])
-            else:
-                t_cpu_davidson = float(out[il-2].split()[5])
-    row = (t_of_ERI,       #0
-           t_cpu_ERI,      #1
-           t_write,        #2
-           t_flush,        #3
-           t_of_scf,       #4
-           t_cpu_scf,      #5
-           t_of_davidson,  #6
-           t_cpu_davidson, #7
-           t_of_dav_transp,#8
+    row = (d['t_of_ERI'],       #0
+           d['t_cpu_ERI'],      #1
+           d['t_write'],        #2
+           d['t_flush'],        #3
+           d['t_of_scf'],       #4
+           d['t_cpu_scf'],      #5
+           d['t_of_davidson'],  #6
+           d['t_cpu_davidson'], #7
+           d['t_of_dav_trans1']+d['t_of_dav_trans2'],#8
            )
     data_row.append(row)
     return  data_row
 
-def check_node(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-    for il, l in enumerate(out):
-        if "compute processes on" in l:
-            n_node = int(out[il].split()[5])
+def check_node(log):
+    n_node = log.token("compute processes on", 0, 5, int, last=True)
     if n_node>1:
-        print( file, 'warning, node != 1, node =', n_node)
+        print( log.file_name, 'warning, node != 1, node =', n_node)
     return
-def extract_n_state(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-    for il, l in enumerate(out):
-        if "TDDFT INPUT PARAMETERS" in l:
-            n_state = int(out[il+2].split()[1])
-            return n_state
-
-def extract_nbf(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-    for il, l in enumerate(out):
-        if "NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS" in l:
-            nbf = int(out[il].split()[7])
-            return nbf
-
-def extract_cpu(file):
-    filedata = None
-    f = open(file, 'r')
-    filedata = f.read()
-    f.close()
-    out = filedata.splitlines()
-    for il, l in enumerate(out):
-        if "Initiating" in l:
-            cpu = int(out[il].split()[1])
-            return cpu
-
-def extract_basis(file):
+def extract_n_state(log):
+    return log.token("TDDFT INPUT PARAMETERS", 2, 1, int)
+
+def extract_nbf(log):
+    return log.token("NUMBER OF CARTESIAN GAUSSIAN BASIS FUNCTIONS", 0, 7, int)
+
+def extract_cpu(log):
+    return log.token("Initiating", 0, 1, int)
+
+def extract_basis(log):
     '''  mrsf_1a_c60_631g_c1_n4_t0.log '''
     '''  [0] [1] [2] [3] [4] [5] [6].log '''
+    file = log.file_name
 
     file_parts = file.split("_")
 
@@ -160,8 +110,8 @@ def extract_basis(file):
     check_n_state = int(file_parts[5].split('n')[1])
     test_series_number = int(file_parts[6].split('.')[0].split('t')[1])
 
-    n_state = extract_n_state(file)
-    n_cpu = extract_cpu(file)
+    n_state = extract_n_state(log)
+    n_cpu = extract_cpu(log)
     if check_n_cpu != n_cpu:
         print("Warning, n_CPU != CPU in log")
         print(file, 'name:', check_n_cpu,'in log:', n_cpu)
@@ -169,7 +119,7 @@ def extract_basis(file):
         print("Warning, n_state != n_state in log")
         print(file, 'name:', check_n_state,'in log:', n_state)
 
-    nbf = extract_nbf(file)
+    nbf = extract_nbf(log)
 
     method = str('Direct')
     if file.count('-') >=1:
@@ -276,12 +226,13 @@ if __name__ == '__main__':
 
         for file in files:
 
-            check_node(file)
+            log = ParsedLog(file)
+            check_node(log)
 
-            theory, method, algorithm, molecule, basis, nbf, n_state, n_cpu, n_test = extract_basis(file)
+            theory, method, algorithm, molecule, basis, nbf, n_state, n_cpu, n_test = extract_basis(log)
             memory = method
 
-            data = extract_data(file)
+            data = extract_data(log)
 
             dirscf = False
             if method=='Direct':